@@ -0,0 +1,24 @@
+"""Add image content hash
+
+Revision ID: 005_add_image_sha256
+Revises: 004_add_ai_feedback
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '005_add_image_sha256'
+down_revision = '004_add_ai_feedback'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('fracture_predictions',
+        sa.Column('image_sha256', sa.String(length=64), nullable=True)
+    )
+    op.create_index(op.f('ix_fracture_predictions_image_sha256'), 'fracture_predictions', ['image_sha256'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_fracture_predictions_image_sha256'), table_name='fracture_predictions')
+    op.drop_column('fracture_predictions', 'image_sha256')
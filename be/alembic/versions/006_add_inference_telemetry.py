@@ -0,0 +1,44 @@
+"""Add inference telemetry table
+
+Revision ID: 006_add_inference_telemetry
+Revises: 005_add_image_sha256
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '006_add_inference_telemetry'
+down_revision = '005_add_image_sha256'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('inference_telemetry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prediction_id', sa.Integer(), nullable=True),
+        sa.Column('model_version', sa.String(length=100), nullable=False),
+        sa.Column('batch_size', sa.Integer(), nullable=True),
+        sa.Column('cache_hit', sa.Boolean(), nullable=True),
+        sa.Column('storage_fetch_ms', sa.Float(), nullable=True),
+        sa.Column('decode_ms', sa.Float(), nullable=True),
+        sa.Column('preprocess_ms', sa.Float(), nullable=True),
+        sa.Column('forward_ms', sa.Float(), nullable=True),
+        sa.Column('postprocess_ms', sa.Float(), nullable=True),
+        sa.Column('db_write_ms', sa.Float(), nullable=True),
+        sa.Column('total_ms', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['prediction_id'], ['fracture_predictions.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_inference_telemetry_id'), 'inference_telemetry', ['id'], unique=False)
+    op.create_index(op.f('ix_inference_telemetry_prediction_id'), 'inference_telemetry', ['prediction_id'], unique=False)
+    op.create_index(op.f('ix_inference_telemetry_model_version'), 'inference_telemetry', ['model_version'], unique=False)
+    op.create_index(op.f('ix_inference_telemetry_created_at'), 'inference_telemetry', ['created_at'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_inference_telemetry_created_at'), table_name='inference_telemetry')
+    op.drop_index(op.f('ix_inference_telemetry_model_version'), table_name='inference_telemetry')
+    op.drop_index(op.f('ix_inference_telemetry_prediction_id'), table_name='inference_telemetry')
+    op.drop_index(op.f('ix_inference_telemetry_id'), table_name='inference_telemetry')
+    op.drop_table('inference_telemetry')
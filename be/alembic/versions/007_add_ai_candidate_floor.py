@@ -0,0 +1,30 @@
+"""Add AI candidate floor
+
+Revision ID: 007_add_ai_candidate_floor
+Revises: 006_add_inference_telemetry
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '007_add_ai_candidate_floor'
+down_revision = '006_add_inference_telemetry'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('fracture_predictions',
+        sa.Column('ai_candidate_floor', sa.Float(), nullable=True)
+    )
+    # AI detections are now read as "source = ai AND confidence > threshold"
+    op.create_index(
+        'ix_fracture_detections_prediction_source_confidence',
+        'fracture_detections',
+        ['prediction_id', 'source', 'confidence'],
+        unique=False
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_fracture_detections_prediction_source_confidence', table_name='fracture_detections')
+    op.drop_column('fracture_predictions', 'ai_candidate_floor')
@@ -0,0 +1,25 @@
+"""Index image path for content-addressed image references
+
+Revision ID: 008_add_image_path_index
+Revises: 007_add_ai_candidate_floor
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '008_add_image_path_index'
+down_revision = '007_add_ai_candidate_floor'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Stored images are shared by path; deleting a prediction counts the remaining references
+    op.create_index(
+        op.f('ix_fracture_predictions_image_path'),
+        'fracture_predictions',
+        ['image_path'],
+        unique=False
+    )
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_fracture_predictions_image_path'), table_name='fracture_predictions')
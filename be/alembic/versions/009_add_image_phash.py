@@ -0,0 +1,29 @@
+"""Add perceptual image hash and near-duplicate reference
+
+Revision ID: 009_add_image_phash
+Revises: 008_add_image_path_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009_add_image_phash'
+down_revision = '008_add_image_path_index'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('fracture_predictions', sa.Column('image_phash', sa.BigInteger(), nullable=True))
+    op.add_column('fracture_predictions', sa.Column('near_duplicate_of_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_fracture_predictions_near_duplicate_of_id',
+        'fracture_predictions', 'fracture_predictions',
+        ['near_duplicate_of_id'], ['id'],
+        ondelete='SET NULL'
+    )
+
+def downgrade() -> None:
+    op.drop_constraint('fk_fracture_predictions_near_duplicate_of_id', 'fracture_predictions', type_='foreignkey')
+    op.drop_column('fracture_predictions', 'near_duplicate_of_id')
+    op.drop_column('fracture_predictions', 'image_phash')
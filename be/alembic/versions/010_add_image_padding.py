@@ -0,0 +1,21 @@
+"""Add letterbox geometry of stored images
+
+Revision ID: 010_add_image_padding
+Revises: 009_add_image_phash
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '010_add_image_padding'
+down_revision = '009_add_image_phash'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('fracture_predictions', sa.Column('image_padding', postgresql.JSONB, nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('fracture_predictions', 'image_padding')
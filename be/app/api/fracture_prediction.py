@@ -1,8 +1,9 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.executors import io_executor
 from app.api.auth import get_current_user
 from app.models.user import User
 from app.schemas.fracture_prediction import (
@@ -23,8 +24,8 @@ async def submit_student_annotations(
     current_user: User = Depends(get_current_user)
 ):
     """Submit student annotations for a prediction"""
-    result = fracture_service.submit_student_annotations(
-        prediction_id, annotations, current_user, db
+    result = await io_executor.run(
+        fracture_service.submit_student_annotations, prediction_id, annotations, current_user, db
     )
     
     if result.get("status") == 404:
@@ -52,13 +53,14 @@ async def run_ai_prediction(
 ):
     """Run AI prediction asynchronously"""
     # Check prediction exists and belongs to user
-    prediction = fracture_service.get_prediction_details(prediction_id, current_user, db)
+    prediction = await io_executor.run(fracture_service.get_prediction_details, prediction_id, current_user, db)
     if not prediction:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prediction not found")
     
     # Dispatch Celery task
     from app.tasks.fracture_tasks import run_ai_prediction as run_ai_task
-    task = run_ai_task.delay(
+    task = await io_executor.run(
+        run_ai_task.delay,
         user_id=current_user.id,
         prediction_id=prediction_id
     )
@@ -72,11 +74,12 @@ async def run_ai_prediction(
 @router.get("/predictions/{prediction_id}/comparison", response_model=PredictionComparison)
 async def get_prediction_comparison(
     prediction_id: int,
+    confidence_threshold: Optional[float] = Query(None, ge=0.0, le=1.0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get detailed comparison between student and AI predictions with AI-generated feedback"""
-    result = await fracture_service.get_prediction_comparison(prediction_id, current_user, db)
+    result = await fracture_service.get_prediction_comparison(prediction_id, current_user, db, confidence_threshold)
     
     if result.get("status") == 404:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result.get("error"))
@@ -88,6 +91,7 @@ async def get_prediction_comparison(
     return PredictionComparison(
         prediction_id=result.get("prediction_id"),
         image_filename=result.get("image_filename"),
+        confidence_threshold=result.get("confidence_threshold"),
         student_detections=result.get("student_detections"),
         ai_detections=result.get("ai_detections"),
         comparison_metrics=result.get("comparison_metrics"),
@@ -99,10 +103,11 @@ async def get_prediction_comparison(
 @router.get("/predictions/{prediction_id}", response_model=FracturePredictionOut)
 def get_prediction_details(
     prediction_id: int,
+    confidence_threshold: Optional[float] = Query(None, ge=0.0, le=1.0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get details of a specific fracture prediction"""
+    """Get details of a specific fracture prediction, optionally at another AI confidence threshold"""
     prediction = fracture_service.get_prediction_details(prediction_id, current_user, db)
     
     if not prediction:
@@ -111,7 +116,29 @@ def get_prediction_details(
             detail="Prediction not found or access denied"
         )
     
-    return prediction
+    return fracture_service.build_prediction_view(prediction, confidence_threshold)
+
+
+@router.delete("/predictions/{prediction_id}", response_model=dict)
+async def delete_prediction(
+    prediction_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a prediction; its image is removed from storage when no other prediction uses it"""
+    result = await io_executor.run(fracture_service.delete_prediction, prediction_id, current_user, db)
+    
+    if result.get("status") == 404:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result.get("error"))
+    elif result.get("status") == 403:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=result.get("error"))
+    elif result.get("status") == 500:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=result.get("error"))
+    
+    return {
+        "message": result.get("message"),
+        "image_deleted": result.get("image_deleted")
+    }
 
 
 @router.get("/predictions", response_model=List[FracturePredictionOut])
@@ -123,4 +150,51 @@ def get_all_predictions(
 ):
     """Get all fracture predictions for the current logged-in user"""
     predictions = fracture_service.get_user_predictions(current_user, skip, limit, db)
-    return predictions
\ No newline at end of file
+    return [fracture_service.build_prediction_view(prediction) for prediction in predictions]
+
+
+@router.get("/analytics/threshold-sweep", response_model=dict)
+def get_threshold_sweep(
+    thresholds: List[float] = Query([0.1, 0.25, 0.4, 0.5, 0.75]),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get AI detection counts and student agreement at several confidence thresholds (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    
+    if not thresholds or any(not 0.0 <= threshold <= 1.0 for threshold in thresholds):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Thresholds must be between 0 and 1")
+    
+    return fracture_service.threshold_sweep(thresholds, db)
+
+@router.get("/cache/stats", response_model=dict)
+def get_inference_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get hit/miss statistics of the inference result cache and this host's disk caches (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    
+    from app.services.bone_fracture_predict.model_ready import model_ready_cache
+    from app.services.bone_fracture_predict.result_cache import inference_cache
+    from app.utils.storage_manager import storage_manager
+    return {
+        **inference_cache.stats(),
+        "image_disk_cache": storage_manager.image_cache.stats() if storage_manager.image_cache else None,
+        "model_ready_cache": model_ready_cache().stats()
+    }
+
+
+@router.get("/telemetry/inference", response_model=dict)
+def get_inference_telemetry(
+    hours: int = 24,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get p50/p95/p99 inference stage timings per model version (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    
+    from app.services.telemetry_service import telemetry_service
+    return telemetry_service.summarize_inference(db, hours)
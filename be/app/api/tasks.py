@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from celery.result import AsyncResult
 
@@ -21,6 +21,7 @@ def get_task_status(
     
     Returns:
         - PENDING: Task is waiting
+        - PROGRESS: Batch task running, with done/total counts in "progress"
         - SUCCESS: Task completed successfully
         - FAILURE: Task failed
     """
@@ -41,6 +42,12 @@ def get_task_status(
             "status": "FAILURE",
             "error": str(task_result.info)
         }
+    elif task_result.state == 'PROGRESS':
+        return {
+            "status": "PROGRESS",
+            "progress": task_result.info,
+            "result": None
+        }
     else:
         return {
             "status": task_result.state,
@@ -1,31 +1,49 @@
+import time
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.executors import ExecutorSaturatedError, io_executor
 from app.api.auth import get_current_user
 from app.models.user import User
-from app.schemas.fracture_prediction import FracturePredictionOut
+from app.schemas.fracture_prediction import FracturePredictionOut, BatchImageUploadOut
 from app.schemas.document_upload import DocumentUploadOut
-from app.utils.image_utils import validate_image_file
-from app.utils.document_utils import validate_document_file
+from app.utils.image_utils import (
+    IMAGE_BATCH_MAX_FILES,
+    IMAGE_BATCH_MAX_TOTAL_SIZE,
+    IMAGE_MAX_FILE_SIZE,
+    batch_file_max_size,
+    inspect_image_header,
+    validate_image_file,
+    validate_image_batch_file,
+)
+from app.utils.document_utils import DOCUMENT_MAX_FILE_SIZE, validate_document_file
+from app.utils.upload_utils import multipart_file_openapi, receive_upload, receive_uploads
+from app.utils.storage_manager import storage_manager
 from app.services.upload_service import upload_service
 
 router = APIRouter()
 
 
-@router.post("/image", response_model=FracturePredictionOut)
+@router.post("/image", response_model=FracturePredictionOut, openapi_extra=multipart_file_openapi("file"))
 async def upload_image(
-    file: UploadFile = File(...),
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Upload and resize image to 640x640 for fracture prediction"""
-    validate_image_file(file)
+    # Spooled straight off the request and size-checked as it arrives; large images stay on disk
+    upload = await receive_upload(request, "file", IMAGE_MAX_FILE_SIZE, validate_image_file)
     
     try:
-        file_content = await file.read()
-        result, status_code = upload_service.upload_image(file_content, file.filename, current_user, db)
+        # Magic bytes, dimensions and mode from the header, before anything decodes the image
+        inspect_image_header(upload.open(), upload.filename)
+        
+        # Resize, storage write and commit all block; keep them off the event loop
+        result, status_code = await io_executor.run(
+            upload_service.upload_image, upload.source(), upload.filename, current_user, db
+        )
         
         if status_code != 200:
             raise HTTPException(
@@ -35,18 +53,64 @@ async def upload_image(
         
         return result
         
-    except HTTPException:
+    except (HTTPException, ExecutorSaturatedError):
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Upload failed: {str(e)}"
         )
+    finally:
+        upload.close()
 
 
-@router.post("/document")
+@router.post(
+    "/images", response_model=BatchImageUploadOut, openapi_extra=multipart_file_openapi("files", multiple=True)
+)
+async def upload_images(
+    request: Request,
+    run_ai_prediction: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload many images, or zip archives of images, in one request
+
+    Every image is resized to 640x640 like /image. With run_ai_prediction,
+    one Celery task predicts the whole set; track it with /api/tasks/{task_id}.
+    """
+    # Each file is spooled off the request as it arrives, against its own limit and the request's total
+    uploads = await receive_uploads(
+        request, "files", batch_file_max_size, IMAGE_BATCH_MAX_TOTAL_SIZE, IMAGE_BATCH_MAX_FILES,
+        validate_image_batch_file
+    )
+    
+    try:
+        result, status_code = await io_executor.run(
+            upload_service.upload_images, [(upload.filename, upload.open()) for upload in uploads], current_user, db
+        )
+        
+        if status_code != 200:
+            raise HTTPException(status_code=status_code, detail=result.get("error"))
+        
+        if run_ai_prediction and result["predictions"]:
+            from app.tasks.fracture_tasks import run_ai_prediction_batch
+            task = await io_executor.run(
+                run_ai_prediction_batch.delay,
+                user_id=current_user.id,
+                prediction_ids=[prediction["id"] for prediction in result["predictions"]]
+            )
+            result["task_id"] = task.id
+        
+        return result
+    finally:
+        for upload in uploads:
+            upload.close()
+
+
+@router.post("/document", openapi_extra=multipart_file_openapi("file"))
 async def upload_document(
-    file: UploadFile = File(...),
+    request: Request,
     collection_name: str = "medical_documents",
     index_id: str = "medical_doc_index",
     db: Session = Depends(get_db),
@@ -55,23 +119,26 @@ async def upload_document(
     """
     Upload a document and process asynchronously
     """
-    validate_document_file(file)
+    upload = await receive_upload(request, "file", DOCUMENT_MAX_FILE_SIZE, validate_document_file)
     
     try:
-        file_content = await file.read()
-        
-        # Encode file content as base64 for Celery
-        import base64
-        file_content_b64 = base64.b64encode(file_content).decode('utf-8')
+        # Claim check: store the document, then enqueue only its reference
+        timestamp = int(time.time())
+        document_path = await storage_manager.asave_document(
+            upload.open(), f"{timestamp}_{upload.filename}", current_user.id
+        )
         
-        # Dispatch Celery task
+        # Publishing to the broker blocks too
         from app.tasks.document_tasks import process_document
-        task = process_document.delay(
+        task = await io_executor.run(
+            process_document.delay,
             user_id=current_user.id,
-            file_content_b64=file_content_b64,
-            filename=file.filename,
+            filename=upload.filename,
             collection_name=collection_name,
-            index_id=index_id
+            index_id=index_id,
+            document_path=document_path,
+            sha256=upload.sha256,
+            size=upload.size
         )
         
         return {
@@ -79,13 +146,15 @@ async def upload_document(
             "message": "Document upload started"
         }
         
-    except HTTPException:
+    except (HTTPException, ExecutorSaturatedError):
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Document processing failed: {str(e)}"
         )
+    finally:
+        upload.close()
 
 
 @router.get("/documents/history", response_model=List[DocumentUploadOut])
@@ -94,5 +163,5 @@ async def get_document_history(
     current_user: User = Depends(get_current_user)
 ):
     """Get all document uploads for the current user"""
-    documents = upload_service.get_document_history(current_user, db)
+    documents = await io_executor.run(upload_service.get_document_history, current_user, db)
     return documents
\ No newline at end of file
@@ -20,6 +20,81 @@ class Settings(BaseSettings):
     S3_BUCKET_DOCUMENTS: str
     ALLOWED_ORIGINS: str
     REDIS_URL: str
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+
+    # Fracture model inference
+    FRACTURE_MODEL_BACKEND: str = "torch"
+    FRACTURE_MODEL_PATH: str = ""
+    FRACTURE_MODEL_INT8: bool = False
+    FRACTURE_CONFIDENCE_THRESHOLD: float = 0.25
+    # Candidates down to this confidence are stored so any higher threshold can be applied later
+    FRACTURE_CANDIDATE_FLOOR: float = 0.05
+    FRACTURE_MODEL_VERSION: str = "YOLOv8"
+    INFERENCE_MAX_BATCH_SIZE: int = 8
+    INFERENCE_MAX_WAIT_MS: float = 10.0
+
+    # API executors: image transforms in processes (0: one per core), blocking I/O in threads
+    IMAGE_EXECUTOR_WORKERS: int = 0
+    IMAGE_EXECUTOR_MAX_PENDING: int = 16
+    IO_EXECUTOR_WORKERS: int = 16
+    IO_EXECUTOR_MAX_PENDING: int = 64
+
+    # Uploads are copied off the request in chunks; above this size the copy is on disk
+    UPLOAD_SPOOL_MAX_MEMORY: int = 1024 * 1024
+    UPLOAD_SPOOL_DIR: str = ""
+
+    # Storage backend for images and documents: local, s3 or memory; empty picks s3 in production
+    STORAGE_BACKEND: str = ""
+
+    # Storage reads: pooled keep-alive HTTP connections per process, shared with the S3 client
+    STORAGE_HTTP_POOL_SIZE: int = 16
+    STORAGE_HTTP_CONNECT_TIMEOUT: float = 3.05
+    STORAGE_HTTP_READ_TIMEOUT: float = 30.0
+    STORAGE_HTTP_RETRIES: int = 3
+    STORAGE_HTTP_RETRY_BACKOFF: float = 0.2
+
+    # Large S3 objects: multipart uploads with parallel parts, downloads as sequential ranged GETs
+    S3_ENDPOINT_URL: str = ""
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 4
+    S3_DOWNLOAD_RANGE_SIZE: int = 8 * 1024 * 1024
+
+    # Worker-local LRU copies of images read from the bucket, shared by all processes on a host
+    IMAGE_DISK_CACHE_ENABLED: bool = True
+    IMAGE_DISK_CACHE_DIR: str = "uploads/image_cache"
+    IMAGE_DISK_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+
+    # Decoded 640x640 copies of stored images, memory-mapped by the workers; outside the served uploads/
+    MODEL_READY_CACHE_ENABLED: bool = True
+    MODEL_READY_CACHE_DIR: str = "cache/model_ready"
+    MODEL_READY_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+
+    # Uploads within this perceptual-hash distance of a predicted image reuse its detections and feedback
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 6
+    NEAR_DUPLICATE_REFRESH_SECONDS: float = 30.0
+
+    # Celery worker start-up: models are warmed before the first task
+    WORKER_WARMUP_ENABLED: bool = True
+    WORKER_WARMUP_TIMEOUT_SECONDS: float = 300.0
+    # Readiness reports expire unless their process refreshes them every heartbeat
+    WORKER_READY_TTL_SECONDS: int = 90
+    WORKER_READY_HEARTBEAT_SECONDS: float = 30.0
+    # Load fork-safe models in the prefork parent so children share the weight pages
+    WORKER_PRELOAD_MODELS: bool = True
+
+    # Inference threads per worker process; 0 divides the cores by the worker concurrency
+    THREAD_BUDGET_ENABLED: bool = True
+    WORKER_CPU_CORES: int = 0
+    FRACTURE_MODEL_THREADS: int = 0
+    EMBEDDING_MODEL_THREADS: int = 0
+
+    # Inference result cache (Redis + per-process LRU)
+    INFERENCE_CACHE_ENABLED: bool = True
+    INFERENCE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    INFERENCE_CACHE_MAX_ENTRIES: int = 100_000
+    INFERENCE_CACHE_LOCAL_MAX_ENTRIES: int = 1024
 
     class Config:
         env_file = '.env'
@@ -0,0 +1,190 @@
+"""
+Bounded executors for blocking work in the API process.
+
+Async handlers must not run CPU-heavy image transforms or blocking storage
+and database calls on the event loop, or one large upload stalls every
+other request of that uvicorn worker. Image transforms go to a process pool
+(`image_executor`), blocking I/O to a thread pool (`io_executor`).
+
+Each executor admits at most max_workers + max_pending tasks. From a worker
+thread, submit() waits for a free slot; from the event loop, run() fails
+fast with ExecutorSaturatedError so the handler can answer 503 instead of
+queueing without bound. stats() exposes the load and saturation counters.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when an executor has no free slot for a new task"""
+
+
+class BoundedExecutor:
+    """
+    Lazily started process or thread pool with a cap on in-flight tasks.
+
+    Tracks tasks running and waiting, the peak, mean task latency, and how
+    often callers were turned away or had to wait for a slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        max_workers: int,
+        max_pending: int,
+        slot_timeout: float = 30.0
+    ):
+        """
+        Initialize the executor
+
+        Args:
+            name: Name reported in stats
+            kind: "process" or "thread"
+            max_workers: Pool size
+            max_pending: Tasks allowed to wait for a worker beyond max_workers
+            slot_timeout: How long submit() waits for a free slot
+        """
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self.slot_timeout = slot_timeout
+
+        self._pool: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "waited_for_slot": 0,
+            "in_flight": 0, "peak_in_flight": 0, "latency_ms_total": 0.0,
+        }
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_pending
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    # spawn: the API process runs threads, which fork does not copy safely
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self.name
+                    )
+            return self._pool
+
+    def submit(self, fn: Callable, *args, wait: bool = True, **kwargs) -> Future:
+        """
+        Run fn in the pool and return its future
+
+        Args:
+            wait: Block up to slot_timeout for a free slot when the executor
+                is full (never pass True from the event loop)
+
+        Raises:
+            ExecutorSaturatedError: No slot became free
+        """
+        if not self._slots.acquire(blocking=False):
+            if wait:
+                self._count("waited_for_slot")
+            if not wait or not self._slots.acquire(timeout=self.slot_timeout):
+                self._count("rejected")
+                raise ExecutorSaturatedError(
+                    f"{self.name} executor is saturated ({self.capacity} tasks in flight)"
+                )
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+
+        submitted_at = time.perf_counter()
+        try:
+            future = self._get_pool().submit(fn, *args, **kwargs)
+        except BaseException as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset()
+            self._release(failed=True, latency_ms=0.0)
+            raise
+
+        future.add_done_callback(lambda done: self._on_done(done, submitted_at))
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn in the pool from the event loop; fails fast when saturated"""
+        return await asyncio.wrap_future(self.submit(fn, *args, wait=False, **kwargs))
+
+    def _on_done(self, future: Future, submitted_at: float):
+        error = None if future.cancelled() else future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._reset()
+        self._release(future.cancelled() or error is not None, (time.perf_counter() - submitted_at) * 1000)
+
+    def _release(self, failed: bool, latency_ms: float):
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            self._stats["failed" if failed else "completed"] += 1
+            self._stats["latency_ms_total"] += latency_ms
+        self._slots.release()
+
+    def _reset(self):
+        """Drop a broken process pool so the next task starts a fresh one"""
+        with self._lock:
+            self._pool = None
+
+    def _count(self, name: str, amount: float = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load and saturation counters"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        finished = stats["completed"] + stats["failed"]
+        latency_total = stats.pop("latency_ms_total")
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "capacity": self.capacity,
+            "started": self._pool is not None,
+            **stats,
+            "utilization": round(min(stats["in_flight"], self.max_workers) / self.max_workers, 3),
+            "saturated": stats["in_flight"] >= self.capacity,
+            # Submit to completion, including time spent waiting for a worker
+            "mean_latency_ms": round(latency_total / finished, 2) if finished else None,
+        }
+
+
+image_executor = BoundedExecutor(
+    "image",
+    kind="process",
+    max_workers=settings.IMAGE_EXECUTOR_WORKERS or os.cpu_count() or 1,
+    max_pending=settings.IMAGE_EXECUTOR_MAX_PENDING
+)
+
+io_executor = BoundedExecutor(
+    "io",
+    kind="thread",
+    max_workers=settings.IO_EXECUTOR_WORKERS,
+    max_pending=settings.IO_EXECUTOR_MAX_PENDING
+)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {executor.name: executor.stats() for executor in (image_executor, io_executor)}
@@ -1,9 +1,24 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 # from llama_index.embeddings.cohere import CohereEmbedding
 from llama_index.postprocessor.cohere_rerank import CohereRerank
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
 from app.core.config import settings
+from app.core.model_registry import model_registry
+
+EMBEDDING_MODEL = "embedding"
+
+
+def _load_embedding_model():
+    """Build the HuggingFace embedding model; imports torch, so only on first use"""
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    return HuggingFaceEmbedding(
+        model_name="BAAI/bge-small-en-v1.5",
+        max_length=512
+    )
+
+
+model_registry.register(EMBEDDING_MODEL, _load_embedding_model)
 
 class ModelManager:
     def __init__(self):
@@ -20,12 +35,9 @@ class ModelManager:
     #     )
     def get_embedding_instance(self):
         """
-        Get HuggingFace embedding model instance.
+        Get HuggingFace embedding model instance (shared, loaded on first use).
         """
-        return HuggingFaceEmbedding(
-            model_name="BAAI/bge-small-en-v1.5",
-            max_length=512
-        )
+        return model_registry.get(EMBEDDING_MODEL)
 
     def get_llm_langchain_instance(self):
         """
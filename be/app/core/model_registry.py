@@ -0,0 +1,70 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class ModelRegistry:
+    """
+    Process-wide owner of heavyweight model instances.
+
+    Models are registered with a loader and only built on first use, so
+    processes that never run inference (the API tier) never import the
+    underlying runtimes. Each model is loaded at most once per process.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Register a loader; nothing is loaded until get() is called"""
+        with self._lock:
+            self._loaders[name] = loader
+
+    def get(self, name: str) -> Any:
+        """Return the model, loading it on first access"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+
+            if name not in self._loaders:
+                raise KeyError(f"No model registered under '{name}'")
+
+            start = time.perf_counter()
+            instance = self._loaders[name]()
+            self._load_times[name] = time.perf_counter() - start
+            self._instances[name] = instance
+
+            print(f"Model '{name}' loaded in {self._load_times[name]:.2f}s")
+            return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def unload(self, name: str):
+        """Drop a loaded model so the next get() reloads it"""
+        with self._lock:
+            self._instances.pop(name, None)
+            self._load_times.pop(name, None)
+
+    def registered(self) -> List[str]:
+        return list(self._loaders)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Load state and load time per registered model"""
+        return {
+            name: {
+                "loaded": name in self._instances,
+                "load_time_s": self._load_times.get(name),
+            }
+            for name in self._loaders
+        }
+
+
+model_registry = ModelRegistry()
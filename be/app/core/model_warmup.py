@@ -0,0 +1,234 @@
+"""
+Preload and warm the models a Celery worker needs before it takes tasks.
+
+Which models are warmed depends on the queues the worker consumes from, so
+a fracture-only worker never loads the embedding model and vice versa.
+Under prefork, fork-safe models are loaded once in the parent and shared
+with the children copy-on-write. Each process publishes a readiness report
+(including its shared and unique memory) to Redis once it is warm, and
+refreshes it on a heartbeat so reports of dead processes expire.
+"""
+import gc
+import json
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.redis_client import get_redis
+from app.core.thread_budget import current_budget
+from app.utils.memory import process_memory
+
+READY_KEY_PREFIX = "worker_ready"
+
+# This process's heartbeat: (pid, stop event); a forked child starts its own
+_heartbeat = None
+_heartbeat_lock = threading.Lock()
+
+
+def _warm_fracture_detector() -> str:
+    """Load the detector and run blank images through it at batch sizes 1 and max"""
+    from app.services.bone_fracture_predict.backends import INPUT_SIZE, PAD_VALUE
+    from app.services.bone_fracture_predict.predictor import FRACTURE_DETECTOR, get_fracture_predictor
+
+    predictor = get_fracture_predictor()
+    if predictor.backend is None:
+        raise RuntimeError(f"Model failed to load from {predictor.model_path}")
+
+    blank = np.full((INPUT_SIZE, INPUT_SIZE, 3), PAD_VALUE, dtype=np.uint8)
+    predictor.predict(blank)
+    if settings.INFERENCE_MAX_BATCH_SIZE > 1:
+        predictor.predict_batch([blank] * settings.INFERENCE_MAX_BATCH_SIZE)
+
+    return FRACTURE_DETECTOR
+
+
+def _warm_embedding_model() -> str:
+    """Load the embedding model and embed a short text"""
+    from app.core.model_manager import EMBEDDING_MODEL, model_manager
+
+    model_manager.get_embedding_instance().get_text_embedding("warm up")
+    return EMBEDDING_MODEL
+
+
+def _preload_fracture_detector() -> Optional[str]:
+    """Load the detector weights if the backend survives fork"""
+    # ONNX Runtime and OpenVINO start thread pools when a model is compiled,
+    # which are not usable in a forked child; those load in each child instead
+    if settings.FRACTURE_MODEL_BACKEND != "torch":
+        return None
+
+    from app.services.bone_fracture_predict.predictor import FRACTURE_DETECTOR
+
+    model_registry.get(FRACTURE_DETECTOR)
+    return FRACTURE_DETECTOR
+
+
+def _preload_embedding_model() -> Optional[str]:
+    """Load the embedding weights (PyTorch, no forward pass before fork)"""
+    from app.core.model_manager import EMBEDDING_MODEL
+
+    model_registry.get(EMBEDDING_MODEL)
+    return EMBEDDING_MODEL
+
+
+# Models needed by the tasks routed to each queue (see task_routes in celery_app)
+QUEUE_WARMERS: Dict[str, List[Callable[[], str]]] = {
+    "fracture_queue": [_warm_fracture_detector],
+    "document_queue": [_warm_embedding_model],
+}
+
+# Loaders that are safe to run in the prefork parent, per queue
+QUEUE_PRELOADERS: Dict[str, List[Callable[[], Optional[str]]]] = {
+    "fracture_queue": [_preload_fracture_detector],
+    "document_queue": [_preload_embedding_model],
+}
+
+
+def _callables_for_queues(queues: Iterable[str], table: Dict[str, List[Callable]]) -> List[Callable]:
+    """Callables registered for any of the queues, each once, in queue order"""
+    selected = []
+    for queue in queues:
+        for func in table.get(queue, []):
+            if func not in selected:
+                selected.append(func)
+    return selected
+
+
+def preload_models_for_queues(queues: Iterable[str]) -> List[str]:
+    """
+    Load fork-safe models in the prefork parent, before the pool starts
+
+    Children inherit the loaded weights and share their pages copy-on-write
+    as long as nothing writes to them. Only weights are loaded here; the
+    first forward pass (which starts the runtime's threads) happens in each
+    child during warm-up. Afterwards everything allocated so far is moved
+    to the permanent GC generation, so collections in the children do not
+    touch those objects and un-share their pages.
+    """
+    loaded = []
+    for preloader in _callables_for_queues(sorted(set(queues)), QUEUE_PRELOADERS):
+        try:
+            name = preloader()
+        except Exception as e:
+            print(f"Model preload failed ({preloader.__name__}), children will load it: {str(e)}")
+            continue
+        if name:
+            loaded.append(name)
+
+    gc.collect()
+    gc.freeze()
+
+    print(f"Preloaded before fork: {', '.join(loaded) or 'nothing'}")
+    return loaded
+
+
+def warm_models_for_queues(queues: Iterable[str]) -> Dict:
+    """
+    Load and warm every model the given queues need, in this process
+
+    Failures are recorded in the report rather than raised, so a worker
+    with a broken model still starts and serves its other queues.
+    """
+    queues = sorted(set(queues))
+
+    models = {}
+    for warmer in _callables_for_queues(queues, QUEUE_WARMERS):
+        start = time.perf_counter()
+        try:
+            name = warmer()
+        except Exception as e:
+            print(f"Model warm-up failed ({warmer.__name__}): {str(e)}")
+            models[warmer.__name__] = {"ready": False, "error": str(e)}
+            continue
+
+        total = time.perf_counter() - start
+        load_time = model_registry.status().get(name, {}).get("load_time_s") or 0.0
+        models[name] = {
+            "ready": True,
+            "load_time_s": round(load_time, 3),
+            "warm_time_s": round(max(total - load_time, 0.0), 3),
+        }
+
+    report = {
+        "hostname": socket.gethostname(),
+        "pid": os.getpid(),
+        "queues": queues,
+        "models": models,
+        "ready": all(model["ready"] for model in models.values()),
+        "ready_at": time.time(),
+        "memory": process_memory(),
+        "thread_budget": current_budget(),
+    }
+    print(f"Worker process {report['pid']} warm for {', '.join(queues) or 'no queues'}: {json.dumps(models)}")
+    return report
+
+
+def _ready_key(hostname: str, pid: int) -> str:
+    return f"{READY_KEY_PREFIX}:{hostname}:{pid}"
+
+
+def _write_readiness(report: Dict):
+    try:
+        get_redis().set(
+            _ready_key(report["hostname"], report["pid"]),
+            json.dumps(report),
+            ex=settings.WORKER_READY_TTL_SECONDS
+        )
+    except Exception as e:
+        print(f"Failed to publish worker readiness: {str(e)}")
+
+
+def _beat(report: Dict, stop: threading.Event):
+    while not stop.wait(settings.WORKER_READY_HEARTBEAT_SECONDS):
+        report["heartbeat_at"] = time.time()
+        _write_readiness(report)
+
+
+def publish_readiness(report: Dict):
+    """
+    Store the report in Redis and keep refreshing it while the process lives
+
+    The key expires WORKER_READY_TTL_SECONDS after the last heartbeat, so a
+    process killed without running its shutdown handler drops out of
+    /health/workers on its own.
+    """
+    global _heartbeat
+
+    report["heartbeat_at"] = time.time()
+    _write_readiness(report)
+
+    with _heartbeat_lock:
+        if _heartbeat is not None and _heartbeat[0] == os.getpid():
+            _heartbeat[1].set()
+        stop = threading.Event()
+        threading.Thread(
+            target=_beat, args=(report, stop), name="worker-readiness-heartbeat", daemon=True
+        ).start()
+        _heartbeat = (os.getpid(), stop)
+
+
+def clear_readiness(hostname: Optional[str] = None, pid: Optional[int] = None):
+    with _heartbeat_lock:
+        if _heartbeat is not None and _heartbeat[0] == os.getpid():
+            _heartbeat[1].set()
+    try:
+        get_redis().delete(_ready_key(hostname or socket.gethostname(), pid or os.getpid()))
+    except Exception as e:
+        print(f"Failed to clear worker readiness: {str(e)}")
+
+
+def worker_readiness() -> List[Dict]:
+    """Readiness reports of all live worker processes"""
+    client = get_redis()
+    reports = []
+    for key in client.scan_iter(match=f"{READY_KEY_PREFIX}:*"):
+        raw = client.get(key)
+        if raw is not None:
+            reports.append(json.loads(raw))
+    return sorted(reports, key=lambda report: (report["hostname"], report["pid"]))
@@ -0,0 +1,22 @@
+import redis
+
+from app.core.config import settings
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Shared Redis client for application data (caches, counters).
+
+    Uses the broker URL and is created on first use, so processes that never
+    touch Redis never open a connection.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+        )
+    return _client
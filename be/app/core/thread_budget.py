@@ -0,0 +1,132 @@
+"""
+CPU thread budget for model inference in worker processes.
+
+Every runtime sizes its thread pool to the host's core count by default, so
+two prefork children on a 2-vCPU host each start 2-thread pools and fight
+over the cores, and the embedding model competes with the detector. The
+budget divides the cores available to the worker between the processes (or
+threads) that run inference at the same time and applies the result to
+OpenMP/BLAS, torch and the detector's runtime.
+"""
+import os
+import sys
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.config import settings
+
+# Read by OpenMP and BLAS libraries when they initialise
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# Model type served by each queue (see task_routes in celery_app)
+QUEUE_MODEL_TYPES = {
+    "fracture_queue": "detector",
+    "document_queue": "embedding",
+}
+
+# Budget applied to this process, empty until apply_thread_budget() runs
+_current: Dict[str, Any] = {}
+
+
+def available_cores() -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 CPU quota"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+
+    return cores
+
+
+def plan_thread_budget(
+    queues: Iterable[str],
+    pool: str,
+    concurrency: int,
+    cores: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Threads per model type for one worker process
+
+    Args:
+        queues: Queues the worker consumes from
+        pool: Celery pool module name (prefork, thread, solo, ...)
+        concurrency: Worker concurrency (children or threads)
+        cores: CPUs to divide (default: WORKER_CPU_CORES or the detected count)
+
+    Returns:
+        Budget with the thread count for each served model type and for torch.
+        The torch setting is process-wide, so all torch models get the
+        smallest of their shares
+    """
+    cores = cores or settings.WORKER_CPU_CORES or available_cores()
+    concurrency = max(1, concurrency)
+    share = max(1, cores // concurrency)
+
+    # Thread-pool workers send every detector call through the batching engine,
+    # which runs one forward pass at a time, so the detector gets all the cores
+    detector = cores if pool in ("thread", "threads") and settings.INFERENCE_MAX_BATCH_SIZE > 1 else share
+    defaults = {
+        "detector": settings.FRACTURE_MODEL_THREADS or detector,
+        "embedding": settings.EMBEDDING_MODEL_THREADS or share,
+    }
+
+    models = {
+        QUEUE_MODEL_TYPES[queue]: defaults[QUEUE_MODEL_TYPES[queue]]
+        for queue in sorted(set(queues)) if queue in QUEUE_MODEL_TYPES
+    }
+
+    torch_models = [
+        model_type for model_type in models
+        if model_type != "detector" or settings.FRACTURE_MODEL_BACKEND == "torch"
+    ]
+    torch_threads = min(models[model_type] for model_type in torch_models) if torch_models else share
+    for model_type in torch_models:
+        models[model_type] = torch_threads
+
+    return {
+        "cores": cores,
+        "pool": pool,
+        "concurrency": concurrency,
+        "models": models,
+        "torch": torch_threads,
+    }
+
+
+def apply_thread_budget(budget: Dict[str, Any]):
+    """
+    Apply a budget to this process
+
+    The environment variables only take effect for libraries that have not
+    initialised yet, so torch is also updated directly if it is already
+    imported. Prefork children inherit both. Detector backends read their
+    thread count through threads_for() when they load.
+    """
+    _current.clear()
+    _current.update(budget)
+
+    threads = str(budget["torch"])
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = threads
+
+    if "torch" in sys.modules:
+        import torch
+
+        torch.set_num_threads(budget["torch"])
+
+    print(f"Thread budget for process {os.getpid()}: {budget}")
+
+
+def threads_for(model_type: str) -> int:
+    """Threads budgeted for a model type in this process, 0 for the runtime default"""
+    return _current.get("models", {}).get(model_type, 0)
+
+
+def current_budget() -> Dict[str, Any]:
+    return dict(_current)
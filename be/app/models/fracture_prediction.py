@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, func, Enum
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, func, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from app.core.database import Base
@@ -13,11 +13,18 @@ class FracturePrediction(Base):
     
     # Image information
     image_filename = Column(String(255), nullable=False)
-    image_path = Column(String(500), nullable=False)
+    # Content-addressed: predictions of the same image share the path (reference count)
+    image_path = Column(String(500), nullable=False, index=True)
     image_size = Column(Integer, nullable=True)
     image_width = Column(Integer, nullable=True)
     image_height = Column(Integer, nullable=True)
     image_format = Column(String(10), nullable=True)
+    image_sha256 = Column(String(64), nullable=True, index=True)
+    # 64-bit DCT perceptual hash, and the predicted image it was found to nearly duplicate at upload
+    image_phash = Column(BigInteger, nullable=True)
+    near_duplicate_of_id = Column(Integer, ForeignKey("fracture_predictions.id", ondelete="SET NULL"), nullable=True)
+    # Content region of the 640x640 letterbox (offset_x, offset_y, content_width, content_height)
+    image_padding = Column(JSONB, nullable=True)
     
     # Overall prediction status
     has_student_predictions = Column(Boolean, default=False)
@@ -29,6 +36,7 @@ class FracturePrediction(Base):
     model_version = Column(String(50), default="YOLOv8")
     ai_inference_time = Column(Float, nullable=True)
     confidence_threshold = Column(Float, default=0.25)
+    ai_candidate_floor = Column(Float, nullable=True)
     ai_max_confidence = Column(Float, nullable=True)
     
     # AI-generated feedback
@@ -42,6 +50,7 @@ class FracturePrediction(Base):
     # Relationships
     user = relationship("User", backref="fracture_predictions")
     detections = relationship("FractureDetection", back_populates="prediction", cascade="all, delete-orphan")
+    near_duplicate_of = relationship("FracturePrediction", remote_side=[id])
 
 class FractureDetection(Base):
     __tablename__ = "fracture_detections"
@@ -77,4 +86,9 @@ class FractureDetection(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    prediction = relationship("FracturePrediction", back_populates="detections")
\ No newline at end of file
+    prediction = relationship("FracturePrediction", back_populates="detections")
+    
+    # AI detections are read back re-thresholded by confidence
+    __table_args__ = (
+        Index("ix_fracture_detections_prediction_source_confidence", "prediction_id", "source", "confidence"),
+    )
\ No newline at end of file
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, func
+from app.core.database import Base
+
+# Stages timed for every AI prediction, in pipeline order
+INFERENCE_STAGES = ("storage_fetch", "decode", "preprocess", "forward", "postprocess", "db_write")
+
+
+class InferenceTelemetry(Base):
+    __tablename__ = "inference_telemetry"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prediction_id = Column(Integer, ForeignKey("fracture_predictions.id", ondelete="SET NULL"), nullable=True, index=True)
+    
+    # Model that produced the detections
+    model_version = Column(String(100), nullable=False, index=True)
+    batch_size = Column(Integer, nullable=True)
+    cache_hit = Column(Boolean, default=False)
+    
+    # Stage timings in milliseconds (null when the stage did not run)
+    storage_fetch_ms = Column(Float, nullable=True)
+    decode_ms = Column(Float, nullable=True)
+    preprocess_ms = Column(Float, nullable=True)
+    forward_ms = Column(Float, nullable=True)
+    postprocess_ms = Column(Float, nullable=True)
+    db_write_ms = Column(Float, nullable=True)
+    total_ms = Column(Float, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -72,7 +72,9 @@ class FracturePredictionOut(BaseModel):
     model_version: str
     ai_inference_time: Optional[float]
     confidence_threshold: float
+    ai_candidate_floor: Optional[float] = None
     ai_max_confidence: Optional[float]
+    near_duplicate_of_id: Optional[int] = None
     created_at: datetime
     student_predictions_at: Optional[datetime]
     ai_predictions_at: Optional[datetime]
@@ -81,6 +83,16 @@ class FracturePredictionOut(BaseModel):
     class Config:
         from_attributes = True
 
+class BatchUploadFailure(BaseModel):
+    filename: str
+    error: str
+
+class BatchImageUploadOut(BaseModel):
+    predictions: List[FracturePredictionOut]
+    failed: List[BatchUploadFailure] = []
+    # Celery task running AI prediction on the whole set, when requested
+    task_id: Optional[str] = None
+
 class DetailedComparisonMetrics(BaseModel):
     """Detailed IoU-based comparison metrics"""
     summary: Dict[str, Any]
@@ -100,6 +112,7 @@ class ComparisonFeedback(BaseModel):
 class PredictionComparison(BaseModel):
     prediction_id: int
     image_filename: str
+    confidence_threshold: Optional[float] = None
     student_detections: List[FractureDetectionOut]
     ai_detections: List[FractureDetectionOut]
     comparison_metrics: dict
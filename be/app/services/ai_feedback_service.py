@@ -1,6 +1,5 @@
-import os
 import base64
-from typing import Dict, List, Optional
+from typing import Dict, List
 from io import BytesIO
 from PIL import Image, ImageDraw
 
@@ -62,15 +61,13 @@ class AIFeedbackService:
     
     def _draw_bounding_boxes(
         self, 
-        image_path: str, 
+        image_bytes: bytes, 
         student_detections: List[FractureDetection],
         ai_detections: List[FractureDetection]
     ) -> Image.Image:
-        """Draw student (blue) and AI (red) bounding boxes on image"""
-        # Load image
-        from app.utils.storage_manager import storage_manager
-        file_content = storage_manager.get_file_bytes(image_path)
-        image = Image.open(BytesIO(file_content)).convert("RGB")
+        """Draw student (blue) and AI (red) bounding boxes on the stored image"""
+        # Stored grayscale X-rays only gain colour channels here, for the boxes
+        image = Image.open(BytesIO(image_bytes)).convert("RGB")
         
         draw = ImageDraw.Draw(image)
         
@@ -190,7 +187,7 @@ Be educational, supportive, and reference specific visual features from the X-ra
     
     def generate_feedback(
         self,
-        image_path: str,
+        image_bytes: bytes,
         student_detections: List[FractureDetection],
         ai_detections: List[FractureDetection],
         comparison_result: Dict
@@ -198,6 +195,8 @@ Be educational, supportive, and reference specific visual features from the X-ra
         """
         Generate AI-powered image analysis feedback
         
+        Blocks on the LLM call; async callers run this in the I/O executor.
+        
         Returns dict with keys: image_analysis, overall, detection_performance, 
         classification_performance, suggestions
         """
@@ -215,7 +214,7 @@ Be educational, supportive, and reference specific visual features from the X-ra
         try:
             # Draw annotated image
             annotated_image = self._draw_bounding_boxes(
-                image_path, student_detections, ai_detections
+                image_bytes, student_detections, ai_detections
             )
             
             # Convert to base64
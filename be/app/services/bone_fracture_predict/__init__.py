@@ -1,3 +1,10 @@
-from .predictor import fracture_predictor, FracturePredictor
+from .predictor import get_fracture_predictor, FracturePredictor, FRACTURE_DETECTOR
+from .batching import inference_engine, BatchInferenceEngine
 
-__all__ = ["fracture_predictor", "FracturePredictor"]
\ No newline at end of file
+__all__ = [
+    "get_fracture_predictor",
+    "FracturePredictor",
+    "FRACTURE_DETECTOR",
+    "inference_engine",
+    "BatchInferenceEngine",
+]
\ No newline at end of file
@@ -0,0 +1,318 @@
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.timing import StageTimer
+
+# Model input resolution and YOLO defaults used by ultralytics at predict time
+INPUT_SIZE = 640
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+PAD_VALUE = 114
+
+BACKEND_FILE_SUFFIXES = {
+    "torch": ".pt",
+    "onnxruntime": ".onnx",
+    "openvino": "_openvino_model",
+}
+
+
+class InferenceBackend:
+    """
+    Runtime used by FracturePredictor to run the detector.
+
+    Backends take RGB uint8 images (H, W, 3) or grayscale ones (H, W), which
+    are expanded to three channels only at the model input, and return one
+    float32 array per image with rows [x_min, y_min, x_max, y_max, confidence, class_id] in the
+    image's own pixel coordinates, after confidence filtering and NMS.
+
+    When a StageTimer is passed, backends add the time of the whole batch
+    to its preprocess, forward and postprocess stages.
+    """
+
+    name = "base"
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        """
+        Args:
+            model_path: Model artifact for this runtime
+            num_threads: Intra-op threads for inference (0: runtime default)
+        """
+        self.model_path = model_path
+        self.num_threads = num_threads
+
+    def load(self):
+        """Load the model artifact"""
+        raise NotImplementedError
+
+    def predict_batch(
+        self,
+        images: List[np.ndarray],
+        confidence_threshold: float,
+        timer: Optional[StageTimer] = None
+    ) -> List[np.ndarray]:
+        """Run detection on a batch of images"""
+        raise NotImplementedError
+
+
+class TorchBackend(InferenceBackend):
+    """Ultralytics YOLO on PyTorch (.pt weights)"""
+
+    name = "torch"
+
+    def load(self):
+        from ultralytics import YOLO
+
+        if self.num_threads:
+            import torch
+
+            # Process-wide: also applies to any other torch model in this process
+            torch.set_num_threads(self.num_threads)
+
+        self.model = YOLO(self.model_path)
+
+        # ultralytics fuses Conv+BN on the first predict, rewriting the weights.
+        # Fusing at load time keeps them unchanged afterwards, so a model loaded
+        # before fork stays shared copy-on-write with the worker children.
+        self.model.fuse()
+        self.model.model.eval().requires_grad_(False)
+
+    def predict_batch(
+        self,
+        images: List[np.ndarray],
+        confidence_threshold: float,
+        timer: Optional[StageTimer] = None
+    ) -> List[np.ndarray]:
+        timer = timer or StageTimer()
+
+        # ultralytics treats numpy sources as BGR
+        results = self.model.predict(
+            [to_rgb(image)[..., ::-1] for image in images],
+            conf=confidence_threshold,
+            verbose=False
+        )
+
+        # ultralytics reports per-image averages; scale back to the whole batch
+        for stage, key in (("preprocess", "preprocess"), ("forward", "inference"), ("postprocess", "postprocess")):
+            timer.add(stage, sum(result.speed.get(key) or 0.0 for result in results))
+
+        outputs = []
+        with timer.stage("postprocess"):
+            for result in results:
+                if result.boxes is None or len(result.boxes) == 0:
+                    outputs.append(np.zeros((0, 6), dtype=np.float32))
+                else:
+                    outputs.append(result.boxes.data.cpu().numpy().astype(np.float32))
+        return outputs
+
+
+class ExportedModelBackend(InferenceBackend):
+    """
+    Shared pre/postprocessing for exported YOLO graphs.
+
+    Reimplements the ultralytics letterbox and NMS in NumPy so the worker does
+    not need to import torch or ultralytics at all.
+    """
+
+    def predict_batch(
+        self,
+        images: List[np.ndarray],
+        confidence_threshold: float,
+        timer: Optional[StageTimer] = None
+    ) -> List[np.ndarray]:
+        timer = timer or StageTimer()
+
+        with timer.stage("preprocess"):
+            tensors, ratio_pads = zip(*(letterbox(image) for image in images))
+            tensors = [to_rgb(tensor) for tensor in tensors]
+            batch = np.ascontiguousarray(np.stack(tensors).transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+        with timer.stage("forward"):
+            raw = self._forward(batch)
+
+        with timer.stage("postprocess"):
+            return [
+                scale_boxes(
+                    non_max_suppression(prediction, confidence_threshold),
+                    ratio_pad,
+                    image.shape[:2]
+                )
+                for prediction, ratio_pad, image in zip(raw, ratio_pads, images)
+            ]
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        """Run the graph on a (B, 3, 640, 640) float32 batch, returning (B, 4 + nc, anchors)"""
+        raise NotImplementedError
+
+
+class OnnxRuntimeBackend(ExportedModelBackend):
+    """ONNX Runtime CPU execution of an exported .onnx graph"""
+
+    name = "onnxruntime"
+
+    def load(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Release activation buffers between calls instead of growing an arena per batch shape
+        options.enable_cpu_mem_arena = False
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            self.model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINOBackend(ExportedModelBackend):
+    """OpenVINO CPU execution of an exported *_openvino_model directory"""
+
+    name = "openvino"
+
+    def load(self):
+        import openvino as ov
+
+        model_file = self.model_path
+        if os.path.isdir(model_file):
+            model_file = next(
+                os.path.join(self.model_path, name)
+                for name in sorted(os.listdir(self.model_path)) if name.endswith(".xml")
+            )
+
+        # Pin f32 so CPUs with bf16 support do not silently lower precision
+        config = {"INFERENCE_PRECISION_HINT": "f32"}
+        if self.num_threads:
+            config["INFERENCE_NUM_THREADS"] = self.num_threads
+
+        core = ov.Core()
+        self.compiled_model = core.compile_model(core.read_model(model_file), "CPU", config)
+        self.output = self.compiled_model.output(0)
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled_model(batch)[self.output]
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenVINOBackend.name: OpenVINOBackend,
+}
+
+
+def create_backend(name: str, model_path: str, num_threads: int = 0) -> InferenceBackend:
+    """Instantiate (without loading) the backend registered under name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Supported: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_path, num_threads)
+
+
+def to_rgb(image: np.ndarray) -> np.ndarray:
+    """Expand a grayscale (H, W) image to (H, W, 3); RGB images are returned as is"""
+    if image.ndim == 2:
+        return np.repeat(image[..., None], 3, axis=2)
+    return image
+
+
+def letterbox(image: np.ndarray, size: int = INPUT_SIZE) -> Tuple[np.ndarray, Tuple[float, Tuple[int, int]]]:
+    """
+    Resize and pad an image to size x size the way ultralytics LetterBox does
+
+    Returns the padded image and (gain, (pad_x, pad_y)) for mapping boxes back.
+    """
+    height, width = image.shape[:2]
+    gain = min(size / height, size / width)
+    new_width, new_height = int(round(width * gain)), int(round(height * gain))
+
+    if (new_width, new_height) != (width, height):
+        import cv2
+
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    dw, dh = (size - new_width) / 2, (size - new_height) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+
+    if top or bottom or left or right:
+        image = np.pad(
+            image,
+            ((top, bottom), (left, right)) + ((0, 0),) * (image.ndim - 2),
+            mode="constant",
+            constant_values=PAD_VALUE
+        )
+
+    return image, (gain, (left, top))
+
+
+def non_max_suppression(
+    prediction: np.ndarray,
+    confidence_threshold: float,
+    iou_threshold: float = IOU_THRESHOLD,
+    max_detections: int = MAX_DETECTIONS,
+    max_wh: int = 7680
+) -> np.ndarray:
+    """
+    Per-class NMS over one raw YOLOv8 output of shape (4 + nc, anchors)
+
+    Mirrors ultralytics.utils.nms.non_max_suppression with agnostic=False and
+    multi_label=False. Returns (N, 6) rows of [x1, y1, x2, y2, conf, cls].
+    """
+    prediction = prediction.T
+    scores = prediction[:, 4:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+
+    keep = confidences > confidence_threshold
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    xywh = prediction[keep, :4]
+    confidences = confidences[keep]
+    class_ids = class_ids[keep]
+
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    # Offset boxes by class so a single NMS pass never suppresses across classes
+    offset_boxes = boxes + class_ids[:, None] * max_wh
+    areas = (offset_boxes[:, 2] - offset_boxes[:, 0]) * (offset_boxes[:, 3] - offset_boxes[:, 1])
+
+    order = confidences.argsort(kind="stable")[::-1]
+    kept = []
+    while order.size and len(kept) < max_detections:
+        i = order[0]
+        kept.append(i)
+
+        rest = order[1:]
+        x1 = np.maximum(offset_boxes[i, 0], offset_boxes[rest, 0])
+        y1 = np.maximum(offset_boxes[i, 1], offset_boxes[rest, 1])
+        x2 = np.minimum(offset_boxes[i, 2], offset_boxes[rest, 2])
+        y2 = np.minimum(offset_boxes[i, 3], offset_boxes[rest, 3])
+        intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = intersection / (areas[i] + areas[rest] - intersection + 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    kept = np.array(kept)
+    return np.concatenate(
+        [boxes[kept], confidences[kept, None], class_ids[kept, None].astype(np.float32)],
+        axis=1
+    ).astype(np.float32)
+
+
+def scale_boxes(detections: np.ndarray, ratio_pad: Tuple[float, Tuple[int, int]], image_shape: Tuple[int, int]) -> np.ndarray:
+    """Map letterboxed box coordinates back onto the original image and clip"""
+    gain, (pad_x, pad_y) = ratio_pad
+    height, width = image_shape
+
+    detections[:, [0, 2]] = ((detections[:, [0, 2]] - pad_x) / gain).clip(0, width)
+    detections[:, [1, 3]] = ((detections[:, [1, 3]] - pad_y) / gain).clip(0, height)
+    return detections
@@ -0,0 +1,164 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any, Tuple, Optional, Union
+
+import numpy as np
+
+from app.core.config import settings
+from .predictor import FracturePredictor, get_fracture_predictor
+
+
+class BatchInferenceEngine:
+    """
+    Micro-batching front end for FracturePredictor.
+
+    Callers submit single images and block on a future. A background thread
+    collects pending requests until either max_batch_size images are queued or
+    max_wait_ms has passed since the first one arrived, runs them through the
+    model as one batch and hands each result back to its caller. If the
+    batch fails, each image is retried on its own, so only the callers whose
+    image fails get the exception.
+
+    Batches only form across tasks that share a process, i.e. a fracture
+    worker started with a thread pool (--pool=threads). Under prefork every
+    child sees one task at a time, so workers set max_batch_size from
+    inference_batch_size() and such children run each image inline.
+    """
+
+    def __init__(
+        self,
+        predictor: Optional[FracturePredictor] = None,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0
+    ):
+        """
+        Initialize the engine
+
+        Args:
+            predictor: Predictor used to run the batched forward pass
+                (default: the registry's shared predictor, loaded on first use)
+            max_batch_size: Maximum number of images per forward pass
+            max_wait_ms: Maximum time to wait for a batch to fill up
+        """
+        self._predictor = predictor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: "queue.Queue[Tuple[bytes, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def predictor(self) -> FracturePredictor:
+        return self._predictor or get_fracture_predictor()
+
+    def submit(self, image_bytes: Union[bytes, np.ndarray]) -> Future:
+        """
+        Queue an image (encoded bytes or a model-ready RGB array) for
+        prediction and return a future for its result
+        """
+        future = Future()
+
+        if self.max_batch_size == 1:
+            # Nothing to batch, run inline
+            try:
+                future.set_result(self.predictor.predict(image_bytes))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_started()
+        self._queue.put((image_bytes, future))
+        return future
+
+    def predict(self, image_bytes: Union[bytes, np.ndarray], timeout: float = None) -> Dict[str, Any]:
+        """
+        Run prediction on image bytes, batched with concurrent callers
+        """
+        return self.submit(image_bytes).result(timeout=timeout)
+
+    def _ensure_started(self):
+        """Start the collector thread (again, if we are in a forked child)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+
+            if self._pid != os.getpid():
+                # Threads and queued work do not survive a fork
+                self._queue = queue.Queue()
+
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="fracture-batch-inference",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _collect_batch(self) -> List[Tuple[bytes, Future]]:
+        """Block for the first request, then gather more until full or timed out"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Collector loop"""
+        while True:
+            batch = self._collect_batch()
+
+            # Skip callers that gave up while waiting
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            if len(batch) > 1:
+                try:
+                    results = self._predict(batch)
+                except Exception:
+                    # One bad image must not fail the callers batched with it
+                    for request in batch:
+                        self._run_alone(request)
+                    continue
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            else:
+                self._run_alone(batch[0])
+
+    def _predict(self, batch: List[Tuple[bytes, Future]]) -> List[Dict[str, Any]]:
+        """One forward pass over the batch, with one result per request"""
+        results = self.predictor.predict_batch([image for image, _ in batch])
+        if len(results) != len(batch):
+            raise RuntimeError(f"Batch of {len(batch)} images returned {len(results)} results")
+        return results
+
+    def _run_alone(self, request: Tuple[bytes, Future]):
+        future = request[1]
+        try:
+            future.set_result(self._predict([request])[0])
+        except Exception as e:
+            future.set_exception(e)
+
+
+def inference_batch_size(pool: str) -> int:
+    """Batch size for a Celery pool: only thread pools run tasks side by side in one process"""
+    return settings.INFERENCE_MAX_BATCH_SIZE if pool in ("thread", "threads") else 1
+
+
+inference_engine = BatchInferenceEngine(
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+)
@@ -0,0 +1,62 @@
+"""
+Export the PyTorch fracture model for the ONNX Runtime / OpenVINO backends.
+
+Usage (from be/):
+    python -m app.services.bone_fracture_predict.export --backend onnxruntime
+    python -m app.services.bone_fracture_predict.export --backend openvino --model path/to/fracture_model.pt
+"""
+import argparse
+import os
+
+from .backends import INPUT_SIZE
+
+# ultralytics export format for each exported backend
+EXPORT_FORMATS = {
+    "onnxruntime": "onnx",
+    "openvino": "openvino",
+}
+
+
+def export_model(model_path: str, backend: str, dynamic: bool = True) -> str:
+    """
+    Export a .pt model to the artifact the given backend loads
+
+    The artifact is written next to the .pt file, where default_model_path
+    expects it. Dynamic batch is enabled by default so the exported graph can
+    serve the batching engine.
+
+    Returns:
+        Path of the exported file (onnx) or directory (openvino)
+    """
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(f"Backend '{backend}' has no export step. Supported: {', '.join(EXPORT_FORMATS)}")
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model not found: {model_path}")
+
+    from ultralytics import YOLO
+
+    exported_path = YOLO(model_path).export(
+        format=EXPORT_FORMATS[backend],
+        imgsz=INPUT_SIZE,
+        dynamic=dynamic,
+        half=False
+    )
+    return str(exported_path)
+
+
+def main():
+    from .predictor import default_model_path
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", required=True, choices=sorted(EXPORT_FORMATS))
+    parser.add_argument("--model", default=default_model_path("torch"))
+    parser.add_argument("--static", action="store_true", help="Export with a fixed batch size of 1")
+    args = parser.parse_args()
+
+    exported_path = export_model(args.model, args.backend, dynamic=not args.static)
+    print(f"Exported {args.model} for {args.backend}: {exported_path}")
+
+
+if __name__ == "__main__":
+    main()
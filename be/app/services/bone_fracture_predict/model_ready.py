@@ -0,0 +1,95 @@
+"""
+Model-ready copies of stored fracture images.
+
+Uploaded images are already letterboxed to 640x640 by resize_image_to_640,
+so the only work left before the forward pass is JPEG decoding. Grayscale
+images stay single-channel (640x640) here and are expanded to RGB by the
+backend at the model input. The decoded pixels are cached once as a .npy file named after
+the image's SHA-256 and memory-mapped on later predictions, skipping the
+storage download and the decode entirely.
+
+The copies live in a DiskLRUCache of MODEL_READY_CACHE_MAX_BYTES, so the
+least recently predicted images are evicted instead of filling the disk.
+"""
+import io
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.utils.disk_cache import DiskLRUCache
+from .backends import INPUT_SIZE
+
+MODEL_READY_SHAPE = (INPUT_SIZE, INPUT_SIZE, 3)
+MODEL_READY_GRAYSCALE_SHAPE = (INPUT_SIZE, INPUT_SIZE)
+
+_cache: Optional[DiskLRUCache] = None
+
+
+def model_ready_cache() -> DiskLRUCache:
+    """The cache of model-ready copies, as currently configured; one per process, so its counters add up"""
+    global _cache
+    directory, max_bytes, enabled = (
+        settings.MODEL_READY_CACHE_DIR,
+        settings.MODEL_READY_CACHE_MAX_BYTES,
+        settings.MODEL_READY_CACHE_ENABLED
+    )
+    if _cache is None or (_cache.directory, _cache.max_bytes, _cache.enabled) != (directory, max_bytes, enabled):
+        _cache = DiskLRUCache(directory, max_bytes, enabled=enabled)
+    return _cache
+
+
+def decode_model_ready(image_bytes: bytes) -> Optional[np.ndarray]:
+    """
+    Decode stored image bytes into a contiguous uint8 array
+
+    Grayscale images decode to (640, 640), everything else to (640, 640, 3).
+
+    Returns None when the image is not already model-sized, so callers fall
+    back to the regular decode and letterbox path.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        if image.size != MODEL_READY_SHAPE[:2]:
+            return None
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        return np.ascontiguousarray(np.asarray(image))
+
+
+def save_model_ready(image_sha256: str, image: Optional[np.ndarray]) -> bool:
+    """Cache the array of a stored image; best effort, False if nothing was cached"""
+    if not settings.MODEL_READY_CACHE_ENABLED or not image_sha256 or image is None:
+        return False
+
+    buffer = io.BytesIO()
+    np.save(buffer, image, allow_pickle=False)
+    model_ready_cache().put(image_sha256, buffer.getvalue())
+    return True
+
+
+def delete_model_ready(image_sha256: str) -> None:
+    """Remove the cached array of a deleted image; best effort"""
+    model_ready_cache().discard(image_sha256)
+
+
+def load_model_ready(image_sha256: str) -> Optional[np.ndarray]:
+    """Memory-map the cached array, or None if it is missing or unusable"""
+    if not settings.MODEL_READY_CACHE_ENABLED or not image_sha256:
+        return None
+
+    path = model_ready_cache().path(image_sha256)
+    if path is None:
+        return None
+
+    try:
+        image = np.load(path, mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError) as e:
+        # Evicted since the lookup, or damaged
+        if not isinstance(e, FileNotFoundError):
+            print(f"Warning: Ignoring unreadable model-ready image {path}: {str(e)}")
+        return None
+
+    if image.shape not in (MODEL_READY_SHAPE, MODEL_READY_GRAYSCALE_SHAPE) or image.dtype != np.uint8:
+        return None
+    return image
@@ -0,0 +1,190 @@
+"""
+Near-duplicate lookup over the perceptual hashes of stored images.
+
+Exact content hashes miss the same radiograph re-saved, slightly re-cropped
+or screenshot. Uploads also record a 64-bit DCT perceptual hash
+(image_utils.perceptual_hash) in fracture_predictions.image_phash, and this
+index finds already-predicted images within a small Hamming distance of a
+new upload, so its AI detections and feedback can be reused.
+
+The hashes are held in a multi-index hash table (Norouzi et al.): each hash
+is split into m = r // 2 + 1 disjoint bit ranges with one table per range.
+A hash within distance r of the query differs in at most one bit on at
+least one range (pigeonhole), so a lookup probes each range's bucket and
+its one-bit neighbours and only compares against the entries found there.
+Wide ranges keep the buckets small even though X-ray hashes are clustered.
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.fracture_prediction import FracturePrediction
+
+HASH_BITS = 64
+
+# Predictions checked against the database per lookup, nearest first
+MAX_CANDIDATES = 50
+
+
+def to_unsigned(phash: int) -> int:
+    """Stored (signed BigInteger) hash as an unsigned 64-bit value"""
+    return phash & ((1 << HASH_BITS) - 1)
+
+
+class MultiIndexHash:
+    """In-memory multi-index hash table of 64-bit hashes keyed by item id"""
+
+    def __init__(self, max_distance: int):
+        """
+        Args:
+            max_distance: Largest Hamming distance search() has to find
+        """
+        self.max_distance = max_distance
+
+        # m ranges, each searched within sub_radius bits: m * (sub_radius + 1) > max_distance
+        chunks = max_distance // 2 + 1
+        self.sub_radius = min(1, max_distance)
+        widths = [HASH_BITS // chunks + (1 if i < HASH_BITS % chunks else 0) for i in range(chunks)]
+        self._ranges = []
+        shift = 0
+        for width in widths:
+            self._ranges.append((shift, (1 << width) - 1))
+            shift += width
+
+        # Bucket keys to probe around a query's key: itself and its one-bit neighbours
+        self._probes = [
+            [0] + ([1 << bit for bit in range(width)] if self.sub_radius else [])
+            for width in widths
+        ]
+
+        self._tables: List[Dict[int, Set[int]]] = [defaultdict(set) for _ in self._ranges]
+        self._hashes: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, item_id: int, phash: int):
+        phash = to_unsigned(phash)
+        self.remove(item_id)
+        self._hashes[item_id] = phash
+        for table, (shift, mask) in zip(self._tables, self._ranges):
+            table[(phash >> shift) & mask].add(item_id)
+
+    def remove(self, item_id: int):
+        phash = self._hashes.pop(item_id, None)
+        if phash is None:
+            return
+        for table, (shift, mask) in zip(self._tables, self._ranges):
+            bucket = table[(phash >> shift) & mask]
+            bucket.discard(item_id)
+
+    def search(self, phash: int, max_distance: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(distance, item_id) of every hash within max_distance, nearest first"""
+        phash = to_unsigned(phash)
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+
+        candidates = set()
+        for table, (shift, mask), probes in zip(self._tables, self._ranges, self._probes):
+            key = (phash >> shift) & mask
+            for probe in probes:
+                bucket = table.get(key ^ probe)
+                if bucket:
+                    candidates.update(bucket)
+
+        matches = []
+        for item_id in candidates:
+            distance = (self._hashes[item_id] ^ phash).bit_count()
+            if distance <= max_distance:
+                matches.append((distance, item_id))
+        matches.sort()
+        return matches
+
+
+class NearDuplicateIndex:
+    """
+    Process-wide near-duplicate index of prediction images, backed by Postgres.
+
+    Loaded on first use from fracture_predictions.image_phash, then topped up
+    with rows inserted by other processes at most every refresh_seconds.
+    Records deleted since loading are filtered out by the database check on
+    every lookup.
+    """
+
+    def __init__(self, max_distance: int = 6, refresh_seconds: float = 30.0, enabled: bool = True):
+        """
+        Initialize the index
+
+        Args:
+            max_distance: Largest Hamming distance treated as the same image
+            refresh_seconds: How often to load rows added by other processes
+            enabled: When False find() never matches and nothing is loaded
+        """
+        self.max_distance = max_distance
+        self.refresh_seconds = refresh_seconds
+        self.enabled = enabled
+
+        self._index = MultiIndexHash(max_distance)
+        self._lock = threading.Lock()
+        self._max_loaded_id = 0
+        self._refreshed_at = 0.0
+
+    def _refresh(self, db: Session):
+        """Load hashes of predictions newer than the last one loaded"""
+        if time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+
+        rows = db.query(FracturePrediction.id, FracturePrediction.image_phash).filter(
+            FracturePrediction.id > self._max_loaded_id,
+            FracturePrediction.image_phash.isnot(None)
+        ).all()
+
+        with self._lock:
+            for prediction_id, phash in rows:
+                self._index.add(prediction_id, phash)
+                self._max_loaded_id = max(self._max_loaded_id, prediction_id)
+            self._refreshed_at = time.monotonic()
+
+    def add(self, prediction_id: int, phash: Optional[int]):
+        """Index a newly committed prediction"""
+        if not self.enabled or phash is None:
+            return
+        with self._lock:
+            self._index.add(prediction_id, phash)
+
+    def find(self, db: Session, phash: Optional[int]) -> Optional[Tuple[int, int]]:
+        """
+        Nearest already-predicted image within max_distance
+
+        Returns (prediction_id, distance), or None when there is none.
+        """
+        if not self.enabled or phash is None:
+            return None
+
+        self._refresh(db)
+        with self._lock:
+            matches = self._index.search(phash)[:MAX_CANDIDATES]
+        if not matches:
+            return None
+
+        # Only images the model has already run on are worth pointing at
+        predicted = {
+            prediction_id for (prediction_id,) in db.query(FracturePrediction.id).filter(
+                FracturePrediction.id.in_([item_id for _, item_id in matches]),
+                FracturePrediction.ai_predictions_at.isnot(None)
+            )
+        }
+        for distance, prediction_id in matches:
+            if prediction_id in predicted:
+                return prediction_id, distance
+        return None
+
+
+near_duplicate_index = NearDuplicateIndex(
+    max_distance=settings.NEAR_DUPLICATE_MAX_DISTANCE,
+    refresh_seconds=settings.NEAR_DUPLICATE_REFRESH_SECONDS,
+    enabled=settings.NEAR_DUPLICATE_ENABLED
+)
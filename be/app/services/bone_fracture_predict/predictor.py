@@ -1,10 +1,15 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import numpy as np
 from PIL import Image
 import io
-from ultralytics import YOLO
 import os
 
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.thread_budget import threads_for
+from app.utils.timing import StageTimer
+from .backends import create_backend, BACKEND_FILE_SUFFIXES
+
 # Model class mapping
 CLASS_TO_FRACTURE_TYPE = {
     0: "comminuted",
@@ -14,104 +19,206 @@ CLASS_TO_FRACTURE_TYPE = {
     4: "transverse"
 }
 
+# Fracture type per class id, indexed with the model's class id array
+FRACTURE_TYPE_LOOKUP = np.array(
+    [CLASS_TO_FRACTURE_TYPE.get(class_id) for class_id in range(max(CLASS_TO_FRACTURE_TYPE) + 1)],
+    dtype=object
+)
+
+# Fields of the columnar detections returned by FracturePredictor
+BOX_COLUMNS = ("x_min", "y_min", "x_max", "y_max", "width", "height")
+DETECTION_COLUMNS = ("class_id", "confidence", "fracture_type") + BOX_COLUMNS
+
 class FracturePredictor:
     """Service for running bone fracture predictions"""
     
-    def __init__(self, model_path: str = None, confidence_threshold: float = 0.25):
+    def __init__(
+        self,
+        model_path: str = None,
+        confidence_threshold: float = 0.25,
+        backend: str = "torch",
+        num_threads: int = 0
+    ):
         """
         Initialize the predictor
+        
+        Args:
+            model_path: Path to the model artifact for the chosen backend
+            confidence_threshold: Minimum confidence for a detection
+            backend: Runtime name, one of backends.BACKENDS
+            num_threads: Inference threads (0: runtime default)
         """
         self.model_path = model_path
         self.confidence_threshold = confidence_threshold
-        self.model = None
+        self.backend_name = backend
+        self.num_threads = num_threads
+        self.backend = None
         
         # Load model if path provided
         if model_path:
             self._load_model()
     
     def _load_model(self):
-        """Load the YOLO model"""
+        """Load the model with the configured backend"""
         try:
-            self.model = YOLO(self.model_path)
-            print(f"Fracture detection model loaded from {self.model_path}")
+            backend = create_backend(self.backend_name, self.model_path, self.num_threads)
+            backend.load()
+            self.backend = backend
+            print(f"Fracture detection model loaded from {self.model_path} ({self.backend_name})")
         except Exception as e:
             print(f"Failed to load model: {e}")
-            self.model = None
+            self.backend = None
     
-    def predict(self, image_bytes: bytes) -> Dict[str, Any]:
+    def predict(self, image_bytes: Union[bytes, np.ndarray]) -> Dict[str, Any]:
         """
         Run prediction on image bytes
         """
-        if self.model is None:
+        return self.predict_batch([image_bytes])[0]
+    
+    def predict_batch(self, images: List[Union[bytes, np.ndarray]]) -> List[Dict[str, Any]]:
+        """
+        Run prediction on several images in a single batched forward pass
+        
+        Images are encoded bytes, or already decoded RGB or grayscale uint8 arrays
+        (e.g. memory-mapped model-ready copies), which skip decoding.
+        
+        Each result carries the batch's stage timings in milliseconds under
+        "timings" (decode, preprocess, forward, postprocess), the batch size
+        and the total model time in seconds as "inference_time".
+        """
+        if self.backend is None:
             raise ValueError("Model not loaded. Cannot run predictions.")
         
-        # Load image
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Run inference
-        results = self.model.predict(
-            image,
-            conf=self.confidence_threshold,
-            verbose=False
-        )
-        
-        # Process results
-        detections = []
-        max_confidence = 0.0
-        
-        if len(results) > 0:
-            result = results[0]
-            
-            if result.boxes is not None and len(result.boxes) > 0:
-                boxes = result.boxes.xyxy.cpu().numpy()  # [x_min, y_min, x_max, y_max]
-                confidences = result.boxes.conf.cpu().numpy()
-                class_ids = result.boxes.cls.cpu().numpy().astype(int)
+        if not images:
+            return []
+        
+        timer = StageTimer()
+        
+        # Load images as RGB or grayscale arrays
+        arrays = []
+        with timer.stage("decode"):
+            for image_input in images:
+                # Model-ready arrays need no decoding
+                if isinstance(image_input, np.ndarray):
+                    arrays.append(image_input)
+                    continue
+                
+                image = Image.open(io.BytesIO(image_input))
+                
+                # Grayscale stays single-channel; the backend expands it
+                if image.mode not in ('L', 'RGB'):
+                    image = image.convert('RGB')
                 
-                for box, conf, class_id in zip(boxes, confidences, class_ids):
-                    x_min, y_min, x_max, y_max = box
-                    width = int(x_max - x_min)
-                    height = int(y_max - y_min)
-                    
-                    # Map class_id to fracture_type
-                    fracture_type = CLASS_TO_FRACTURE_TYPE.get(class_id, None)
-                    
-                    detection = {
-                        "class_id": int(class_id),
-                        "class_name": "fracture",
-                        "confidence": float(conf),
-                        "fracture_type": fracture_type,
-                        "bounding_box": {
-                            "x_min": int(x_min),
-                            "y_min": int(y_min),
-                            "x_max": int(x_max),
-                            "y_max": int(y_max),
-                            "width": width,
-                            "height": height
-                        }
-                    }
-                    
-                    detections.append(detection)
-                    max_confidence = max(max_confidence, float(conf))
+                arrays.append(np.asarray(image))
+        
+        # Run inference as one batch
+        outputs = self.backend.predict_batch(arrays, self.confidence_threshold, timer)
+        
+        with timer.stage("postprocess"):
+            results = [self._process_result(output) for output in outputs]
+        
+        for result in results:
+            result["timings"] = dict(timer.timings)
+            result["batch_size"] = len(images)
+            result["inference_time"] = timer.total() / 1000
+        
+        return results
+    
+    def _process_result(self, output: np.ndarray) -> Dict[str, Any]:
+        """
+        Convert backend output rows [x_min, y_min, x_max, y_max, conf, class_id] into the prediction dict
+        
+        Detections are columnar: one NumPy array per field (see DETECTION_COLUMNS),
+        ordered by descending confidence.
+        """
+        class_ids = output[:, 5].astype(np.int64)
+        confidences = output[:, 4]
+        
+        # Map class ids to fracture types in one lookup; unknown ids map to None
+        known = (class_ids >= 0) & (class_ids < len(FRACTURE_TYPE_LOOKUP))
+        fracture_types = np.full(len(output), None, dtype=object)
+        fracture_types[known] = FRACTURE_TYPE_LOOKUP[class_ids[known]]
+        
+        # Truncate like int() did; boxes are clipped to the image, so never negative
+        corners = output[:, :4].astype(np.int32)
+        
+        detections = {
+            "class_id": class_ids,
+            "confidence": confidences,
+            "fracture_type": fracture_types,
+            "x_min": corners[:, 0],
+            "y_min": corners[:, 1],
+            "x_max": corners[:, 2],
+            "y_max": corners[:, 3],
+            "width": (output[:, 2] - output[:, 0]).astype(np.int32),
+            "height": (output[:, 3] - output[:, 1]).astype(np.int32),
+        }
         
         return {
-            "has_fracture": len(detections) > 0,
-            "detection_count": len(detections),
-            "max_confidence": max_confidence if len(detections) > 0 else None,
-            "detections": detections,
-            "inference_time": 0.0
+            "has_fracture": len(output) > 0,
+            "detection_count": len(output),
+            "max_confidence": float(confidences.max()) if len(output) > 0 else None,
+            "detections": detections
         }
 
 
+def detections_to_records(detections: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Columnar detections as a list of per-box dicts (class_id, confidence, fracture_type, bounding_box)"""
+    columns = {name: np.asarray(detections[name]).tolist() for name in DETECTION_COLUMNS}
+    
+    return [
+        {
+            "class_id": row["class_id"],
+            "class_name": "fracture",
+            "confidence": row["confidence"],
+            "fracture_type": row["fracture_type"],
+            "bounding_box": {name: row[name] for name in BOX_COLUMNS}
+        }
+        for row in (dict(zip(columns, values)) for values in zip(*columns.values()))
+    ]
+
+
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
-fracture_predictor = FracturePredictor(
-    model_path=os.path.join(current_dir, "fracture_model.pt"),
-    confidence_threshold=0.25
-)
+
+def default_model_path(backend: str, int8: bool = False) -> str:
+    """Location of the bundled model artifact for a backend"""
+    if int8:
+        if backend != "onnxruntime":
+            raise ValueError("INT8 fracture models are only supported on the onnxruntime backend")
+        return os.path.join(current_dir, "fracture_model.int8.onnx")
+    
+    return os.path.join(current_dir, "fracture_model" + BACKEND_FILE_SUFFIXES.get(backend, ".pt"))
+
+
+FRACTURE_DETECTOR = "fracture_detector"
+
+
+def current_model_version() -> str:
+    """Identifier of the configured model and runtime, used to key cached results"""
+    runtime = settings.FRACTURE_MODEL_BACKEND + ("-int8" if settings.FRACTURE_MODEL_INT8 else "")
+    return f"{settings.FRACTURE_MODEL_VERSION}/{runtime}"
+
+
+def _load_fracture_predictor() -> FracturePredictor:
+    """Build the configured predictor; only runs in processes that do inference"""
+    return FracturePredictor(
+        model_path=settings.FRACTURE_MODEL_PATH or default_model_path(
+            settings.FRACTURE_MODEL_BACKEND, settings.FRACTURE_MODEL_INT8
+        ),
+        # Keep every candidate above the floor; display thresholds are applied when reading
+        confidence_threshold=settings.FRACTURE_CANDIDATE_FLOOR,
+        backend=settings.FRACTURE_MODEL_BACKEND,
+        num_threads=threads_for("detector")
+    )
+
+
+model_registry.register(FRACTURE_DETECTOR, _load_fracture_predictor)
+
+
+def get_fracture_predictor() -> FracturePredictor:
+    """Shared predictor for this process, loaded on first call"""
+    return model_registry.get(FRACTURE_DETECTOR)
 
 # Testing predictions
 # if __name__ == "__main__":
@@ -0,0 +1,260 @@
+"""
+Static INT8 post-training quantization of the exported fracture model.
+
+Calibrates on a folder of stored 640x640 letterboxed images (the output of
+resize_image_to_640), writes a QDQ-quantized ONNX model and reports latency,
+model size and detection agreement against the FP32 model.
+
+Usage (from be/):
+    python -m app.services.bone_fracture_predict.export --backend onnxruntime
+    python -m app.services.bone_fracture_predict.quantization --calibration-dir uploads/fracture_images
+"""
+import argparse
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from .backends import OnnxRuntimeBackend, letterbox
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
+
+
+def list_images(image_dir: str, limit: Optional[int] = None) -> List[str]:
+    """
+    Image files in a folder and its subfolders, sorted for reproducible calibration
+
+    Stored images are content-addressed under sha256/<ab>/, so the walk is recursive.
+    """
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(image_dir)
+        for name in names
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def load_rgb(path: str) -> np.ndarray:
+    """Decode an image file into an RGB uint8 array"""
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def _calibration_reader(input_name: str, image_paths: List[str]):
+    """Feed letterboxed, normalized images to the ORT calibrator one at a time"""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class FolderCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(image_paths)
+
+        def get_next(self):
+            path = next(self._paths, None)
+            if path is None:
+                return None
+            image, _ = letterbox(load_rgb(path))
+            tensor = image.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {input_name: tensor}
+
+    return FolderCalibrationReader()
+
+
+def _head_postprocess_nodes(model_path: str) -> List[str]:
+    """
+    Non-conv nodes of the Detect head (DFL decode, concat, sigmoid)
+
+    Box decoding is sensitive to INT8 rounding and cheap to run in float, so
+    these nodes are left unquantized.
+    """
+    import onnx
+
+    graph = onnx.load(model_path).graph
+    pattern = re.compile(r"^/model\.(\d+)/")
+    indices = [int(match.group(1)) for node in graph.node if (match := pattern.match(node.name))]
+    if not indices:
+        return []
+
+    head_prefix = f"/model.{max(indices)}/"
+    return [node.name for node in graph.node if node.name.startswith(head_prefix) and node.op_type != "Conv"]
+
+
+def quantize_model(
+    fp32_path: str,
+    calibration_dir: str,
+    output_path: Optional[str] = None,
+    max_images: int = 200
+) -> str:
+    """
+    Quantize an FP32 ONNX model to INT8 with static calibration
+
+    Args:
+        fp32_path: Exported FP32 .onnx model
+        calibration_dir: Folder of representative stored images
+        output_path: Where to write the INT8 model (default: <name>.int8.onnx)
+        max_images: Maximum number of calibration images to use
+
+    Returns:
+        Path of the quantized model
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    image_paths = list_images(calibration_dir, max_images)
+    if not image_paths:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    output_path = output_path or os.path.splitext(fp32_path)[0] + ".int8.onnx"
+    preprocessed_path = os.path.splitext(output_path)[0] + ".pre.onnx"
+
+    try:
+        quant_pre_process(fp32_path, preprocessed_path, skip_symbolic_shape=True)
+
+        input_name = ort.InferenceSession(
+            preprocessed_path, providers=["CPUExecutionProvider"]
+        ).get_inputs()[0].name
+
+        quantize_static(
+            preprocessed_path,
+            output_path,
+            _calibration_reader(input_name, image_paths),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=_head_postprocess_nodes(preprocessed_path)
+        )
+    finally:
+        if os.path.exists(preprocessed_path):
+            os.remove(preprocessed_path)
+
+    return output_path
+
+
+def _match_detections(reference: np.ndarray, candidate: np.ndarray, iou_threshold: float) -> List[Dict]:
+    """Greedily pair candidate boxes with reference boxes by IoU, like ComparisonService"""
+    from app.services.annotation_comparision import ComparisonService
+
+    def as_box(row):
+        return {"x_min": row[0], "y_min": row[1], "x_max": row[2], "y_max": row[3]}
+
+    matches = []
+    used = set()
+    for ref_row in reference[np.argsort(-reference[:, 4])]:
+        best_index, best_iou = None, 0.0
+        for index, cand_row in enumerate(candidate):
+            if index in used:
+                continue
+            iou = ComparisonService.calculate_iou(as_box(ref_row), as_box(cand_row))
+            if iou > best_iou:
+                best_index, best_iou = index, iou
+
+        if best_index is not None and best_iou >= iou_threshold:
+            used.add(best_index)
+            matches.append({
+                "iou": best_iou,
+                "class_match": int(ref_row[5]) == int(candidate[best_index][5]),
+                "confidence_delta": float(candidate[best_index][4] - ref_row[4]),
+            })
+    return matches
+
+
+def build_report(
+    fp32_path: str,
+    int8_path: str,
+    image_dir: str,
+    confidence_threshold: float = 0.25,
+    iou_threshold: float = 0.5,
+    max_images: int = 100
+) -> Dict:
+    """
+    Compare an INT8 model with its FP32 source on stored images
+
+    Reports model size, median/p95 per-image latency and how many FP32
+    detections the INT8 model reproduces (IoU-matched, same class).
+    """
+    image_paths = list_images(image_dir, max_images)
+    if not image_paths:
+        raise ValueError(f"No evaluation images found in {image_dir}")
+
+    images = [load_rgb(path) for path in image_paths]
+
+    report = {"images": len(images), "confidence_threshold": confidence_threshold, "iou_threshold": iou_threshold}
+    outputs = {}
+    for label, path in (("fp32", fp32_path), ("int8", int8_path)):
+        backend = OnnxRuntimeBackend(path)
+        backend.load()
+        backend.predict_batch(images[:1], confidence_threshold)
+
+        timings = []
+        outputs[label] = []
+        for image in images:
+            start = time.perf_counter()
+            outputs[label].append(backend.predict_batch([image], confidence_threshold)[0])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        report[label] = {
+            "path": path,
+            "size_mb": round(os.path.getsize(path) / 2**20, 2),
+            "latency_p50_ms": round(float(np.percentile(timings, 50)), 2),
+            "latency_p95_ms": round(float(np.percentile(timings, 95)), 2),
+            "detections": int(sum(len(output) for output in outputs[label])),
+        }
+
+    report["agreement"] = _agreement(outputs["fp32"], outputs["int8"], iou_threshold)
+    report["speedup"] = round(report["fp32"]["latency_p50_ms"] / report["int8"]["latency_p50_ms"], 2)
+    report["size_ratio"] = round(report["int8"]["size_mb"] / report["fp32"]["size_mb"], 2)
+
+    return report
+
+
+def _agreement(references: List[np.ndarray], candidates: List[np.ndarray], iou_threshold: float) -> Dict:
+    """How many reference detections the candidate outputs reproduce, per image (IoU-matched, same class)"""
+    matches = []
+    for reference, candidate in zip(references, candidates):
+        matches.extend(_match_detections(reference, candidate, iou_threshold))
+
+    fp32_count = sum(len(reference) for reference in references)
+    int8_count = sum(len(candidate) for candidate in candidates)
+    class_matches = [match for match in matches if match["class_match"]]
+    return {
+        "matched": len(matches),
+        "recall": round(len(class_matches) / fp32_count, 4) if fp32_count else 1.0,
+        "precision": round(len(class_matches) / int8_count, 4) if int8_count else 1.0,
+        "mean_iou": round(float(np.mean([match["iou"] for match in matches])), 4) if matches else None,
+        "class_agreement": round(len(class_matches) / len(matches), 4) if matches else None,
+        "mean_confidence_delta": round(float(np.mean([match["confidence_delta"] for match in matches])), 4) if matches else None,
+    }
+
+
+def main():
+    from .predictor import default_model_path
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=default_model_path("onnxruntime"), help="FP32 .onnx model")
+    parser.add_argument("--calibration-dir", required=True)
+    parser.add_argument("--eval-dir", default=None, help="Images for the report (default: calibration dir)")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--max-images", type=int, default=200)
+    parser.add_argument("--report", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    int8_path = quantize_model(args.model, args.calibration_dir, args.output, args.max_images)
+    print(f"Quantized model written to {int8_path}")
+
+    report = build_report(args.model, int8_path, args.eval_dir or args.calibration_dir)
+    print(json.dumps(report, indent=2))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
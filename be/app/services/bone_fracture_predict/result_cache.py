@@ -0,0 +1,270 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+KEY_PREFIX = "inference_cache"
+INDEX_KEY = f"{KEY_PREFIX}:index"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+
+# Bumped whenever the layout of cached prediction results changes (2: columnar detections)
+RESULT_FORMAT_VERSION = 2
+
+# How long to stop trying Redis after a connection error
+REDIS_RETRY_SECONDS = 30
+
+# Counters are added up in each process and sent to the shared stats hash at most this often
+STATS_FLUSH_SECONDS = 10.0
+
+
+def _to_json(value: Any):
+    """NumPy arrays and scalars (columnar detections) as plain JSON values"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class InferenceResultCache:
+    """
+    Two-level cache of raw detections keyed by image content.
+
+    Keys combine the image SHA-256, the model version and the confidence
+    threshold, so a new model or threshold never serves stale detections.
+    A per-process LRU sits in front of Redis, which is shared by all workers.
+    Both levels expire entries after ttl_seconds and evict the oldest entries
+    beyond their size limit.
+
+    Values read back from Redis hold lists where the stored result had
+    NumPy arrays.
+
+    Redis is best effort: if it is unreachable the cache degrades to the
+    local LRU instead of failing the prediction.
+
+    Lookups never wait on Redis for their counters: each process adds them
+    up and sends them in one pipeline with the next store, or after
+    STATS_FLUSH_SECONDS.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 7 * 24 * 3600,
+        local_max_entries: int = 1024,
+        redis_max_entries: int = 100_000,
+        enabled: bool = True
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            ttl_seconds: Lifetime of an entry in both levels
+            local_max_entries: Size of the in-process LRU
+            redis_max_entries: Maximum entries kept in Redis
+            enabled: When False every lookup is a miss and nothing is stored
+        """
+        self.ttl_seconds = ttl_seconds
+        self.local_max_entries = local_max_entries
+        self.redis_max_entries = redis_max_entries
+        self.enabled = enabled
+
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._pending = dict.fromkeys(self._stats, 0)
+        self._pending_pid = os.getpid()
+        self._flushed_at = time.monotonic()
+        self._redis_down_until = 0.0
+
+    @staticmethod
+    def make_key(image_sha256: str, model_version: str, confidence_threshold: float) -> str:
+        return f"{KEY_PREFIX}:v{RESULT_FORMAT_VERSION}:{model_version}:{confidence_threshold:g}:{image_sha256}"
+
+    def get(self, image_sha256: str, model_version: str, confidence_threshold: float) -> Optional[Dict[str, Any]]:
+        """Cached prediction result, or None on a miss"""
+        if not self.enabled or not image_sha256:
+            return None
+
+        key = self.make_key(image_sha256, model_version, confidence_threshold)
+
+        value = None
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.time():
+                    self._local.move_to_end(key)
+                else:
+                    del self._local[key]
+                    value = None
+
+        if value is not None:
+            self._count("local_hits")
+            return value
+
+        raw = None
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = client.get(key)
+            except Exception as e:
+                self._redis_failed("read", e)
+
+        if raw is None:
+            self._count("misses")
+            return None
+
+        value = json.loads(raw)
+        self._store_local(key, value)
+        self._count("redis_hits")
+        return value
+
+    def set(self, image_sha256: str, model_version: str, confidence_threshold: float, value: Dict[str, Any]):
+        """Store a prediction result in both levels"""
+        if not self.enabled or not image_sha256:
+            return
+
+        key = self.make_key(image_sha256, model_version, confidence_threshold)
+        self._store_local(key, value)
+        self._count("stores")
+
+        client = self._redis()
+        if client is None:
+            return
+
+        pending = self._take_pending()
+        try:
+            pipe = client.pipeline()
+            self._queue_counts(pipe, pending)
+            pipe.set(key, json.dumps(value, default=_to_json), ex=self.ttl_seconds)
+            pipe.zadd(INDEX_KEY, {key: time.time()})
+            # Forget index entries whose values already expired
+            pipe.zremrangebyscore(INDEX_KEY, "-inf", time.time() - self.ttl_seconds)
+            pipe.zcard(INDEX_KEY)
+            size = pipe.execute()[-1]
+
+            excess = size - self.redis_max_entries
+            if excess > 0:
+                oldest = client.zrange(INDEX_KEY, 0, excess - 1)
+                if oldest:
+                    client.delete(*oldest)
+                    client.zrem(INDEX_KEY, *oldest)
+                    self._count("evictions", len(oldest))
+        except Exception as e:
+            self._redis_failed("write", e)
+            self._restore_pending(pending)
+
+    def _redis(self):
+        """Shared client, or None while backing off after a Redis failure"""
+        if time.time() < self._redis_down_until:
+            return None
+        return get_redis()
+
+    def _redis_failed(self, operation: str, error: Exception):
+        print(f"Inference cache {operation} failed, using local cache only for {REDIS_RETRY_SECONDS}s: {str(error)}")
+        self._redis_down_until = time.time() + REDIS_RETRY_SECONDS
+
+    def _store_local(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._local[key] = (time.time() + self.ttl_seconds, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _count(self, name: str, amount: int = 1):
+        """Bump a counter locally; it reaches the shared stats hash with the next flush"""
+        with self._lock:
+            self._stats[name] += amount
+            if self._pending_pid != os.getpid():
+                # Inherited from the parent across a fork, which reports them itself
+                self._pending = dict.fromkeys(self._stats, 0)
+                self._pending_pid = os.getpid()
+            self._pending[name] += amount
+            due = time.monotonic() - self._flushed_at >= STATS_FLUSH_SECONDS
+
+        if due:
+            self.flush_stats()
+
+    def _take_pending(self) -> Dict[str, int]:
+        with self._lock:
+            pending = self._pending if self._pending_pid == os.getpid() else {}
+            self._pending = dict.fromkeys(self._stats, 0)
+            self._pending_pid = os.getpid()
+            self._flushed_at = time.monotonic()
+        return pending
+
+    def _restore_pending(self, pending: Dict[str, int]):
+        """Keep counts whose flush failed for the next one"""
+        with self._lock:
+            for name, amount in pending.items():
+                self._pending[name] += amount
+
+    @staticmethod
+    def _queue_counts(pipe, pending: Dict[str, int]):
+        for name, amount in pending.items():
+            if amount:
+                pipe.hincrby(STATS_KEY, name, amount)
+
+    def flush_stats(self):
+        """Send this process's counters to the shared Redis stats hash"""
+        client = self._redis()
+        if client is None:
+            return
+
+        pending = self._take_pending()
+        if not any(pending.values()):
+            return
+        try:
+            pipe = client.pipeline()
+            self._queue_counts(pipe, pending)
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed("stats update", e)
+            self._restore_pending(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for this process and across all workers
+
+        Other processes' counts show up once they flush, within
+        STATS_FLUSH_SECONDS of their last lookup.
+        """
+        self.flush_stats()
+        with self._lock:
+            local = dict(self._stats, entries=len(self._local))
+
+        shared = None
+        client = self._redis()
+        if client is not None:
+            try:
+                shared = {key.decode(): int(value) for key, value in client.hgetall(STATS_KEY).items()}
+                shared["entries"] = client.zcard(INDEX_KEY)
+            except Exception as e:
+                self._redis_failed("stats read", e)
+
+        if shared is not None:
+            lookups = sum(shared.get(name, 0) for name in ("local_hits", "redis_hits", "misses"))
+            hits = shared.get("local_hits", 0) + shared.get("redis_hits", 0)
+            shared["hit_rate"] = hits / lookups if lookups else None
+
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "local_max_entries": self.local_max_entries,
+            "redis_max_entries": self.redis_max_entries,
+            "process": local,
+            "shared": shared,
+        }
+
+
+inference_cache = InferenceResultCache(
+    ttl_seconds=settings.INFERENCE_CACHE_TTL_SECONDS,
+    local_max_entries=settings.INFERENCE_CACHE_LOCAL_MAX_ENTRIES,
+    redis_max_entries=settings.INFERENCE_CACHE_MAX_ENTRIES,
+    enabled=settings.INFERENCE_CACHE_ENABLED
+)
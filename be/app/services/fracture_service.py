@@ -1,17 +1,31 @@
-import os
+import time
+import hashlib
+import numpy as np
 from datetime import datetime
 from typing import List, Dict, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.models.fracture_prediction import FracturePrediction, FractureDetection
 from app.models.user import User
 from app.enums.prediction_source import PredictionSource
-from app.enums.fracture_type import FractureType
-from app.schemas.fracture_prediction import StudentAnnotationsSubmit
-from app.services.bone_fracture_predict.predictor import fracture_predictor
+from app.schemas.fracture_prediction import StudentAnnotationsSubmit, FracturePredictionOut, FractureDetectionOut
+from app.services.bone_fracture_predict.batching import inference_engine
+from app.services.bone_fracture_predict.predictor import current_model_version, DETECTION_COLUMNS
+from app.services.bone_fracture_predict.result_cache import inference_cache
+from app.services.bone_fracture_predict.model_ready import decode_model_ready, load_model_ready, save_model_ready
+from app.core.config import settings
+from app.core.executors import io_executor
 from app.services.annotation_comparision import comparison_service
 from app.services.ai_feedback_service import ai_feedback_service
+from app.services.telemetry_service import telemetry_service
+from app.services.upload_service import upload_service
 from app.utils.storage_manager import storage_manager
+from app.utils.timing import StageTimer
+
+
+# Boxes of a near-duplicate image must overlap this much for its feedback to be reused
+NEAR_DUPLICATE_FEEDBACK_IOU = 0.9
 
 
 class FractureService:
@@ -118,11 +132,66 @@ class FractureService:
             return {"error": "Access denied", "status": 403}
         
         try:
-            # Get file bytes using storage manager (handles both local and S3)
-            file_content = storage_manager.get_file_bytes(prediction.image_path)
-                        
-            # Run AI prediction
-            prediction_result = fracture_predictor.predict(file_content)
+            model_version = current_model_version()
+            candidate_floor = settings.FRACTURE_CANDIDATE_FLOOR
+            timer = StageTimer()
+            batch_size = None
+            
+            # Same image content already predicted by this model: skip download and inference
+            prediction_result = inference_cache.get(prediction.image_sha256, model_version, candidate_floor)
+            
+            # Near-duplicate of a predicted image (found at upload): reuse its detections,
+            # but only if its boxes line up with this image's
+            near_duplicate_hit = False
+            if prediction_result is None and FractureService._boxes_line_up(prediction, prediction.near_duplicate_of):
+                prediction_result = inference_cache.get(
+                    prediction.near_duplicate_of.image_sha256, model_version, candidate_floor
+                )
+                near_duplicate_hit = prediction_result is not None
+            cache_hit = prediction_result is not None
+            
+            image_input = None
+            if prediction_result is None:
+                with timer.stage("storage_fetch"):
+                    # Decoded copy of the stored image, memory-mapped, if one was cached
+                    image_input = load_model_ready(prediction.image_sha256)
+                    
+                    if image_input is None:
+                        # Get file bytes using storage manager (handles both local and S3)
+                        file_content = storage_manager.get_file_bytes(prediction.image_path, prediction.image_sha256)
+                
+                # Backfill the content hash for images uploaded before it was recorded
+                if image_input is None and not prediction.image_sha256:
+                    prediction.image_sha256 = hashlib.sha256(file_content).hexdigest()
+                    prediction_result = inference_cache.get(prediction.image_sha256, model_version, candidate_floor)
+                    cache_hit = prediction_result is not None
+            
+            if prediction_result is None:
+                if image_input is None:
+                    with timer.stage("decode"):
+                        image_input = decode_model_ready(file_content)
+                    
+                    if image_input is not None:
+                        save_model_ready(prediction.image_sha256, image_input)
+                    else:
+                        # Not letterboxed yet: let the predictor decode and resize it
+                        image_input = file_content
+                
+                # Run AI prediction (batched with concurrent tasks in this worker)
+                prediction_result = inference_engine.predict(image_input)
+                
+                # Timings belong to this run only, never to the cached result
+                timer.update(prediction_result.pop("timings", {}))
+                batch_size = prediction_result.pop("batch_size", None)
+                prediction_result.pop("inference_time", None)
+                inference_cache.set(prediction.image_sha256, model_version, candidate_floor, prediction_result)
+            
+            # Model time of this run; zero when served from the cache
+            inference_time = sum(
+                timer.timings.get(stage, 0.0) for stage in ("decode", "preprocess", "forward", "postprocess")
+            ) / 1000
+            
+            db_write_start = time.perf_counter()
             
             # Remove existing AI predictions
             db.query(FractureDetection).filter(
@@ -130,55 +199,47 @@ class FractureService:
                 FractureDetection.source == PredictionSource.AI
             ).delete()
             
-            # Save AI detections
-            for detection in prediction_result["detections"]:
-                bbox = detection["bounding_box"]
-                
-                # Ensure fracture_type is properly set
-                fracture_type_value = detection.get("fracture_type")
-                
-                # Convert string to enum if needed
-                if fracture_type_value and isinstance(fracture_type_value, str):
-                    try:
-                        fracture_type_enum = FractureType(fracture_type_value.lower())
-                    except ValueError:
-                        fracture_type_enum = None
-                else:
-                    fracture_type_enum = fracture_type_value
-                
-                db_detection = FractureDetection(
-                    prediction_id=prediction_id,
-                    source=PredictionSource.AI,
-                    class_id=detection["class_id"],
-                    class_name=detection["class_name"],
-                    confidence=detection["confidence"],
-                    fracture_type=fracture_type_enum,
-                    x_min=bbox["x_min"],
-                    y_min=bbox["y_min"],
-                    x_max=bbox["x_max"],
-                    y_max=bbox["y_max"],
-                    width=bbox["width"],
-                    height=bbox["height"]
-                )
-                db.add(db_detection)
+            # Save every candidate above the floor in one bulk insert; thresholds are applied when reading
+            detections = prediction_result["detections"]
+            rows = FractureService.ai_detection_rows(prediction_id, detections)
+            if rows:
+                # Core executemany on the table: one INSERT batch, no per-row ORM objects
+                db.execute(insert(FractureDetection.__table__), rows)
             
-            # Update prediction record
-            prediction.has_ai_predictions = prediction_result["detection_count"] > 0
-            prediction.ai_prediction_count = prediction_result["detection_count"]
-            prediction.ai_max_confidence = prediction_result["max_confidence"]
-            prediction.ai_inference_time = prediction_result["inference_time"]
+            # Update prediction record with the summary at its own threshold
+            threshold = prediction.confidence_threshold or settings.FRACTURE_CONFIDENCE_THRESHOLD
+            confidences = np.asarray(detections["confidence"], dtype=np.float64)
+            confidences = confidences[confidences > threshold]
+            
+            prediction.has_ai_predictions = len(confidences) > 0
+            prediction.ai_prediction_count = len(confidences)
+            prediction.ai_max_confidence = float(confidences.max()) if len(confidences) else None
+            prediction.ai_candidate_floor = candidate_floor
+            prediction.ai_inference_time = inference_time
             prediction.ai_predictions_at = datetime.utcnow()
             
             db.commit()
             db.refresh(prediction)
+            timer.add("db_write", (time.perf_counter() - db_write_start) * 1000)
             
+            telemetry_service.record_inference(
+                db,
+                prediction_id=prediction_id,
+                model_version=model_version,
+                timings=timer.timings,
+                batch_size=batch_size,
+                cache_hit=cache_hit
+            )
             
             return {
                 "message": "AI prediction completed successfully",
-                "has_fracture": prediction_result["has_fracture"],
-                "detection_count": prediction_result["detection_count"],
-                "max_confidence": prediction_result["max_confidence"],
-                "inference_time": prediction_result["inference_time"],
+                "has_fracture": prediction.has_ai_predictions,
+                "detection_count": prediction.ai_prediction_count,
+                "max_confidence": prediction.ai_max_confidence,
+                "candidate_count": prediction_result["detection_count"],
+                "near_duplicate_of_id": prediction.near_duplicate_of_id if near_duplicate_hit else None,
+                "inference_time": inference_time,
+                "timings_ms": timer.timings,
                 "status": 200
             }
             
@@ -197,14 +258,100 @@ class FractureService:
                 "status": 500
             }
     
+    @staticmethod
+    def ai_detection_rows(prediction_id: int, detections: Dict) -> List[Dict]:
+        """
+        Insert parameters for columnar predictor detections
+        
+        tolist() turns the NumPy columns into plain Python values the DB
+        driver can bind, in one pass per column.
+        """
+        columns = {name: np.asarray(detections[name]).tolist() for name in DETECTION_COLUMNS}
+        
+        return [
+            {
+                "prediction_id": prediction_id,
+                "source": PredictionSource.AI,
+                "class_name": "fracture",
+                **dict(zip(columns, values))
+            }
+            for values in zip(*columns.values())
+        ]
+    
+    @staticmethod
+    def effective_threshold(prediction: FracturePrediction, threshold: Optional[float] = None) -> float:
+        """
+        Threshold to apply to a prediction's stored AI candidates
+        
+        Defaults to the prediction's own threshold and never goes below the
+        floor the candidates were stored with (older predictions only kept
+        detections above their own threshold).
+        """
+        if threshold is None:
+            threshold = prediction.confidence_threshold
+        
+        floor = prediction.ai_candidate_floor
+        if floor is None:
+            floor = prediction.confidence_threshold
+        
+        return max(threshold, floor or 0.0)
+    
+    @staticmethod
+    def get_ai_detections(
+        prediction: FracturePrediction,
+        db: Session,
+        threshold: Optional[float] = None
+    ) -> List[FractureDetection]:
+        """
+        AI detections of a prediction above a confidence threshold, filtered in SQL
+        """
+        threshold = FractureService.effective_threshold(prediction, threshold)
+        
+        return db.query(FractureDetection).filter(
+            FractureDetection.prediction_id == prediction.id,
+            FractureDetection.source == PredictionSource.AI,
+            FractureDetection.confidence > threshold
+        ).order_by(FractureDetection.confidence.desc()).all()
+    
+    @staticmethod
+    def build_prediction_view(
+        prediction: FracturePrediction,
+        threshold: Optional[float] = None
+    ) -> FracturePredictionOut:
+        """
+        Prediction output with AI detections and AI summary re-thresholded
+        from the stored candidates, without running the model
+        """
+        threshold = FractureService.effective_threshold(prediction, threshold)
+        
+        detections = [
+            detection for detection in prediction.detections
+            if detection.source != PredictionSource.AI or (detection.confidence or 0.0) > threshold
+        ]
+        ai_confidences = [d.confidence for d in detections if d.source == PredictionSource.AI]
+        
+        view = FracturePredictionOut.model_validate(prediction)
+        return view.model_copy(update={
+            "confidence_threshold": threshold,
+            "detections": [FractureDetectionOut.model_validate(d) for d in detections],
+            "has_ai_predictions": len(ai_confidences) > 0,
+            "ai_prediction_count": len(ai_confidences),
+            "ai_max_confidence": max(ai_confidences) if ai_confidences else None
+        })
+    
     @staticmethod
     async def get_prediction_comparison(
         prediction_id: int,
         current_user: User,
-        db: Session
+        db: Session,
+        threshold: Optional[float] = None
     ) -> Dict:
         """
         Get detailed comparison between student and AI predictions with AI-generated feedback
+        
+        With a threshold other than the prediction's own, AI detections are
+        re-filtered from the stored candidates and rule-based feedback is
+        returned instead of the cached AI feedback.
         """
         prediction = db.query(FracturePrediction).filter(
             FracturePrediction.id == prediction_id
@@ -222,30 +369,42 @@ class FractureService:
                 "status": 400
             }
         
+        effective_threshold = FractureService.effective_threshold(prediction, threshold)
+        
         student_detections = db.query(FractureDetection).filter(
             FractureDetection.prediction_id == prediction_id,
             FractureDetection.source == PredictionSource.STUDENT
         ).all()
         
-        ai_detections = db.query(FractureDetection).filter(
-            FractureDetection.prediction_id == prediction_id,
-            FractureDetection.source == PredictionSource.AI
-        ).all()
+        ai_detections = FractureService.get_ai_detections(prediction, db, effective_threshold)
         
         comparison_result = comparison_service.compare_predictions(
             student_detections,
             ai_detections
         )
         
+        if effective_threshold != prediction.confidence_threshold:
+            # Threshold sweep: cheap rule-based feedback, never cached
+            feedback = comparison_service.generate_feedback(comparison_result)
         # Generate AI-powered feedback if not already cached
-        if not prediction.ai_feedback:
+        elif not prediction.ai_feedback:
             try:
-                feedback = await ai_feedback_service.generate_feedback(
-                    prediction.image_path,
-                    student_detections,
-                    ai_detections,
-                    comparison_result
+                # A near-duplicate image with the same boxes already has the LLM's answer
+                feedback = FractureService._near_duplicate_feedback(
+                    prediction, student_detections, ai_detections, db
                 )
+                if feedback is None:
+                    image_bytes = await storage_manager.aget_file_bytes(
+                        prediction.image_path, prediction.image_sha256
+                    )
+                    # Drawing and the LLM call block; keep them off the event loop
+                    feedback = await io_executor.run(
+                        ai_feedback_service.generate_feedback,
+                        image_bytes,
+                        student_detections,
+                        ai_detections,
+                        comparison_result
+                    )
                 
                 # Store in database as JSONB
                 prediction.ai_feedback = feedback
@@ -273,6 +432,7 @@ class FractureService:
         return {
             "prediction_id": prediction_id,
             "image_filename": prediction.image_filename,
+            "confidence_threshold": effective_threshold,
             "student_detections": student_detections,
             "ai_detections": ai_detections,
             "comparison_metrics": legacy_metrics,
@@ -281,6 +441,84 @@ class FractureService:
             "status": 200
         }
     
+    @staticmethod
+    def _boxes_line_up(prediction: FracturePrediction, source: Optional[FracturePrediction]) -> bool:
+        """
+        Whether the source's detections can stand for this image's
+        
+        Both images must fill the same region of the 640x640 letterbox and
+        hash identically. A crop that changes the aspect ratio changes the
+        padding; a copy shifted within the same frame keeps the padding but
+        moves the content, which a hash within a few bits does not rule out.
+        """
+        return (
+            source is not None
+            and prediction.image_phash is not None
+            and prediction.image_phash == source.image_phash
+            and prediction.image_padding is not None
+            and prediction.image_padding == source.image_padding
+        )
+    
+    @staticmethod
+    def _near_duplicate_feedback(
+        prediction: FracturePrediction,
+        student_detections: List[FractureDetection],
+        ai_detections: List[FractureDetection],
+        db: Session
+    ) -> Optional[Dict]:
+        """
+        Cached AI feedback of the near-duplicate image, if it was given for the same boxes
+        
+        The feedback describes the student's and the AI's boxes, so it is only
+        reused when both sets match the source's at the same threshold.
+        """
+        source = prediction.near_duplicate_of
+        if source is None or not source.ai_feedback or not source.has_student_predictions:
+            return None
+        
+        if source.confidence_threshold != prediction.confidence_threshold:
+            return None
+        
+        source_students = db.query(FractureDetection).filter(
+            FractureDetection.prediction_id == source.id,
+            FractureDetection.source == PredictionSource.STUDENT
+        ).all()
+        source_ai = FractureService.get_ai_detections(source, db, source.confidence_threshold)
+        
+        if not (
+            FractureService._same_boxes(student_detections, source_students)
+            and FractureService._same_boxes(ai_detections, source_ai)
+        ):
+            return None
+        return source.ai_feedback
+    
+    @staticmethod
+    def _same_boxes(detections: List, others: List) -> bool:
+        """Whether two detection sets pair up one to one with the same fracture type and overlapping boxes"""
+        if len(detections) != len(others):
+            return False
+        
+        def box(detection):
+            return {
+                "x_min": detection.x_min, "y_min": detection.y_min,
+                "x_max": detection.x_max, "y_max": detection.y_max,
+            }
+        
+        unmatched = list(others)
+        for detection in detections:
+            match = next(
+                (
+                    other for other in unmatched
+                    if other.fracture_type == detection.fracture_type
+                    and comparison_service.calculate_iou(box(detection), box(other)) >= NEAR_DUPLICATE_FEEDBACK_IOU
+                ),
+                None
+            )
+            if match is None:
+                return False
+            unmatched.remove(match)
+        return True
+    
     @staticmethod
     def get_prediction_details(
         prediction_id: int,
@@ -302,6 +540,43 @@ class FractureService:
         
         return prediction
     
+    @staticmethod
+    def delete_prediction(
+        prediction_id: int,
+        current_user: User,
+        db: Session
+    ) -> Dict:
+        """
+        Delete a prediction, and its stored image once no other prediction references it
+        """
+        prediction = db.query(FracturePrediction).filter(
+            FracturePrediction.id == prediction_id
+        ).first()
+        
+        if not prediction:
+            return {"error": "Prediction not found", "status": 404}
+        
+        if prediction.user_id != current_user.id and not current_user.is_admin:
+            return {"error": "Access denied", "status": 403}
+        
+        try:
+            image_path, image_sha256 = prediction.image_path, prediction.image_sha256
+            
+            db.delete(prediction)
+            db.flush()
+            image_deleted = upload_service.release_image(db, image_path, image_sha256)
+            db.commit()
+            
+            return {
+                "message": "Prediction deleted",
+                "image_deleted": image_deleted,
+                "status": 200
+            }
+        
+        except Exception as e:
+            db.rollback()
+            return {"error": f"Failed to delete prediction: {str(e)}", "status": 500}
+    
     @staticmethod
     def get_user_predictions(
         current_user: User,
@@ -320,6 +595,65 @@ class FractureService:
         predictions = query.offset(skip).limit(limit).all()
         
         return predictions
+    
+    @staticmethod
+    def threshold_sweep(thresholds: List[float], db: Session) -> Dict:
+        """
+        AI results at several confidence thresholds over all analysed images
+        
+        Works on the stored candidates only, so no image is re-run through
+        the model. For images a student has annotated, also reports how often
+        the AI's fracture / no fracture call agrees with the student's.
+        """
+        predictions = db.query(
+            FracturePrediction.id,
+            FracturePrediction.confidence_threshold,
+            FracturePrediction.ai_candidate_floor,
+            FracturePrediction.has_student_predictions,
+            FracturePrediction.student_prediction_count
+        ).filter(FracturePrediction.ai_predictions_at.isnot(None)).all()
+        
+        if not predictions:
+            return {"image_count": 0, "thresholds": []}
+        
+        index = {row.id: i for i, row in enumerate(predictions)}
+        floors = np.array([
+            row.ai_candidate_floor if row.ai_candidate_floor is not None else row.confidence_threshold
+            for row in predictions
+        ], dtype=np.float64)
+        annotated = np.array([bool(row.has_student_predictions) for row in predictions])
+        student_fracture = np.array([(row.student_prediction_count or 0) > 0 for row in predictions])
+        
+        candidates = db.query(
+            FractureDetection.prediction_id,
+            FractureDetection.confidence
+        ).filter(
+            FractureDetection.source == PredictionSource.AI,
+            FractureDetection.confidence > min(thresholds)
+        ).all()
+        
+        owners = np.array([index[row.prediction_id] for row in candidates if row.prediction_id in index], dtype=np.int64)
+        confidences = np.array([row.confidence for row in candidates if row.prediction_id in index], dtype=np.float64)
+        
+        results = []
+        for threshold in sorted(thresholds):
+            counts = np.bincount(owners[confidences > threshold], minlength=len(predictions))
+            ai_fracture = counts > 0
+            # Older images only stored detections above a higher threshold
+            incomplete = int((floors > threshold).sum())
+            
+            results.append({
+                "threshold": threshold,
+                "detection_count": int(counts.sum()),
+                "images_with_fracture": int(ai_fracture.sum()),
+                "images_with_higher_floor": incomplete,
+                "student_agreement": (
+                    round(float((ai_fracture[annotated] == student_fracture[annotated]).mean()), 4)
+                    if annotated.any() else None
+                )
+            })
+        
+        return {"image_count": len(predictions), "thresholds": results}
 
 
 fracture_service = FractureService()
\ No newline at end of file
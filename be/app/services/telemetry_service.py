@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.inference_telemetry import InferenceTelemetry, INFERENCE_STAGES
+
+PERCENTILES = (50, 95, 99)
+
+
+class TelemetryService:
+    """Per-stage timing of AI predictions"""
+    
+    @staticmethod
+    def record_inference(
+        db: Session,
+        prediction_id: int,
+        model_version: str,
+        timings: Dict[str, float],
+        batch_size: Optional[int] = None,
+        cache_hit: bool = False
+    ):
+        """
+        Persist stage timings (milliseconds) for one prediction
+        
+        Telemetry is best effort: a failed write is logged and rolled back
+        without affecting the prediction itself.
+        """
+        try:
+            db.add(InferenceTelemetry(
+                prediction_id=prediction_id,
+                model_version=model_version,
+                batch_size=batch_size,
+                cache_hit=cache_hit,
+                total_ms=sum(timings.values()),
+                **{f"{stage}_ms": timings.get(stage) for stage in INFERENCE_STAGES}
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Failed to record inference telemetry: {str(e)}")
+    
+    @staticmethod
+    def summarize_inference(db: Session, hours: int = 24) -> Dict:
+        """
+        p50/p95/p99 per stage and per model version over the last `hours`
+        """
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        columns = [getattr(InferenceTelemetry, f"{stage}_ms") for stage in INFERENCE_STAGES]
+        
+        rows = db.query(
+            InferenceTelemetry.model_version,
+            InferenceTelemetry.cache_hit,
+            InferenceTelemetry.total_ms,
+            *columns
+        ).filter(InferenceTelemetry.created_at >= since).all()
+        
+        grouped: Dict[str, list] = {}
+        for row in rows:
+            grouped.setdefault(row[0], []).append(row[1:])
+        
+        model_versions = {}
+        for model_version, version_rows in grouped.items():
+            stages = {}
+            for index, stage in enumerate(("total",) + INFERENCE_STAGES, start=1):
+                values = [row[index] for row in version_rows if row[index] is not None]
+                stages[stage] = TelemetryService._percentiles(values)
+            
+            model_versions[model_version] = {
+                "count": len(version_rows),
+                "cache_hits": sum(1 for row in version_rows if row[0]),
+                "stages_ms": stages
+            }
+        
+        return {
+            "window_hours": hours,
+            "model_versions": model_versions
+        }
+    
+    @staticmethod
+    def _percentiles(values: list) -> Optional[Dict[str, float]]:
+        if not values:
+            return None
+        
+        result = {
+            f"p{p}": round(float(value), 3)
+            for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        }
+        result["count"] = len(values)
+        return result
+
+
+telemetry_service = TelemetryService()
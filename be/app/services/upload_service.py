@@ -1,19 +1,108 @@
+import io
 import os
-from typing import Dict, Tuple, Optional
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from typing import BinaryIO, Callable, Dict, Iterator, List, Tuple, Optional, Union
+from fastapi import HTTPException
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
+from PIL import Image
 
 from app.models.user import User
 from app.models.fracture_prediction import FracturePrediction
 from app.models.document_upload import DocumentUpload
 from app.enums.document_status import DocumentStatus
-from app.services.bone_fracture_predict.predictor import fracture_predictor
-from app.services.rag_service import VectorStorageManager
-from app.services.embedding_service import EmbeddingPipeline
-from app.utils.image_utils import resize_image_to_640
+from app.utils.image_utils import (
+    collect_batch_images, content_addressed_image_name, inspect_image_header, perceptual_hash, resize_image_to_640
+)
 from app.utils.storage_manager import storage_manager
+from app.utils.upload_utils import file_digest
+from app.services.bone_fracture_predict.near_duplicates import near_duplicate_index
+from app.services.bone_fracture_predict.model_ready import decode_model_ready, delete_model_ready, save_model_ready
 from app.core.config import settings
-import tempfile
-import time
+from app.core.executors import ExecutorSaturatedError, image_executor
+import hashlib
+
+def prepare_image(image_bytes: Union[bytes, str], save_model_ready_copy: bool) -> Tuple[bytes, str, Dict, int]:
+    """
+    Letterbox an uploaded image (bytes or spool file path) to 640x640 and hash the stored bytes
+    
+    Also returns the perceptual hash of the image content (padding excluded)
+    and writes the model-ready array when the workers share local storage.
+    Runs in a letterbox worker process for bulk uploads.
+    """
+    resized_bytes, _, _, padding_info = resize_image_to_640(image_bytes)
+    image_sha256 = hashlib.sha256(resized_bytes).hexdigest()
+    
+    pixels = decode_model_ready(resized_bytes)
+    if save_model_ready_copy:
+        save_model_ready(image_sha256, pixels)
+    
+    x, y = padding_info["offset_x"], padding_info["offset_y"]
+    content = pixels[y:y + padding_info["content_height"], x:x + padding_info["content_width"]]
+    image_phash = perceptual_hash(Image.fromarray(content))
+    
+    return resized_bytes, image_sha256, padding_info, image_phash
+
+
+def _letterbox_stream(
+    images: List[Tuple[str, Callable[[], bytes]]],
+    save_model_ready_copy: bool
+) -> Iterator[Tuple[str, Optional[Tuple[bytes, str, Dict, int]], Optional[str]]]:
+    """
+    Letterbox images in parallel, yielding (filename, result, error) in input order
+
+    Images are read only as earlier ones finish, so at most two per image
+    executor worker are held in memory at a time.
+    """
+    in_flight = deque()
+
+    def result(filename, future):
+        try:
+            return filename, future.result(), None
+        except BrokenProcessPool:
+            # A worker died; fail the upload instead of blaming the image
+            raise
+        except HTTPException as e:
+            return filename, None, e.detail
+        except Exception as e:
+            return filename, None, f"Invalid image: {str(e)}"
+
+    for filename, read in images:
+        try:
+            data = read()
+            # Rejected from the header alone, before a worker decodes anything
+            inspect_image_header(io.BytesIO(data), filename)
+        except (OSError, zipfile.BadZipFile, HTTPException) as e:
+            # Unreadable upload, corrupt archive member or rejected image
+            future = Future()
+            future.set_exception(e)
+        else:
+            future = image_executor.submit(prepare_image, data, save_model_ready_copy)
+        in_flight.append((filename, future))
+        if len(in_flight) >= 2 * image_executor.max_workers:
+            yield result(*in_flight.popleft())
+
+    while in_flight:
+        yield result(*in_flight.popleft())
+
+
+def _lock_image_content(db: Session, image_sha256: str, shared: bool):
+    """
+    Transaction-scoped advisory lock on one image content (PostgreSQL only)
+    
+    Uploads take it shared, so they never wait for each other; deleting the
+    last reference takes it exclusive.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    
+    key = int.from_bytes(bytes.fromhex(image_sha256[:16]), "big", signed=True)
+    function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+    db.execute(text(f"SELECT {function}(:key)"), {"key": key})
 
 
 class UploadService:
@@ -21,44 +110,42 @@ class UploadService:
     
     @staticmethod
     def upload_image(
-        file_content: bytes,
+        file_content: Union[bytes, str],
         filename: str,
         current_user: User,
         db: Session
     ) -> Tuple[Dict, int]:
         """
         Upload and process a fracture image
+        
+        file_content is the image bytes, or the path of the spooled upload
+        (see SpooledUpload.source), which the image worker reads from disk.
+        
+        Blocking: resizing runs in the image executor, storage and DB calls
+        in the calling thread. Async callers run this in the I/O executor.
         """
+        written = []
         try:
-            # Resize image to 640x640
-            resized_bytes, original_width, original_height, padding_info = resize_image_to_640(file_content)
+            # Resize image to 640x640; locally the workers share the uploads
+            # volume, so hand them the decoded pixels now
+            resized_bytes, image_sha256, padding_info, image_phash = image_executor.submit(
+                prepare_image, file_content, settings.ENV_MODE == "local"
+            ).result()
             
-            # Generate unique filename
-            timestamp = int(time.time())
-            unique_filename = f"{timestamp}_{filename}"
+            # Stored once per content; repeat uploads only add a record
+            image_path, was_written = UploadService._store_image(db, resized_bytes, image_sha256)
+            if was_written:
+                written.append((image_path, image_sha256))
             
-            image_path = storage_manager.save_image(resized_bytes, unique_filename, current_user.id)
-                        
             # Create prediction record
-            db_prediction = FracturePrediction(
-                user_id=current_user.id,
-                image_filename=filename,
-                image_path=image_path,
-                image_size=len(resized_bytes),
-                image_width=640,
-                image_height=640,
-                image_format=os.path.splitext(filename)[1][1:].lower(),
-                has_student_predictions=False,
-                has_ai_predictions=False,
-                student_prediction_count=0,
-                ai_prediction_count=0,
-                model_version="YOLOv8",
-                confidence_threshold=fracture_predictor.confidence_threshold
+            db_prediction = UploadService._new_prediction(
+                db, current_user, filename, image_path, resized_bytes, image_sha256, image_phash, padding_info
             )
             
             db.add(db_prediction)
             db.commit()
             db.refresh(db_prediction)
+            near_duplicate_index.add(db_prediction.id, image_phash)
             
             response_dict = {
                 **db_prediction.__dict__,
@@ -69,26 +156,211 @@ class UploadService:
             
             return response_dict, 200
             
+        except ExecutorSaturatedError:
+            # The API answers 503 with Retry-After
+            db.rollback()
+            UploadService._release_images(db, written)
+            raise
         except Exception as e:
+            db.rollback()
+            UploadService._release_images(db, written)
             return {
                 "error": f"Upload failed: {str(e)}",
                 "status": 500
             }, 500
     
+    @staticmethod
+    def upload_images(
+        files: List[Tuple[str, BinaryIO]],
+        current_user: User,
+        db: Session
+    ) -> Tuple[Dict, int]:
+        """
+        Upload many fracture images, or zip archives of images, at once
+        
+        Images are letterboxed in parallel worker processes while the next
+        ones are read, then stored, and all prediction records are inserted
+        in one transaction. Images that cannot be decoded or stored are
+        listed under "failed" without failing the rest.
+        """
+        predictions = []
+        failed = []
+        written = []
+        
+        try:
+            with ExitStack() as stack:
+                images = collect_batch_images(files, stack)
+                stream = _letterbox_stream(images, save_model_ready_copy=settings.ENV_MODE == "local")
+                
+                for filename, prepared, error in stream:
+                    if error:
+                        failed.append({"filename": filename, "error": error})
+                        continue
+                    
+                    resized_bytes, image_sha256, padding_info, image_phash = prepared
+                    try:
+                        image_path, was_written = UploadService._store_image(db, resized_bytes, image_sha256)
+                    except Exception as e:
+                        failed.append({"filename": filename, "error": f"Storage failed: {str(e)}"})
+                        continue
+                    
+                    if was_written:
+                        written.append((image_path, image_sha256))
+                    predictions.append(UploadService._new_prediction(
+                        db, current_user, filename, image_path, resized_bytes, image_sha256, image_phash, padding_info
+                    ))
+            
+            db.add_all(predictions)
+            db.flush()
+            prediction_ids = [prediction.id for prediction in predictions]
+            db.commit()
+            
+            for prediction in predictions:
+                near_duplicate_index.add(prediction.id, prediction.image_phash)
+            
+        except ExecutorSaturatedError:
+            db.rollback()
+            UploadService._release_images(db, written)
+            raise
+        except HTTPException as e:
+            db.rollback()
+            UploadService._release_images(db, written)
+            return {"error": e.detail, "status": e.status_code}, e.status_code
+        except Exception as e:
+            db.rollback()
+            UploadService._release_images(db, written)
+            return {
+                "error": f"Upload failed: {str(e)}",
+                "status": 500
+            }, 500
+        
+        # One SELECT reloads every committed record
+        stored = db.query(FracturePrediction)\
+            .filter(FracturePrediction.id.in_(prediction_ids))\
+            .order_by(FracturePrediction.id)\
+            .all() if prediction_ids else []
+        
+        return {
+            "predictions": [prediction.__dict__ for prediction in stored],
+            "failed": failed,
+            "storage_mode": settings.ENV_MODE,
+            "status": 200
+        }, 200
+    
+    @staticmethod
+    def _store_image(db: Session, resized_bytes: bytes, image_sha256: str) -> Tuple[str, bool]:
+        """
+        Content-addressed path of a stored image, writing it only if it is new
+        
+        Content another record already references is reused without touching
+        storage. Holds a shared content lock until the caller's commit, so the
+        image cannot be deleted before the new record references it.
+        Returns the path and whether it was written.
+        """
+        _lock_image_content(db, image_sha256, shared=True)
+        
+        existing = db.query(FracturePrediction.image_path).filter(
+            FracturePrediction.image_sha256 == image_sha256,
+            FracturePrediction.image_path.endswith(content_addressed_image_name(image_sha256))
+        ).first()
+        if existing:
+            return existing.image_path, False
+        
+        return storage_manager.save_image_content(resized_bytes, image_sha256)
+    
+    @staticmethod
+    def release_image(db: Session, image_path: str, image_sha256: Optional[str]) -> bool:
+        """
+        Delete a stored image once no prediction references it
+        
+        Call after the referencing record was deleted and flushed, before
+        commit; the exclusive content lock keeps concurrent uploads from
+        reusing the image while it is removed. Returns whether it was deleted.
+        """
+        if image_sha256:
+            _lock_image_content(db, image_sha256, shared=False)
+        
+        references = db.query(func.count(FracturePrediction.id)).filter(
+            FracturePrediction.image_path == image_path
+        ).scalar()
+        if references:
+            return False
+        
+        storage_manager.delete_file(image_path)
+        if image_sha256:
+            delete_model_ready(image_sha256)
+        return True
+    
+    @staticmethod
+    def _release_images(db: Session, written: List[Tuple[str, str]]):
+        """Best-effort cleanup of images written by a failed upload"""
+        for image_path, image_sha256 in written:
+            try:
+                UploadService.release_image(db, image_path, image_sha256)
+                db.commit()
+            except Exception:
+                db.rollback()
+    
+    @staticmethod
+    def _new_prediction(
+        db: Session,
+        current_user: User,
+        filename: str,
+        image_path: str,
+        resized_bytes: bytes,
+        image_sha256: str,
+        image_phash: Optional[int] = None,
+        padding_info: Optional[Dict] = None
+    ) -> FracturePrediction:
+        """
+        Prediction record for a stored 640x640 image
+        
+        Points it at the nearest already-predicted near-duplicate image, if
+        any, whose detections and feedback can be reused.
+        """
+        near_duplicate = near_duplicate_index.find(db, image_phash)
+        
+        return FracturePrediction(
+            user_id=current_user.id,
+            image_filename=filename,
+            image_path=image_path,
+            image_size=len(resized_bytes),
+            image_width=640,
+            image_height=640,
+            image_format=os.path.splitext(filename)[1][1:].lower(),
+            image_sha256=image_sha256,
+            image_phash=image_phash,
+            image_padding=padding_info,
+            near_duplicate_of_id=near_duplicate[0] if near_duplicate else None,
+            has_student_predictions=False,
+            has_ai_predictions=False,
+            student_prediction_count=0,
+            ai_prediction_count=0,
+            model_version=settings.FRACTURE_MODEL_VERSION,
+            confidence_threshold=settings.FRACTURE_CONFIDENCE_THRESHOLD
+        )
+    
     @staticmethod
     def upload_document(
-        file_content: bytes,
+        document_path: str,
         filename: str,
         current_user: User,
         collection_name: str,
         index_id: str,
-        db: Session
+        db: Session,
+        sha256: Optional[str] = None,
+        size: Optional[int] = None
     ) -> Tuple[Dict, int]:
         """
-        Upload and process a document (PDF, DOCX)
-        Storage location determined by ENV_MODE
+        Process a stored document (PDF, DOCX) into the vector database
+        
+        The API saves the upload with storage_manager.save_document and only
+        passes its path or S3 key here. When sha256 and size are given, the
+        stored copy is checked against them before processing.
         """
-        temp_file_path = None
+        # Imported here so the API process never loads the embedding runtime
+        from app.services.rag_service import VectorStorageManager
+        from app.services.embedding_service import EmbeddingPipeline
         
         # Create initial document upload record
         db_document = DocumentUpload(
@@ -102,23 +374,21 @@ class UploadService:
         db.refresh(db_document)
         
         try:
-            timestamp = int(time.time())
-            unique_filename = f"{timestamp}_{filename}"
-            
-            # Save using storage manager
-            document_path = storage_manager.save_document(file_content, unique_filename, current_user.id)
-                        
-            # Update status to processing
-            db_document.status = DocumentStatus.PROCESSING
-            db.commit()
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
-            
-            # Process file through embedding pipeline
-            embedding_pipeline = EmbeddingPipeline()
-            nodes = embedding_pipeline.process_file(file_path=temp_file_path, embed_nodes=True)
+            # S3 documents are streamed to a temporary file; local ones are read in place
+            with storage_manager.local_document(document_path) as local_path:
+                if sha256 is not None:
+                    with open(local_path, "rb") as f:
+                        stored_sha256, stored_size = file_digest(f)
+                    if (stored_sha256, stored_size) != (sha256, size):
+                        raise ValueError("Stored document does not match the upload")
+                
+                # Update status to processing
+                db_document.status = DocumentStatus.PROCESSING
+                db.commit()
+                
+                # Process file through embedding pipeline
+                embedding_pipeline = EmbeddingPipeline()
+                nodes = embedding_pipeline.process_file(file_path=local_path, embed_nodes=True)
             
             # Store nodes in vector database
             storage_manager_rag = VectorStorageManager(
@@ -162,11 +432,6 @@ class UploadService:
                 "error": f"Document processing failed: {str(e)}",
                 "status": 500
             }, 500
-        
-        finally:
-            # Clean up temp file
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
     
     @staticmethod
     def get_document_history(
@@ -0,0 +1,14 @@
+from .base import StorageBackend
+from .local import LocalStorageBackend
+from .memory import InMemoryStorageBackend
+from .s3 import S3StorageBackend
+from .factory import configured_backend_name, create_storage_backend
+
+__all__ = [
+    "StorageBackend",
+    "LocalStorageBackend",
+    "InMemoryStorageBackend",
+    "S3StorageBackend",
+    "configured_backend_name",
+    "create_storage_backend",
+]
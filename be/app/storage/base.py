@@ -0,0 +1,148 @@
+"""
+Storage backend interface.
+
+A backend stores opaque objects under keys such as
+"sha256/ab/<sha256>.jpg" and hands back a location: the string saved in
+the database and later passed to get/delete. Locations are a local path,
+a URL or an S3 key depending on the backend, and only the backend that
+produced a location understands it.
+
+Every operation has a blocking form for Celery tasks and services, and an
+awaitable "a" form for async endpoints. The awaitable forms run the
+blocking ones in the I/O executor, so the event loop never waits on disk
+or the network.
+"""
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import AsyncIterator, BinaryIO, Iterator, Optional, Tuple, Union
+
+from app.core.executors import io_executor
+
+# Size of the chunks stream() yields
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+Data = Union[bytes, BinaryIO]
+
+
+class StorageBackend(ABC):
+    """Put, get, stream, delete, exists and presign objects by key"""
+
+    name = "base"
+
+    @abstractmethod
+    def location(self, key: str) -> str:
+        """Location an object stored under key has"""
+
+    @abstractmethod
+    def put(self, key: str, data: Data, content_type: Optional[str] = None) -> str:
+        """
+        Store bytes or the rest of a readable file under key, replacing any object there
+
+        Returns the object's location.
+        """
+
+    @abstractmethod
+    def get(self, location: str, content_sha256: Optional[str] = None) -> bytes:
+        """
+        Whole object
+
+        Args:
+            content_sha256: SHA-256 of the stored bytes, if the caller knows
+                it; backends that cache reads key them by it
+
+        Raises:
+            FileNotFoundError: Nothing is stored at location
+        """
+
+    @abstractmethod
+    def stream(self, location: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Object in chunks of at most chunk_size bytes
+
+        Raises:
+            FileNotFoundError: Nothing is stored at location
+        """
+
+    @abstractmethod
+    def delete(self, location: str) -> bool:
+        """Remove an object; False if it was not removed (S3 cannot tell a missing one apart)"""
+
+    @abstractmethod
+    def exists(self, location: str) -> bool:
+        """Whether an object is stored at location"""
+
+    @abstractmethod
+    def presign(self, location: str, expires_in: int = 3600) -> str:
+        """URL a client can fetch the object from, valid for expires_in seconds"""
+
+    def put_if_absent(self, key: str, data: Data, content_type: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Store an object unless one is already stored under key
+
+        Meant for content-addressed keys, where an existing object has the
+        same bytes. Returns the location and whether the object was written.
+        """
+        location = self.location(key)
+        if self.exists(location):
+            return location, False
+        return self.put(key, data, content_type), True
+
+    @contextmanager
+    def local_copy(self, location: str) -> Iterator[str]:
+        """
+        Path of the object on local disk, for libraries that only read files
+
+        Streamed to a temporary file, removed on exit.
+        """
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(location)[1]) as temp_file:
+            temp_path = temp_file.name
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in self.stream(location):
+                    f.write(chunk)
+            yield temp_path
+        finally:
+            os.remove(temp_path)
+
+    async def aput(self, key: str, data: Data, content_type: Optional[str] = None) -> str:
+        return await io_executor.run(self.put, key, data, content_type)
+
+    async def aput_if_absent(self, key: str, data: Data, content_type: Optional[str] = None) -> Tuple[str, bool]:
+        return await io_executor.run(self.put_if_absent, key, data, content_type)
+
+    async def aget(self, location: str, content_sha256: Optional[str] = None) -> bytes:
+        return await io_executor.run(self.get, location, content_sha256)
+
+    async def astream(self, location: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """stream() with every chunk read in the I/O executor"""
+        chunks = await io_executor.run(self.stream, location, chunk_size)
+        try:
+            while True:
+                chunk = await io_executor.run(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    async def adelete(self, location: str) -> bool:
+        return await io_executor.run(self.delete, location)
+
+    async def aexists(self, location: str) -> bool:
+        return await io_executor.run(self.exists, location)
+
+    async def apresign(self, location: str, expires_in: int = 3600) -> str:
+        return await io_executor.run(self.presign, location, expires_in)
+
+
+def write_data(data: Data, fileobj: BinaryIO):
+    """Copy bytes or a readable file into fileobj"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        fileobj.write(data)
+    else:
+        shutil.copyfileobj(data, fileobj, STREAM_CHUNK_SIZE)
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from app.core.config import settings
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.document_utils import DOCUMENT_UPLOAD_DIRECTORY
+from app.utils.image_utils import IMAGE_UPLOAD_DIRECTORY
+from .base import StorageBackend
+from .local import LocalStorageBackend
+from .memory import InMemoryStorageBackend
+from .s3 import S3StorageBackend
+
+STORAGE_KINDS = ("images", "documents")
+
+
+def configured_backend_name() -> str:
+    """STORAGE_BACKEND, or s3 in production and local otherwise"""
+    return settings.STORAGE_BACKEND or ("s3" if settings.ENV_MODE == "production" else "local")
+
+
+def create_storage_backend(kind: str, backend: Optional[str] = None) -> StorageBackend:
+    """
+    Backend for fracture images or documents
+
+    Args:
+        kind: "images" or "documents"
+        backend: "local", "s3" or "memory"; the configured one if omitted
+    """
+    if kind not in STORAGE_KINDS:
+        raise ValueError(f"Unknown storage kind: {kind}")
+    backend = backend or configured_backend_name()
+
+    if backend == "local":
+        root = IMAGE_UPLOAD_DIRECTORY if kind == "images" else DOCUMENT_UPLOAD_DIRECTORY
+        # main.py serves uploads/ at /uploads in local mode
+        return LocalStorageBackend(root, url_prefix=f"/{root}")
+
+    if backend == "s3":
+        if kind == "documents":
+            return S3StorageBackend(settings.S3_BUCKET_DOCUMENTS, settings.AWS_REGION)
+        return S3StorageBackend(
+            settings.S3_BUCKET_IMAGES,
+            settings.AWS_REGION,
+            prefix="images/",
+            public=True,
+            cache=DiskLRUCache(
+                settings.IMAGE_DISK_CACHE_DIR,
+                settings.IMAGE_DISK_CACHE_MAX_BYTES,
+                enabled=settings.IMAGE_DISK_CACHE_ENABLED
+            )
+        )
+
+    if backend == "memory":
+        return InMemoryStorageBackend(kind)
+
+    raise ValueError(f"Unknown storage backend: {backend}")
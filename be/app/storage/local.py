@@ -0,0 +1,90 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .base import STREAM_CHUNK_SIZE, Data, StorageBackend, write_data
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Objects as files under a root directory
+
+    Locations are the file paths (root joined with the key), with forward
+    slashes.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, url_prefix: str = ""):
+        """
+        Initialize the backend
+
+        Args:
+            root: Directory holding the objects, created on first write
+            url_prefix: Path the API serves root under (main.py mounts
+                uploads/ at /uploads); presign() returns the file path without it
+        """
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def location(self, key: str) -> str:
+        return os.path.join(self.root, key).replace("\\", "/")
+
+    def put(self, key: str, data: Data, content_type: Optional[str] = None) -> str:
+        path = self.location(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write_data(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return path
+
+    def get(self, location: str, content_sha256: Optional[str] = None) -> bytes:
+        if not os.path.exists(location):
+            raise FileNotFoundError(f"File not found: {location}")
+        with open(location, "rb") as f:
+            return f.read()
+
+    def stream(self, location: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        if not os.path.exists(location):
+            raise FileNotFoundError(f"File not found: {location}")
+        return self._read_chunks(location, chunk_size)
+
+    @staticmethod
+    def _read_chunks(location: str, chunk_size: int) -> Iterator[bytes]:
+        with open(location, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def delete(self, location: str) -> bool:
+        try:
+            os.remove(location)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def exists(self, location: str) -> bool:
+        return os.path.isfile(location)
+
+    def presign(self, location: str, expires_in: int = 3600) -> str:
+        if not self.url_prefix:
+            return location
+        relative = os.path.relpath(location, self.root).replace("\\", "/")
+        return f"{self.url_prefix}/{relative}"
+
+    @contextmanager
+    def local_copy(self, location: str) -> Iterator[str]:
+        """The file itself; nothing to copy"""
+        if not os.path.exists(location):
+            raise FileNotFoundError(f"File not found: {location}")
+        yield location
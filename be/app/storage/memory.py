@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+from .base import STREAM_CHUNK_SIZE, Data, StorageBackend
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """
+    Objects in a dict, for tests and offline benchmarks
+
+    Locations are memory://<name>/<key>. latency_ms delays every operation,
+    standing in for the round trip to a remote store.
+    """
+
+    name = "memory"
+
+    def __init__(self, bucket: str = "default", latency_ms: float = 0.0):
+        self.bucket = bucket
+        self.latency = latency_ms / 1000
+        self._objects: Dict[str, bytes] = {}
+        self._content_types: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def location(self, key: str) -> str:
+        return f"memory://{self.bucket}/{key}"
+
+    def _key(self, location: str) -> str:
+        prefix = f"memory://{self.bucket}/"
+        return location[len(prefix):] if location.startswith(prefix) else location
+
+    def put(self, key: str, data: Data, content_type: Optional[str] = None) -> str:
+        body = bytes(data) if isinstance(data, (bytes, bytearray, memoryview)) else data.read()
+        self._wait()
+        with self._lock:
+            self._objects[key] = body
+            self._content_types[key] = content_type
+        return self.location(key)
+
+    def get(self, location: str, content_sha256: Optional[str] = None) -> bytes:
+        self._wait()
+        with self._lock:
+            body = self._objects.get(self._key(location))
+        if body is None:
+            raise FileNotFoundError(f"File not found: {location}")
+        return body
+
+    def stream(self, location: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        body = self.get(location)
+        return (body[start:start + chunk_size] for start in range(0, len(body), chunk_size))
+
+    def delete(self, location: str) -> bool:
+        self._wait()
+        with self._lock:
+            self._content_types.pop(self._key(location), None)
+            return self._objects.pop(self._key(location), None) is not None
+
+    def exists(self, location: str) -> bool:
+        self._wait()
+        with self._lock:
+            return self._key(location) in self._objects
+
+    def presign(self, location: str, expires_in: int = 3600) -> str:
+        return self.location(self._key(location))
@@ -0,0 +1,460 @@
+import hashlib
+import io
+import math
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import boto3
+import requests
+from botocore.config import Config
+from botocore.exceptions import ClientError, IncompleteReadError, ReadTimeoutError, ResponseStreamingError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import settings
+from app.utils.disk_cache import DiskLRUCache
+from .base import STREAM_CHUNK_SIZE, Data, StorageBackend
+
+# Transient responses worth retrying on a GET
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Content-addressed storage names carry the SHA-256 of the stored bytes
+CONTENT_ADDRESSED_SHA256 = re.compile(r"/sha256/[0-9a-f]{2}/([0-9a-f]{64})\.jpg$")
+
+CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+    ".txt": "text/plain",
+}
+
+NOT_FOUND_CODES = ("404", "NoSuchKey", "NotFound")
+
+# S3 rejects multipart parts smaller than this, except the last, and uploads of more parts
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+# A ranged GET that fails part-way is resumed from the last byte received
+RESUMABLE_READ_ERRORS = (IncompleteReadError, ReadTimeoutError, ResponseStreamingError)
+
+
+def build_http_session() -> requests.Session:
+    """
+    HTTP session with a keep-alive connection pool and retries for storage reads
+
+    Connections to each bucket host are reused across requests, up to
+    STORAGE_HTTP_POOL_SIZE at a time.
+    """
+    retry = Retry(
+        total=settings.STORAGE_HTTP_RETRIES,
+        backoff_factor=settings.STORAGE_HTTP_RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        # Hand the last response back so raise_for_status() reports it
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=settings.STORAGE_HTTP_POOL_SIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def build_s3_client():
+    """boto3 client with the same pool size, timeouts and retry budget as the HTTP reads"""
+    if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.AWS_REGION]):
+        raise ValueError("AWS credentials and region required for S3 storage")
+
+    return boto3.client(
+        's3',
+        endpoint_url=settings.S3_ENDPOINT_URL or None,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+        config=Config(
+            max_pool_connections=settings.STORAGE_HTTP_POOL_SIZE,
+            connect_timeout=settings.STORAGE_HTTP_CONNECT_TIMEOUT,
+            read_timeout=settings.STORAGE_HTTP_READ_TIMEOUT,
+            retries={"max_attempts": settings.STORAGE_HTTP_RETRIES + 1, "mode": "standard"}
+        )
+    )
+
+
+class _PartReader(io.RawIOBase):
+    """
+    Seekable view of size bytes of a source from offset, read on demand
+
+    Each multipart part gets its own, so parts go up in parallel without
+    being copied into memory first, and botocore can rewind one to retry.
+    """
+
+    def __init__(self, read_at: Callable[[int, int], bytes], offset: int, size: int):
+        self._read_at = read_at
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._size}[whence]
+        self._position = min(max(base + offset, 0), self._size)
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self._size - self._position
+        size = remaining if size is None or size < 0 else min(size, remaining)
+        data = self._read_at(self._offset + self._position, size) if size else b""
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _random_access(data: Data) -> Tuple[Callable[[int, int], bytes], int]:
+    """
+    Positional reader and size of what put() stores from data
+
+    Files on disk are read with pread from their current position; other
+    readable objects are read into memory first.
+    """
+    fileno = getattr(data, "fileno", None)
+    if fileno is not None and hasattr(os, "pread"):
+        try:
+            fd = fileno()
+        except (OSError, io.UnsupportedOperation):
+            fd = None
+        if fd is not None:
+            start = data.tell()
+            return (lambda offset, size: os.pread(fd, size, start + offset)), os.fstat(fd).st_size - start
+
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = data.read()
+    view = memoryview(data).cast("B")
+    return (lambda offset, size: bytes(view[offset:offset + size])), len(view)
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code")
+
+
+def _is_not_found(error: Exception) -> bool:
+    return _error_code(error) in NOT_FOUND_CODES
+
+
+def _object_size(response: Dict) -> int:
+    """Full object size from a GetObject response, ranged or not"""
+    content_range = response.get("ContentRange")
+    if content_range:
+        return int(content_range.rsplit("/", 1)[1])
+    return response["ContentLength"]
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Objects in an S3 bucket
+
+    A public bucket (fracture images) stores objects public-read and uses
+    their URL as the location; reads then go over a pooled keep-alive HTTP
+    session, through the optional disk cache. A private bucket (documents)
+    encrypts objects at rest and uses the key as the location.
+
+    Objects from S3_MULTIPART_THRESHOLD up are uploaded in parallel parts,
+    and stream() reads objects in S3_DOWNLOAD_RANGE_SIZE ranges, so neither
+    direction holds a large document in memory.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        region: str,
+        prefix: str = "",
+        public: bool = False,
+        cache: Optional[DiskLRUCache] = None,
+        client=None
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            bucket: Bucket name
+            region: Bucket region, part of public URLs
+            prefix: Prepended to every key
+            public: Store objects public-read and locate them by URL
+            cache: Disk cache in front of reads by URL
+            client: boto3 S3 client; built from settings on first use if omitted
+        """
+        if not bucket:
+            raise ValueError("S3 bucket name required")
+
+        self.bucket = bucket
+        self.region = region
+        self.prefix = prefix
+        self.public = public
+        self.cache = cache
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._http_session = None
+        self._http_session_pid = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = build_s3_client()
+        return self._client
+
+    @property
+    def http_session(self) -> requests.Session:
+        """
+        This process's pooled session, created on first use
+
+        Prefork workers get their own pool instead of sharing sockets
+        opened in the parent.
+        """
+        if self._http_session_pid != os.getpid():
+            with self._client_lock:
+                if self._http_session_pid != os.getpid():
+                    self._http_session = build_http_session()
+                    self._http_session_pid = os.getpid()
+        return self._http_session
+
+    def url(self, s3_key: str) -> str:
+        if settings.S3_ENDPOINT_URL:
+            return f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{self.bucket}/{s3_key}"
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{s3_key}"
+
+    def location(self, key: str) -> str:
+        s3_key = f"{self.prefix}{key}"
+        return self.url(s3_key) if self.public else s3_key
+
+    def _s3_key(self, location: str) -> str:
+        """Object key of a URL or key location"""
+        if location.startswith(("https://", "http://")):
+            path = location.split("://", 1)[1].split("/", 1)[1]
+            # Path-style URLs of a custom endpoint start with the bucket
+            if settings.S3_ENDPOINT_URL and path.startswith(f"{self.bucket}/"):
+                path = path[len(self.bucket) + 1:]
+            return path
+        return location
+
+    def _put_args(self, key: str, content_type: Optional[str]) -> Dict:
+        args = {
+            "ContentType": content_type or CONTENT_TYPES.get(os.path.splitext(key)[1].lower(), "application/octet-stream")
+        }
+        if self.public:
+            args["ACL"] = "public-read"
+        else:
+            args["ServerSideEncryption"] = "AES256"
+        return args
+
+    def put(self, key: str, data: Data, content_type: Optional[str] = None) -> str:
+        """
+        Store an object
+
+        Objects below S3_MULTIPART_THRESHOLD go up in one PutObject. Larger
+        ones are uploaded in parts of S3_MULTIPART_PART_SIZE,
+        S3_MULTIPART_CONCURRENCY at a time, each read from the source as it
+        is sent; the upload is aborted if a part fails.
+        """
+        s3_key = f"{self.prefix}{key}"
+        put_args = self._put_args(key, content_type)
+        read_at, size = _random_access(data)
+        try:
+            if size < settings.S3_MULTIPART_THRESHOLD:
+                self.client.put_object(
+                    Bucket=self.bucket, Key=s3_key, Body=_PartReader(read_at, 0, size), **put_args
+                )
+            else:
+                self._put_multipart(s3_key, read_at, size, put_args)
+        except ClientError as e:
+            raise Exception(f"Failed to upload to S3: {str(e)}")
+        return self.location(key)
+
+    def _put_multipart(self, s3_key: str, read_at: Callable[[int, int], bytes], size: int, put_args: Dict):
+        part_size = max(settings.S3_MULTIPART_PART_SIZE, MIN_PART_SIZE, math.ceil(size / MAX_PARTS))
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=s3_key, **put_args)["UploadId"]
+
+        def upload_part(number: int) -> Dict:
+            offset = (number - 1) * part_size
+            response = self.client.upload_part(
+                Bucket=self.bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                PartNumber=number,
+                Body=_PartReader(read_at, offset, min(part_size, size - offset))
+            )
+            return {"PartNumber": number, "ETag": response["ETag"]}
+
+        pool = ThreadPoolExecutor(max_workers=max(settings.S3_MULTIPART_CONCURRENCY, 1))
+        try:
+            parts: List[Dict] = list(pool.map(upload_part, range(1, math.ceil(size / part_size) + 1)))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=s3_key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=s3_key, UploadId=upload_id)
+            except ClientError:
+                pass
+            raise
+        finally:
+            pool.shutdown()
+
+    @staticmethod
+    def _cache_key(location: str) -> Tuple[str, Optional[str]]:
+        """
+        Disk cache key of a stored object and the SHA-256 its bytes must have
+
+        Keyed by content when the storage name carries it; other stored
+        names are never reused, so their URL's hash will do.
+        """
+        match = CONTENT_ADDRESSED_SHA256.search(location)
+        if match:
+            return match.group(1), match.group(1)
+        return hashlib.sha256(location.encode()).hexdigest(), None
+
+    def get(self, location: str, content_sha256: Optional[str] = None) -> bytes:
+        """
+        Whole object
+
+        Objects located by URL are read over the pooled HTTP session and kept
+        in the disk cache, so repeat reads skip the network.
+        """
+        if not location.startswith(("https://", "http://")):
+            return self._get_object(location).read()
+
+        cache_key, expected_sha256 = self._cache_key(location)
+        if content_sha256:
+            cache_key = expected_sha256 = content_sha256
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        response = self.http_session.get(
+            location,
+            timeout=(settings.STORAGE_HTTP_CONNECT_TIMEOUT, settings.STORAGE_HTTP_READ_TIMEOUT)
+        )
+        if response.status_code == 404:
+            raise FileNotFoundError(f"File not found: {location}")
+        response.raise_for_status()
+        content = response.content
+        if self.cache is not None and (
+            expected_sha256 is None or hashlib.sha256(content).hexdigest() == expected_sha256
+        ):
+            self.cache.put(cache_key, content)
+        return content
+
+    def _get_object(self, location: str):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._s3_key(location))["Body"]
+        except ClientError as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(f"File not found: {location}")
+            raise Exception(f"Failed to download from S3: {str(e)}")
+
+    def _get_range(self, s3_key: str, start: int, etag: Optional[str] = None) -> Optional[Dict]:
+        """
+        GetObject response for the S3_DOWNLOAD_RANGE_SIZE bytes from start
+
+        None for an empty object, which has no byte range to read. With an
+        ETag, fails if the object was replaced since the first range.
+        """
+        args = {
+            "Bucket": self.bucket,
+            "Key": s3_key,
+            "Range": f"bytes={start}-{start + settings.S3_DOWNLOAD_RANGE_SIZE - 1}"
+        }
+        if etag:
+            args["IfMatch"] = etag
+        try:
+            return self.client.get_object(**args)
+        except ClientError as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(f"File not found: {s3_key}")
+            if _error_code(e) == "InvalidRange" and start == 0:
+                return None
+            raise Exception(f"Failed to download from S3: {str(e)}")
+
+    def stream(self, location: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Object in chunks, read one ranged GET at a time
+
+        The first range is requested here, so a missing object raises before
+        iteration starts.
+        """
+        s3_key = self._s3_key(location)
+        return self._ranged_chunks(s3_key, self._get_range(s3_key, 0), chunk_size)
+
+    def _ranged_chunks(self, s3_key: str, response: Optional[Dict], chunk_size: int) -> Iterator[bytes]:
+        if response is None:
+            return
+        size, etag = _object_size(response), response.get("ETag")
+        offset, failures = 0, 0
+        while True:
+            try:
+                for chunk in response["Body"].iter_chunks(chunk_size):
+                    offset += len(chunk)
+                    yield chunk
+            except RESUMABLE_READ_ERRORS:
+                failures += 1
+                if failures > settings.STORAGE_HTTP_RETRIES:
+                    raise
+            finally:
+                response["Body"].close()
+            if offset >= size:
+                return
+            response = self._get_range(s3_key, offset, etag)
+
+    def delete(self, location: str) -> bool:
+        if self.cache is not None:
+            self.cache.discard(self._cache_key(location)[0])
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._s3_key(location))
+            return True
+        except ClientError:
+            return False
+
+    def exists(self, location: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._s3_key(location))
+            return True
+        except ClientError as e:
+            if _is_not_found(e):
+                return False
+            raise Exception(f"Failed to check S3 object: {str(e)}")
+
+    def presign(self, location: str, expires_in: int = 3600) -> str:
+        try:
+            return self.client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket, 'Key': self._s3_key(location)},
+                ExpiresIn=expires_in
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to generate presigned URL: {str(e)}")
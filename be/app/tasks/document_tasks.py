@@ -1,34 +1,55 @@
+from typing import Optional
+
 from celery_app import celery_app
 from app.core.database import SessionLocal
 from app.models.user import User
 from app.services.upload_service import UploadService
+from app.utils.storage_manager import storage_manager
 
 
 @celery_app.task(name='app.tasks.document_tasks.process_document')
-def process_document(user_id: int, file_content_b64: str, filename: str, collection_name: str, index_id: str):
+def process_document(
+    user_id: int,
+    filename: str,
+    collection_name: str,
+    index_id: str,
+    document_path: Optional[str] = None,
+    sha256: Optional[str] = None,
+    size: Optional[int] = None,
+    file_content_b64: Optional[str] = None
+):
     """
     Process document upload in background
-    """
-    import base64
     
+    The message only carries a reference to the stored document (claim
+    check); the worker reads the file back from storage. file_content_b64
+    is accepted for messages enqueued before the switch.
+    """
     db = SessionLocal()
     try:
-        # Decode file content
-        file_content = base64.b64decode(file_content_b64)
-        
         # Get user
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             return {"status": "error", "error": "User not found"}
         
+        if document_path is None:
+            import base64
+            import time
+            
+            document_path = storage_manager.save_document(
+                base64.b64decode(file_content_b64), f"{int(time.time())}_{filename}", user_id
+            )
+        
         # Process document
         result, status_code = UploadService.upload_document(
-            file_content=file_content,
+            document_path=document_path,
             filename=filename,
             current_user=user,
             collection_name=collection_name,
             index_id=index_id,
-            db=db
+            db=db,
+            sha256=sha256,
+            size=size
         )
         
         if status_code == 200:
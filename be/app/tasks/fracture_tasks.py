@@ -5,6 +5,10 @@ from app.models.fracture_prediction import FracturePrediction, PredictionSource
 from app.services.fracture_service import FractureService
 from app.services.annotation_comparision import comparison_service
 from app.services.ai_feedback_service import ai_feedback_service
+from app.utils.storage_manager import storage_manager
+from app.core.config import settings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
 import asyncio
 
 
@@ -40,10 +44,7 @@ def run_ai_prediction(user_id: int, prediction_id: int):
                     FractureDetection.source == PredictionSource.STUDENT
                 ).all()
                 
-                ai_detections = db.query(FractureDetection).filter(
-                    FractureDetection.prediction_id == prediction_id,
-                    FractureDetection.source == PredictionSource.AI
-                ).all()
+                ai_detections = FractureService.get_ai_detections(prediction, db)
                 
                 comparison_result = comparison_service.compare_predictions(
                     student_detections,
@@ -52,8 +53,12 @@ def run_ai_prediction(user_id: int, prediction_id: int):
                 
                 # Generate feedback SYNCHRONOUSLY (no await needed)
                 if not prediction.ai_feedback:
+                    # The feedback image is drawn from the stored bytes, not the path
+                    image_bytes = storage_manager.get_file_bytes(
+                        prediction.image_path, prediction.image_sha256
+                    )
                     feedback = ai_feedback_service.generate_feedback(
-                        prediction.image_path,
+                        image_bytes,
                         student_detections,
                         ai_detections,
                         comparison_result
@@ -88,4 +93,64 @@ def run_ai_prediction(user_id: int, prediction_id: int):
         print(traceback.format_exc())
         return {"status": "error", "error": str(e)}
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _predict_one(user_id: int, prediction_id: int) -> dict:
+    """AI prediction for one image of a batch, in its own DB session"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return {"prediction_id": prediction_id, "status": "error", "error": "User not found"}
+        
+        result = FractureService.run_ai_prediction(prediction_id, user, db)
+        if result.get("status") != 200:
+            return {"prediction_id": prediction_id, "status": "error", "error": result.get("error")}
+        
+        return {
+            "prediction_id": prediction_id,
+            "status": "success",
+            "has_fracture": result.get("has_fracture"),
+            "detection_count": result.get("detection_count"),
+            "max_confidence": result.get("max_confidence")
+        }
+    except Exception as e:
+        return {"prediction_id": prediction_id, "status": "error", "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, name='app.tasks.fracture_tasks.run_ai_prediction_batch')
+def run_ai_prediction_batch(self, user_id: int, prediction_ids: List[int]):
+    """
+    Run AI prediction on a set of uploaded images as one job
+    
+    Predictions run on up to INFERENCE_MAX_BATCH_SIZE threads, so the
+    batching engine groups them into shared forward passes. Progress is
+    reported as the PROGRESS state with done/total counts.
+    """
+    total = len(prediction_ids)
+    results = []
+    failed = 0
+    self.update_state(state="PROGRESS", meta={"done": 0, "failed": 0, "total": total})
+    
+    with ThreadPoolExecutor(max_workers=max(1, settings.INFERENCE_MAX_BATCH_SIZE)) as executor:
+        futures = [executor.submit(_predict_one, user_id, prediction_id) for prediction_id in prediction_ids]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            failed += result["status"] != "success"
+            self.update_state(state="PROGRESS", meta={"done": len(results), "failed": failed, "total": total})
+    
+    order = {prediction_id: index for index, prediction_id in enumerate(prediction_ids)}
+    results.sort(key=lambda result: order[result["prediction_id"]])
+    return {
+        "status": "success" if not failed else "partial" if failed < total else "error",
+        "result": {
+            "total": total,
+            "completed": total - failed,
+            "failed": failed,
+            "predictions": results
+        }
+    }
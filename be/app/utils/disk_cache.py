@@ -0,0 +1,304 @@
+"""
+Size-bounded on-disk LRU cache of immutable blobs.
+
+Stored images never change once written (content-addressed, or named with
+an upload timestamp), so a worker that reads the same image again minutes
+later can serve it from local disk instead of the bucket. Entries live
+under <directory>/<key[:2]>/<key>; the cache is shared by every process
+pointing at the same directory, prefork children included:
+
+- entries are written to a temporary file and renamed into place, so a
+  reader never sees a partial file;
+- the total size and the counters live in state.json, updated under an
+  exclusive flock, which also serializes eviction; only stores, removals
+  and stats reads take it;
+- a hit only touches the entry's mtime, and eviction removes the least
+  recently used entries until the cache is back under EVICT_TO of its
+  budget;
+- hit/miss counters add up in each process and are folded into state.json
+  with its next store or stats read, or after STATS_FLUSH_SECONDS.
+"""
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+STATE_FILE = "state.json"
+
+# Eviction frees space down to this fraction of max_bytes, so it runs rarely
+EVICT_TO = 0.9
+
+# Temporary files older than this were left by a crashed writer
+STALE_TMP_SECONDS = 3600
+
+COUNTERS = ("hits", "misses", "stores", "evictions", "hit_bytes")
+
+# Counted in each process and written to state.json at most this often by lookups alone
+LOOKUP_COUNTERS = ("hits", "misses", "hit_bytes")
+STATS_FLUSH_SECONDS = 10.0
+
+
+class DiskLRUCache:
+    """On-disk LRU cache keyed by hex digests, safe across processes"""
+
+    def __init__(self, directory: str, max_bytes: int, enabled: bool = True):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Cache directory, created on first write
+            max_bytes: Size budget of all entries together
+            enabled: When False every lookup is a miss and nothing is stored
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._pending_lock = threading.Lock()
+        self._pending = dict.fromkeys(LOOKUP_COUNTERS, 0)
+        self._pending_pid = os.getpid()
+        self._flushed_at = time.monotonic()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    @contextmanager
+    def _state(self) -> Iterator[Dict]:
+        """Shared size and counters, locked against every other process for the block"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, STATE_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                try:
+                    state = json.loads(f.read() or "null")
+                except ValueError:
+                    state = None
+                if not isinstance(state, dict):
+                    # First use, or the state was lost: recount what is on disk
+                    state = dict.fromkeys(COUNTERS, 0)
+                    state["bytes"], state["entries"] = self._scan()
+
+                for name, amount in self._take_pending().items():
+                    state[name] += amount
+
+                yield state
+
+                f.seek(0)
+                f.write(json.dumps(state))
+                f.truncate()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _entries(self):
+        """(mtime, size, path) of every entry; removes stale temporary files"""
+        now = time.time()
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        self._remove(entry.path)
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def _scan(self):
+        total = count = 0
+        for _, size, _ in self._entries():
+            total += size
+            count += 1
+        return total, count
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _evict(self, state: Dict):
+        """Drop least recently used entries until under EVICT_TO of the budget; caller holds the lock"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+
+        target = self.max_bytes * EVICT_TO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                state["evictions"] += 1
+            total -= size
+            count -= 1
+
+        state["bytes"], state["entries"] = total, count
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached bytes, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._count(misses=1)
+            return None
+        except OSError as e:
+            print(f"Warning: Failed to read cached file {path}: {str(e)}")
+            return None
+
+        self._hit(path, len(data))
+        return data
+
+    def path(self, key: str) -> Optional[str]:
+        """
+        Path of a cached entry, for readers that memory-map it; None on a miss
+
+        The entry can be evicted before the caller opens it, which then
+        fails with FileNotFoundError like any other miss.
+        """
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            self._count(misses=1)
+            return None
+        except OSError as e:
+            print(f"Warning: Failed to stat cached file {path}: {str(e)}")
+            return None
+
+        self._hit(path, size)
+        return path
+
+    def _hit(self, path: str, size: int):
+        try:
+            # Recency for eviction; atime is not reliable on noatime mounts
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hits=1, hit_bytes=size)
+
+    def put(self, key: str, data: bytes):
+        """Store bytes under key unless already cached; best effort"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+
+        path = self._entry_path(key)
+        if os.path.exists(path):
+            return
+
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+
+            with self._state() as state:
+                if os.path.exists(path):
+                    # Another process stored it first
+                    return
+                os.replace(tmp_path, path)
+                tmp_path = None
+                state["bytes"] += len(data)
+                state["entries"] += 1
+                state["stores"] += 1
+                if state["bytes"] > self.max_bytes:
+                    self._evict(state)
+        except OSError as e:
+            print(f"Warning: Failed to cache file {key}: {str(e)}")
+        finally:
+            if tmp_path is not None:
+                self._remove(tmp_path)
+
+    def discard(self, key: str):
+        """Remove an entry whose source was deleted; best effort"""
+        if not self.enabled:
+            return
+
+        path = self._entry_path(key)
+        try:
+            with self._state() as state:
+                try:
+                    size = os.path.getsize(path)
+                except FileNotFoundError:
+                    return
+                if self._remove(path):
+                    state["bytes"] -= size
+                    state["entries"] -= 1
+        except OSError as e:
+            print(f"Warning: Failed to remove cached file {key}: {str(e)}")
+
+    def _count(self, **amounts):
+        """Add to this process's lookup counters, writing them out if the last flush is old"""
+        with self._pending_lock:
+            if self._pending_pid != os.getpid():
+                # Inherited from the parent across a fork, which reports them itself
+                self._pending = dict.fromkeys(LOOKUP_COUNTERS, 0)
+                self._pending_pid = os.getpid()
+            for name, amount in amounts.items():
+                self._pending[name] += amount
+            due = time.monotonic() - self._flushed_at >= STATS_FLUSH_SECONDS
+
+        if due:
+            self.flush()
+
+    def _take_pending(self) -> Dict:
+        with self._pending_lock:
+            pending = self._pending if self._pending_pid == os.getpid() else {}
+            self._pending = dict.fromkeys(LOOKUP_COUNTERS, 0)
+            self._pending_pid = os.getpid()
+            self._flushed_at = time.monotonic()
+        return pending
+
+    def flush(self):
+        """Write this process's lookup counters to the shared stats"""
+        if not self.enabled:
+            return
+        try:
+            with self._state():
+                pass
+        except OSError as e:
+            print(f"Warning: Failed to update cache stats in {self.directory}: {str(e)}")
+
+    def stats(self) -> Dict:
+        """
+        Size and hit/miss counters, shared by all processes using this directory
+
+        Lookups of other processes show up once they flush, within
+        STATS_FLUSH_SECONDS of their last store or lookup.
+        """
+        shared = None
+        if self.enabled:
+            try:
+                with self._state() as state:
+                    shared = dict(state)
+            except OSError as e:
+                print(f"Warning: Failed to read cache stats in {self.directory}: {str(e)}")
+
+        if shared is not None:
+            lookups = shared["hits"] + shared["misses"]
+            shared["hit_rate"] = shared["hits"] / lookups if lookups else None
+
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "shared": shared,
+        }
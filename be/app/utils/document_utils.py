@@ -1,5 +1,4 @@
 import os
-import time
 from fastapi import HTTPException, status, UploadFile
 
 DOCUMENT_UPLOAD_DIRECTORY = "uploads/medical_documents"
@@ -26,15 +25,3 @@ def validate_document_file(file: UploadFile) -> None:
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File too large. Max size: {DOCUMENT_MAX_FILE_SIZE / (1024*1024):.0f}MB"
         )
-
-
-def save_document_file(file_bytes: bytes, filename: str, user_id: int) -> str:
-    """Save uploaded document to disk"""
-    timestamp = int(time.time())
-    unique_filename = f"user_{user_id}_{timestamp}_{filename}"
-    file_path = os.path.join(DOCUMENT_UPLOAD_DIRECTORY, unique_filename)
-
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_bytes)
-
-    return file_path.replace("\\", "/")
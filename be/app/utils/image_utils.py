@@ -1,7 +1,11 @@
 import os
-import time
 import io
+import warnings
+import zipfile
+from contextlib import ExitStack
+from typing import BinaryIO, Callable, List, Optional, Tuple, Union
 from fastapi import HTTPException, status, UploadFile
+import numpy as np
 from PIL import Image
 
 IMAGE_UPLOAD_DIRECTORY = "uploads/fracture_images"
@@ -9,6 +13,36 @@ IMAGE_ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tiff"}
 IMAGE_MAX_FILE_SIZE = 20 * 1024 * 1024
 TARGET_SIZE = (640, 640)
 
+# Large sources are shrunk cheaply to this multiple of the target size before the LANCZOS resize
+FAST_RESIZE_OVERSAMPLE = 2
+FAST_RESIZE_MODES = {"L", "RGB", "RGBA"}
+
+# X-rays are stored single-channel: these modes, and colour images whose channels
+# differ by at most GRAYSCALE_CHANNEL_TOLERANCE anywhere after resizing
+GRAYSCALE_MODES = {"1", "L", "LA", "I", "I;16", "I;16B", "I;16L"}
+GRAYSCALE_CHANNEL_TOLERANCE = 4
+
+# Perceptual hash: low 8x8 DCT frequencies of a 32x32 grayscale thumbnail
+PHASH_THUMBNAIL_SIZE = 32
+PHASH_FREQUENCIES = 8
+
+# Pre-decode gate: content must match the extension and stay within these limits
+IMAGE_SIGNATURES = {
+    "JPEG": (b"\xff\xd8\xff",),
+    "PNG": (b"\x89PNG\r\n\x1a\n",),
+    "BMP": (b"BM",),
+    "TIFF": (b"II*\x00", b"MM\x00*"),
+}
+IMAGE_EXTENSION_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".bmp": "BMP", ".tiff": "TIFF"}
+IMAGE_ALLOWED_MODES = {"1", "L", "LA", "P", "PA", "RGB", "RGBA", "CMYK", "YCbCr", "I", "I;16", "I;16B", "I;16L"}
+IMAGE_MAX_PIXELS = 60_000_000
+
+# Bulk uploads: zip archives of images are accepted alongside single images
+IMAGE_ARCHIVE_EXTENSIONS = {".zip"}
+IMAGE_ARCHIVE_MAX_FILE_SIZE = 1024 * 1024 * 1024
+IMAGE_BATCH_MAX_FILES = 200
+IMAGE_BATCH_MAX_TOTAL_SIZE = 2 * 1024 * 1024 * 1024
+
 os.makedirs(IMAGE_UPLOAD_DIRECTORY, exist_ok=True)
 
 
@@ -31,17 +65,195 @@ def validate_image_file(file: UploadFile) -> None:
         )
 
 
-def resize_image_to_640(image_bytes: bytes) -> tuple[bytes, int, int, dict]:
-    """Resize image to 640x640 while maintaining aspect ratio and padding"""
-    img = Image.open(io.BytesIO(image_bytes))
-    original_width, original_height = img.size
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """Image format from the file's magic bytes, or None if it is not a supported image"""
+    for image_format, signatures in IMAGE_SIGNATURES.items():
+        if head.startswith(signatures):
+            return image_format
+    return None
 
-    if img.mode == 'RGBA':
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        background.paste(img, mask=img.split()[3])
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
+
+def inspect_image_header(fileobj: BinaryIO, filename: str) -> dict:
+    """
+    Check an upload from its header alone, before anything decodes or stores it
+
+    Sniffs the magic bytes, checks they match the extension, and reads
+    dimensions and mode from the header (Image.open does not decode pixel
+    data). The file position is restored afterwards.
+
+    Raises:
+        HTTPException: Unknown or mismatched format, unreadable header,
+            too many pixels or an unsupported mode
+    """
+    position = fileobj.tell()
+    try:
+        head = fileobj.read(16)
+        sniffed = sniff_image_format(head)
+        if sniffed is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{filename} is not a supported image")
+
+        expected = IMAGE_EXTENSION_FORMATS.get(os.path.splitext(filename)[1].lower())
+        if expected and sniffed != expected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{filename} contains {sniffed} data but has a {expected} extension"
+            )
+
+        fileobj.seek(position)
+        try:
+            with warnings.catch_warnings():
+                # Pillow's own bomb warning; the pixel limit below is what applies
+                warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+                with Image.open(fileobj, formats=[sniffed]) as img:
+                    width, height = img.size
+                    mode = img.mode
+        except Image.DecompressionBombError:
+            width, height, mode = None, None, None
+        except Exception:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{filename} has an unreadable image header")
+
+        if width is None or width * height > IMAGE_MAX_PIXELS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"{filename} has too many pixels. Max: {IMAGE_MAX_PIXELS / 1e6:.0f} megapixels"
+            )
+        if mode not in IMAGE_ALLOWED_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{filename} uses unsupported image mode {mode}"
+            )
+
+        return {"format": sniffed, "width": width, "height": height, "mode": mode}
+    finally:
+        fileobj.seek(position)
+
+
+def validate_image_batch_file(file: UploadFile) -> None:
+    """Validate one file of a bulk upload: an image or a zip archive of images"""
+    if not file.filename:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file provided")
+
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in IMAGE_ARCHIVE_EXTENSIONS | IMAGE_ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Supported: {', '.join(IMAGE_ALLOWED_EXTENSIONS | IMAGE_ARCHIVE_EXTENSIONS)}"
+        )
+
+    if file_ext not in IMAGE_ARCHIVE_EXTENSIONS:
+        validate_image_file(file)
+        return
+
+    if getattr(file, "size", None) and file.size > IMAGE_ARCHIVE_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Archive too large. Max size: {IMAGE_ARCHIVE_MAX_FILE_SIZE / (1024*1024):.0f}MB"
+        )
+
+
+def batch_file_max_size(filename: str) -> int:
+    """Size limit of one file of a bulk upload: archives may be larger than images"""
+    if os.path.splitext(filename)[1].lower() in IMAGE_ARCHIVE_EXTENSIONS:
+        return IMAGE_ARCHIVE_MAX_FILE_SIZE
+    return IMAGE_MAX_FILE_SIZE
+
+
+def collect_batch_images(
+    files: List[Tuple[str, BinaryIO]],
+    stack: ExitStack
+) -> List[Tuple[str, Callable[[], bytes]]]:
+    """
+    List the images of a bulk upload without reading them
+
+    Zip archives are expanded to their image members (folders, hidden files
+    and non-image members are skipped). Each entry pairs a filename with a
+    reader, so images are read one at a time while they are processed.
+    Archives stay open until the ExitStack closes.
+
+    Raises:
+        HTTPException: Corrupt archive, oversized member or too many images
+    """
+    images = []
+    for filename, fileobj in files:
+        if os.path.splitext(filename)[1].lower() not in IMAGE_ARCHIVE_EXTENSIONS:
+            images.append((filename, fileobj.read))
+            continue
+
+        try:
+            archive = stack.enter_context(zipfile.ZipFile(fileobj))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid zip archive: {filename}")
+
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or name.startswith(".") or info.filename.startswith("__MACOSX/"):
+                continue
+            if os.path.splitext(name)[1].lower() not in IMAGE_ALLOWED_EXTENSIONS:
+                continue
+            # Sizes come from the archive directory, so oversized members are rejected before decompressing
+            if info.file_size > IMAGE_MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"{info.filename} in {filename} is too large. Max size: {IMAGE_MAX_FILE_SIZE / (1024*1024):.0f}MB"
+                )
+            images.append((name, lambda archive=archive, info=info: archive.read(info)))
+
+    if len(images) > IMAGE_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many images ({len(images)}). Max per upload: {IMAGE_BATCH_MAX_FILES}"
+        )
+
+    return images
+
+
+def _shrink_for_resize(img: Image.Image, new_size: tuple[int, int]) -> Image.Image:
+    """
+    Cheaply shrink a large source towards new_size before the final resample
+
+    JPEGs are decoded at 1/2, 1/4 or 1/8 scale in the DCT domain (draft),
+    then integer reduce() box-averages the rest. Both stop at
+    FAST_RESIZE_OVERSAMPLE times the target size, so the final LANCZOS pass
+    still has detail to work with. Sources already close to the target are
+    left untouched.
+    """
+    floor = (new_size[0] * FAST_RESIZE_OVERSAMPLE, new_size[1] * FAST_RESIZE_OVERSAMPLE)
+
+    if img.format == "JPEG":
+        # Only has an effect before the image is loaded
+        img.draft(None, floor)
+
+    factor = min(img.width // floor[0], img.height // floor[1])
+    if factor >= 2 and img.mode in FAST_RESIZE_MODES:
+        img = img.reduce(factor)
+
+    return img
+
+
+def _is_grayscale(img: Image.Image) -> bool:
+    """Whether an RGB image only holds gray pixels (up to JPEG chroma noise)"""
+    channels = np.asarray(img, dtype=np.int16)
+    return int((channels.max(axis=2) - channels.min(axis=2)).max()) <= GRAYSCALE_CHANNEL_TOLERANCE
+
+
+def resize_image_to_640(
+    image_bytes: Union[bytes, str],
+    fast_downscale: bool = True,
+    keep_grayscale: bool = True
+) -> tuple[bytes, int, int, dict]:
+    """
+    Resize image to 640x640 while maintaining aspect ratio and padding
+
+    Large sources take the fast downscale path (see _shrink_for_resize)
+    unless fast_downscale is False. Grayscale images are saved as
+    single-channel JPEGs unless keep_grayscale is False; readers expand
+    them to RGB only where they need colour (model input, overlays).
+
+    image_bytes may also be the path of a spooled upload, which is then
+    decoded straight from disk.
+    """
+    img = Image.open(image_bytes if isinstance(image_bytes, str) else io.BytesIO(image_bytes))
+    original_width, original_height = img.size
 
     aspect_ratio = original_width / original_height
     if aspect_ratio > 1:
@@ -51,8 +263,26 @@ def resize_image_to_640(image_bytes: bytes) -> tuple[bytes, int, int, dict]:
         new_height = TARGET_SIZE[1]
         new_width = int(TARGET_SIZE[1] * aspect_ratio)
 
+    if fast_downscale:
+        img = _shrink_for_resize(img, (new_width, new_height))
+
+    mode = 'L' if keep_grayscale and img.mode in GRAYSCALE_MODES else 'RGB'
+
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new(mode, img.size, 255 if mode == 'L' else (255, 255, 255))
+        background.paste(img.convert(img.mode[:-1]), mask=img.getchannel('A'))
+        img = background
+    elif img.mode != mode:
+        img = img.convert(mode)
+
     img = img.resize((new_width, new_height), Image.LANCZOS)
-    new_img = Image.new('RGB', TARGET_SIZE, (0, 0, 0))
+
+    # Colour containers often hold grayscale scans; checked on the small image
+    if keep_grayscale and mode == 'RGB' and _is_grayscale(img):
+        mode = 'L'
+        img = img.convert(mode)
+
+    new_img = Image.new(mode, TARGET_SIZE, 0)
     paste_x = (TARGET_SIZE[0] - new_width) // 2
     paste_y = (TARGET_SIZE[1] - new_height) // 2
     new_img.paste(img, (paste_x, paste_y))
@@ -71,13 +301,34 @@ def resize_image_to_640(image_bytes: bytes) -> tuple[bytes, int, int, dict]:
     return resized_bytes, original_width, original_height, padding_info
 
 
-def save_uploaded_file(file_bytes: bytes, filename: str, user_id: int) -> str:
-    """Save uploaded image file to disk"""
-    timestamp = int(time.time())
-    unique_filename = f"user_{user_id}_{timestamp}_{filename}"
-    file_path = os.path.join(IMAGE_UPLOAD_DIRECTORY, unique_filename)
+def content_addressed_image_name(image_sha256: str) -> str:
+    """Storage name of a stored 640x640 image, shared by every upload of the same content"""
+    return f"sha256/{image_sha256[:2]}/{image_sha256}.jpg"
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so dct(x) = M @ x"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.sqrt(2 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_PHASH_DCT = _dct_matrix(PHASH_THUMBNAIL_SIZE)
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit DCT perceptual hash (pHash) of an image
 
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_bytes)
+    Re-encoded, rescaled or slightly cropped copies of an image land within a
+    few bits of each other. Returned as a signed 64-bit integer so it fits a
+    BigInteger column.
+    """
+    thumbnail = image.convert("L").resize((PHASH_THUMBNAIL_SIZE,) * 2, Image.LANCZOS)
+    pixels = np.asarray(thumbnail, dtype=np.float64)
+    low = (_PHASH_DCT @ pixels @ _PHASH_DCT.T)[:PHASH_FREQUENCIES, :PHASH_FREQUENCIES]
 
-    return file_path.replace("\\", "/")
+    value = int.from_bytes(np.packbits(low > np.median(low)).tobytes(), "big")
+    return value - (1 << 64) if value >= 1 << 63 else value
@@ -0,0 +1,39 @@
+import os
+from typing import Dict, Optional
+
+# smaps_rollup fields summed into each reported figure (all in kB)
+_SMAPS_FIELDS = {
+    "rss_mb": ("Rss",),
+    "pss_mb": ("Pss",),
+    "shared_mb": ("Shared_Clean", "Shared_Dirty"),
+    "unique_mb": ("Private_Clean", "Private_Dirty"),
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Optional[Dict[str, float]]:
+    """
+    Memory of a process split into pages shared with other processes and
+    pages only it holds (USS), from /proc/<pid>/smaps_rollup
+
+    Returns None where smaps_rollup is unavailable (non-Linux, old kernels).
+    """
+    path = f"/proc/{pid or os.getpid()}/smaps_rollup"
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    values_kb = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].endswith(":"):
+            try:
+                values_kb[parts[0][:-1]] = int(parts[1])
+            except ValueError:
+                continue
+
+    return {
+        name: round(sum(values_kb.get(field, 0) for field in fields) / 1024, 1)
+        for name, fields in _SMAPS_FIELDS.items()
+    }
@@ -1,69 +1,73 @@
-import os
-from typing import Tuple
-from app.core.config import settings
-from app.utils.s3_utils import s3_manager
-from app.utils.document_utils import save_document_file
-from app.utils.image_utils import save_uploaded_file
+from typing import BinaryIO, ContextManager, Optional, Tuple, Union
+from app.storage import StorageBackend, create_storage_backend
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.image_utils import content_addressed_image_name
+
+
+def document_key(filename: str, user_id: int) -> str:
+    return f"users/{user_id}/documents/{filename}"
 
-import requests
 
 class StorageManager:
-    """Storage manager that handles both local and S3 storage"""
+    """
+    Stores fracture images and documents through the configured backends
+
+    `images` and `documents` are StorageBackend instances (local, S3 or
+    in-memory, see STORAGE_BACKEND); tests and benchmarks can swap them.
+    """
     def __init__(self):
-        self.is_production = settings.ENV_MODE == "production"
-    
-    def save_image(self, file_bytes: bytes, filename: str, user_id: int) -> str:
+        self.images: StorageBackend = create_storage_backend("images")
+        self.documents: StorageBackend = create_storage_backend("documents")
+
+    @property
+    def image_cache(self) -> Optional[DiskLRUCache]:
+        """Disk cache in front of remote image reads, if the image backend has one"""
+        return getattr(self.images, "cache", None)
+
+    def save_image_content(self, file_bytes: bytes, image_sha256: str) -> Tuple[str, bool]:
+        """
+        Save a stored image under its SHA-256, skipping the write if that content exists
+
+        Returns the path or URL and whether it was written.
+        """
+        return self.images.put_if_absent(content_addressed_image_name(image_sha256), file_bytes, "image/jpeg")
+
+    def save_document(self, file_bytes: Union[bytes, BinaryIO], filename: str, user_id: int) -> str:
         """
-        Save image file
+        Save document file from bytes or a readable file
+
+        Returns the local path, or the S3 key in production
         """
-        if self.is_production:
-            # Save to S3
-            return s3_manager.upload_image(file_bytes, filename, user_id)
-        else:
-            # Save locally
-            local_path = save_uploaded_file(file_bytes, filename, user_id)
-            return local_path
-    
-    def save_document(self, file_bytes: bytes, filename: str, user_id: int) -> str:
+        return self.documents.put(document_key(filename, user_id), file_bytes)
+
+    async def asave_document(self, file_bytes: Union[bytes, BinaryIO], filename: str, user_id: int) -> str:
+        """save_document without blocking the event loop"""
+        return await self.documents.aput(document_key(filename, user_id), file_bytes)
+
+    def get_file_bytes(self, file_path: str, content_sha256: Optional[str] = None) -> bytes:
         """
-        Save document file
+        Read a stored image
+
+        Args:
+            file_path: Path or URL from save_image_content
+            content_sha256: SHA-256 of the stored bytes, if the caller knows it
         """
-        if self.is_production:
-            return s3_manager.upload_document(file_bytes, filename, user_id)
-        else:
-            
-            local_path = save_document_file(file_bytes, filename, user_id)
-            return local_path
-    
-    def get_file_bytes(self, file_path: str) -> bytes:
+        return self.images.get(file_path, content_sha256)
+
+    async def aget_file_bytes(self, file_path: str, content_sha256: Optional[str] = None) -> bytes:
+        """get_file_bytes without blocking the event loop"""
+        return await self.images.aget(file_path, content_sha256)
+
+    def local_document(self, document_path: str) -> ContextManager[str]:
         """
-        Read file bytes from storage
+        Local path of a stored document (path or S3 key from save_document)
+
+        Remote documents are streamed to a temporary file, removed on exit.
         """
-        if self.is_production and file_path.startswith('https://'):
-            # Download from S3 URL
-            response = requests.get(file_path)
-            response.raise_for_status()
-            return response.content
-        else:
-            # Read from local file system
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-            
-            with open(file_path, 'rb') as f:
-                return f.read()
-    
+        return self.documents.local_copy(document_path)
+
     def delete_file(self, file_path: str) -> bool:
-        """Delete file from storage"""
-        if self.is_production and file_path.startswith('https://'):
-            # Extract bucket and key from URL
-            parts = file_path.replace('https://', '').split('/')
-            bucket = parts[0].split('.')[0]
-            key = '/'.join(parts[1:])
-            return s3_manager.delete_file(bucket, key)
-        else:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-            return False
-
-storage_manager = StorageManager()
\ No newline at end of file
+        """Delete a stored image"""
+        return self.images.delete(file_path)
+
+storage_manager = StorageManager()
@@ -0,0 +1,30 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    """Accumulates wall-clock milliseconds per named stage"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block and add it to the named stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, milliseconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + milliseconds
+
+    def update(self, timings: Dict[str, float]):
+        """Merge timings measured elsewhere (e.g. by the predictor)"""
+        for name, milliseconds in timings.items():
+            self.add(name, milliseconds)
+
+    def total(self) -> float:
+        return sum(self.timings.values())
@@ -0,0 +1,310 @@
+import hashlib
+import io
+import os
+import tempfile
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Part headers and boundaries around the file; a body longer than the file limit plus this is refused unread
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class SpooledUpload:
+    """
+    Upload received off the request in chunks, hashed and size-checked on the way
+
+    Small uploads stay in memory; past UPLOAD_SPOOL_MAX_MEMORY the copy moves to
+    a named temporary file, so worker processes can open it by path and the
+    API process never holds a whole large upload.
+    """
+
+    def __init__(self, filename: str, max_memory: Optional[int] = None):
+        self.filename = filename
+        self.size = 0
+        self.max_memory = settings.UPLOAD_SPOOL_MAX_MEMORY if max_memory is None else max_memory
+        self.path: Optional[str] = None
+        self._file: BinaryIO = io.BytesIO()
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def write(self, chunk: bytes):
+        if self.in_memory and self.size + len(chunk) > self.max_memory:
+            self._rollover()
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def _rollover(self):
+        spool_dir = settings.UPLOAD_SPOOL_DIR or None
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+
+        # The suffix keeps the format visible to readers that go by extension
+        fd, self.path = tempfile.mkstemp(dir=spool_dir, suffix=os.path.splitext(self.filename)[1].lower())
+        disk_file = os.fdopen(fd, "w+b")
+        disk_file.write(self._file.getvalue())
+        self._file = disk_file
+
+    def source(self) -> Union[bytes, str]:
+        """The bytes of an in-memory upload, or the spool file's path"""
+        self._file.flush()
+        if self.in_memory:
+            return self._file.getvalue()
+        return self.path
+
+    def open(self) -> BinaryIO:
+        """The spooled upload, rewound, for readers that stream it"""
+        self._file.flush()
+        self._file.seek(0)
+        return self._file
+
+    def close(self):
+        """Release the memory or delete the spool file"""
+        self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def file_digest(fileobj: BinaryIO) -> Tuple[str, int]:
+    """SHA-256 and size of a file, read in chunks from its start"""
+    fileobj.seek(0)
+    digest, size = hashlib.sha256(), 0
+    while chunk := fileobj.read(UPLOAD_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _too_large(max_size: int, what: str = "File") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"{what} too large. Max size: {max_size / (1024*1024):.0f}MB"
+    )
+
+
+def _write_chunks(chunks: List[Tuple[SpooledUpload, bytes]]):
+    for upload, chunk in chunks:
+        upload.write(chunk)
+
+
+def _stays_in_memory(chunks: List[Tuple[SpooledUpload, bytes]]) -> bool:
+    """Whether writing the chunks leaves every upload in memory"""
+    sizes: Dict[SpooledUpload, int] = {}
+    for upload, chunk in chunks:
+        sizes[upload] = sizes.get(upload, upload.size) + len(chunk)
+        if not upload.in_memory or sizes[upload] > upload.max_memory:
+            return False
+    return True
+
+
+class _MultipartReceiver:
+    """python-multipart callbacks that collect the files of one form field as SpooledUploads"""
+
+    def __init__(
+        self,
+        field_name: str,
+        max_size: Union[int, Callable[[str], int]],
+        validate: Optional[Callable[[SpooledUpload], None]],
+        max_files: int = 1
+    ):
+        self.field_name = field_name
+        self.max_size = max_size
+        self.validate = validate
+        self.max_files = max_files
+        self.uploads: List[SpooledUpload] = []
+        # File data parsed from the latest body chunk, and the size and limit of the file being received
+        self.chunks: List[Tuple[SpooledUpload, bytes]] = []
+        self.size = 0
+        self.limit = 0
+        self.receiving = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if b"filename" not in options or options.get(b"name", b"").decode("latin-1") != self.field_name:
+            return
+        if len(self.uploads) == self.max_files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Too many files. Max per upload: {self.max_files}"
+            )
+
+        upload = SpooledUpload(options[b"filename"].decode("utf-8", "replace"))
+        self.uploads.append(upload)
+        self.receiving = True
+        self.size = 0
+        self.limit = self.max_size(upload.filename) if callable(self.max_size) else self.max_size
+        if self.validate:
+            # Extension and the like, before a byte of the file is spooled
+            self.validate(upload)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self.receiving:
+            return
+        self.size += end - start
+        if self.size > self.limit:
+            raise _too_large(self.limit)
+        self.chunks.append((self.uploads[-1], data[start:end]))
+
+    def on_part_end(self):
+        self.receiving = False
+
+
+async def _receive(request: Request, receiver: _MultipartReceiver, body_limit: int, too_large: HTTPException):
+    """Feed the request body to the receiver, spooling file data as it is parsed"""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > body_limit:
+        raise too_large
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data upload")
+
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+    received = 0
+    try:
+        async for body in request.stream():
+            # Also bounds chunked bodies and other fields, which Content-Length does not
+            received += len(body)
+            if received > body_limit:
+                raise too_large
+            try:
+                parser.write(body)
+            except MultipartParseError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+
+            if receiver.chunks:
+                chunks, receiver.chunks = receiver.chunks, []
+                if _stays_in_memory(chunks):
+                    _write_chunks(chunks)
+                else:
+                    # Disk writes, and the rollover to disk, stay off the event loop
+                    await run_in_threadpool(_write_chunks, chunks)
+        parser.finalize()
+        if receiver.receiving:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload ended before the file did")
+    except BaseException:
+        for upload in receiver.uploads:
+            upload.close()
+        raise
+
+    if not receiver.uploads:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file provided")
+
+
+async def receive_upload(
+    request: Request,
+    field_name: str,
+    max_size: int,
+    validate: Optional[Callable[[SpooledUpload], None]] = None
+) -> SpooledUpload:
+    """
+    Stream the file field of a multipart request straight into a SpooledUpload
+
+    The body is parsed as it arrives, so the spool is the only copy of the
+    upload (Starlette's form parsing would spool it once more first). A
+    Content-Length over the limit is refused before any of the body is
+    read, and an upload as soon as more than max_size bytes of it arrive.
+    validate is called with the upload, named but still empty, once the
+    part's headers are in. Other form fields are ignored.
+
+    Raises:
+        HTTPException: 400 for a malformed body or without the file field,
+            413 once max_size is passed
+    """
+    receiver = _MultipartReceiver(field_name, max_size, validate)
+    await _receive(request, receiver, max_size + MULTIPART_OVERHEAD, _too_large(max_size))
+    return receiver.uploads[0]
+
+
+async def receive_uploads(
+    request: Request,
+    field_name: str,
+    max_size: Union[int, Callable[[str], int]],
+    max_total: int,
+    max_files: int,
+    validate: Optional[Callable[[SpooledUpload], None]] = None
+) -> List[SpooledUpload]:
+    """
+    Stream every file of a multipart field into its own SpooledUpload
+
+    Like receive_upload, for a field sent once per file. max_size is the
+    limit of each file, or a function of its filename; max_total bounds the
+    whole body and max_files the number of files.
+
+    Raises:
+        HTTPException: 400 for a malformed body, without a file or with more
+            than max_files, 413 once a file or the body passes its limit
+    """
+    receiver = _MultipartReceiver(field_name, max_size, validate, max_files)
+    await _receive(request, receiver, max_total + MULTIPART_OVERHEAD, _too_large(max_total, "Upload"))
+    return receiver.uploads
+
+
+def multipart_file_openapi(field_name: str, multiple: bool = False) -> Dict:
+    """OpenAPI request body of an endpoint that reads its file with receive_upload, or its files with receive_uploads"""
+    schema = {"type": "string", "format": "binary"}
+    if multiple:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field_name],
+                        "properties": {field_name: schema},
+                    }
+                }
+            },
+        }
+    }
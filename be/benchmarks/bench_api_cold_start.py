@@ -0,0 +1,61 @@
+"""
+API cold-start time and per-worker RSS.
+
+Starts fresh interpreters that import the FastAPI app the way a uvicorn
+worker does and reports import wall time, resident memory and whether any
+model runtime (torch, ultralytics, sentence_transformers) was imported.
+
+Usage (from be/):
+    python -m benchmarks.bench_api_cold_start --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, sys, time
+from unittest.mock import patch
+
+# Table creation talks to the database; keep it out of the measurement
+patch("sqlalchemy.schema.MetaData.create_all", lambda *a, **kw: None).start()
+
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+
+import psutil
+print(json.dumps({
+    "import_s": elapsed,
+    "rss_mb": psutil.Process().memory_info().rss / 2**20,
+    "heavy_modules": sorted(
+        name for name in ("torch", "ultralytics", "sentence_transformers", "transformers")
+        if name in sys.modules
+    ),
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD], capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    import_times = [result["import_s"] for result in results]
+    rss = [result["rss_mb"] for result in results]
+    print(f"runs:            {args.runs}")
+    print(f"import time (s): median {statistics.median(import_times):.2f}, max {max(import_times):.2f}")
+    print(f"worker RSS (MB): median {statistics.median(rss):.0f}, max {max(rss):.0f}")
+    print(f"model runtimes:  {', '.join(results[-1]['heavy_modules']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
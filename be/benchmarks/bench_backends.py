@@ -0,0 +1,86 @@
+"""
+Per-image latency and worker RSS for each fracture model backend.
+
+Each backend runs in a fresh interpreter configured the way a worker would be
+(FRACTURE_MODEL_BACKEND / FRACTURE_MODEL_PATH), so resident memory reflects
+only what that backend imports and loads.
+
+Usage (from be/):
+    python -m app.services.bone_fracture_predict.export --backend onnxruntime
+    python -m app.services.bone_fracture_predict.export --backend openvino
+    python -m benchmarks.bench_backends
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CHILD = r"""
+import io, json, sys, time
+import numpy as np
+import psutil
+from PIL import Image
+
+from app.services.bone_fracture_predict.predictor import get_fracture_predictor
+
+fracture_predictor = get_fracture_predictor()
+
+rng = np.random.default_rng(0)
+buffer = io.BytesIO()
+Image.fromarray(rng.integers(0, 255, size=(640, 640, 3), dtype=np.uint8)).save(buffer, format="JPEG")
+image = buffer.getvalue()
+
+for _ in range(3):
+    fracture_predictor.predict(image)
+
+count = int(sys.argv[1])
+timings = []
+for _ in range(count):
+    start = time.perf_counter()
+    fracture_predictor.predict(image)
+    timings.append((time.perf_counter() - start) * 1000)
+
+print(json.dumps({
+    "p50_ms": float(np.percentile(timings, 50)),
+    "p95_ms": float(np.percentile(timings, 95)),
+    "rss_mb": psutil.Process().memory_info().rss / 2**20,
+    "torch_imported": "torch" in sys.modules,
+}))
+"""
+
+
+def run_backend(backend: str, model_path: str, count: int) -> dict:
+    env = dict(os.environ, FRACTURE_MODEL_BACKEND=backend, FRACTURE_MODEL_PATH=model_path)
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, str(count)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    # Resolved by path so the parent process does not load a model itself
+    model_dir = os.path.join("app", "services", "bone_fracture_predict")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--torch", default=os.path.join(model_dir, "fracture_model.pt"))
+    parser.add_argument("--onnxruntime", default=os.path.join(model_dir, "fracture_model.onnx"))
+    parser.add_argument("--openvino", default=os.path.join(model_dir, "fracture_model_openvino_model"))
+    parser.add_argument("--count", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'backend':<12} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'torch':>6}")
+    for backend in ("torch", "onnxruntime", "openvino"):
+        model_path = getattr(args, backend)
+        if not os.path.exists(model_path):
+            print(f"{backend:<12} skipped, {model_path} not found")
+            continue
+        stats = run_backend(backend, model_path, args.count)
+        print(
+            f"{backend:<12} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+            f"{stats['rss_mb']:>8.0f} {str(stats['torch_imported']):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Throughput benchmark for batched fracture inference on CPU.
+
+Runs the same set of 640x640 images through FracturePredictor.predict_batch
+at several batch sizes, then through BatchInferenceEngine with concurrent
+callers, and prints images/second for each configuration.
+
+Usage (from be/):
+    python -m benchmarks.bench_batch_inference --model path/to/fracture_model.pt
+    python -m benchmarks.bench_batch_inference --images-dir uploads/fracture_images
+"""
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+from PIL import Image
+
+from app.services.bone_fracture_predict.predictor import FracturePredictor
+from app.services.bone_fracture_predict.batching import BatchInferenceEngine
+
+
+def load_images(images_dir: str, count: int) -> List[bytes]:
+    """Read stored images, or synthesize noisy 640x640 JPEGs if no folder given"""
+    if images_dir:
+        paths = sorted(
+            os.path.join(images_dir, name) for name in os.listdir(images_dir)
+            if name.lower().endswith((".jpg", ".jpeg", ".png"))
+        )[:count]
+        images = []
+        for path in paths:
+            with open(path, "rb") as f:
+                images.append(f.read())
+        return images
+
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        array = rng.integers(0, 255, size=(640, 640), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(array).convert("RGB").save(buffer, format="JPEG", quality=95)
+        images.append(buffer.getvalue())
+    return images
+
+
+def bench_direct(predictor: FracturePredictor, images: List[bytes], batch_size: int) -> float:
+    """Images/second calling predict_batch with fixed-size chunks"""
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        predictor.predict_batch(images[i:i + batch_size])
+    return len(images) / (time.perf_counter() - start)
+
+
+def bench_engine(predictor: FracturePredictor, images: List[bytes], batch_size: int, max_wait_ms: float) -> float:
+    """Images/second with one caller thread per image, as a thread-pool worker would see"""
+    engine = BatchInferenceEngine(predictor, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(batch_size, 1) * 2) as pool:
+        list(pool.map(engine.predict, images))
+    return len(images) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join("app", "services", "bone_fracture_predict", "fracture_model.pt"))
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--images-dir", default=None)
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    predictor = FracturePredictor(model_path=args.model, backend=args.backend)
+    if predictor.backend is None:
+        raise SystemExit(f"Could not load model from {args.model}")
+
+    images = load_images(args.images_dir, args.count)
+    print(f"{len(images)} images, model {args.model} ({args.backend})\n")
+
+    # Warm up so lazy initialisation does not count against batch size 1
+    predictor.predict_batch(images[:max(args.batch_sizes)])
+
+    print(f"{'batch':>6} {'direct img/s':>14} {'engine img/s':>14}")
+    for batch_size in args.batch_sizes:
+        direct = bench_direct(predictor, images, batch_size)
+        engine = bench_engine(predictor, images, batch_size, args.max_wait_ms)
+        print(f"{batch_size:>6} {direct:>14.2f} {engine:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Single-channel against 3-channel storage of grayscale X-rays.
+
+For each image of a sample set, letterboxes it with resize_image_to_640 both
+ways (keep_grayscale True and False) and reports the stored JPEG size, the
+median time to decode it into the model-ready array, the size of that array
+as cached on disk, and the cost of expanding a grayscale array to RGB at the
+model input. Colour sources are listed too; they are stored the same way in
+both modes unless their pixels are gray.
+
+Without --image-dir a synthetic sample set of radiograph-like JPEGs
+(grayscale and gray-in-RGB) is generated.
+
+Usage (from be/):
+    python -m benchmarks.bench_grayscale
+    python -m benchmarks.bench_grayscale --image-dir /data/xrays --runs 20
+"""
+import argparse
+import os
+import statistics
+import time
+
+from app.services.bone_fracture_predict.backends import to_rgb
+from app.services.bone_fracture_predict.model_ready import decode_model_ready
+from app.utils.image_utils import IMAGE_ALLOWED_EXTENSIONS, resize_image_to_640
+from benchmarks.bench_resize import synthetic_radiograph
+
+SYNTHETIC_SIZES = [(1024, 1024), (2048, 2500), (3000, 3000)]
+
+
+def median_ms(func, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(stored: bytes, runs: int) -> dict:
+    array = decode_model_ready(stored)
+    return {
+        "bytes": len(stored),
+        "decode_ms": median_ms(lambda: decode_model_ready(stored), runs),
+        "array_bytes": array.nbytes,
+        "channels": 1 if array.ndim == 2 else array.shape[2],
+        "expand_ms": median_ms(lambda: to_rgb(array), runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image-dir", default=None, help="Sample set of real images (default: synthetic)")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.image_dir:
+        samples = []
+        for name in sorted(os.listdir(args.image_dir)):
+            if os.path.splitext(name)[1].lower() in IMAGE_ALLOWED_EXTENSIONS:
+                with open(os.path.join(args.image_dir, name), "rb") as f:
+                    samples.append((name, f.read()))
+    else:
+        samples = [
+            (f"{width}x{height}_{mode}.jpg", synthetic_radiograph((width, height), mode))
+            for width, height in SYNTHETIC_SIZES
+            for mode in ("L", "RGB")
+        ]
+
+    print(f"{'image':<28} {'ch':>3} {'RGB KB':>8} {'gray KB':>8} {'RGB ms':>8} {'gray ms':>8} "
+          f"{'RGB npy':>8} {'gray npy':>8} {'expand':>7}")
+    totals = {"rgb": [], "gray": []}
+    for name, data in samples:
+        rgb = measure(resize_image_to_640(data, keep_grayscale=False)[0], args.runs)
+        gray = measure(resize_image_to_640(data)[0], args.runs)
+        totals["rgb"].append(rgb)
+        totals["gray"].append(gray)
+        print(
+            f"{name[:28]:<28} {gray['channels']:>3} {rgb['bytes'] / 1024:>8.1f} {gray['bytes'] / 1024:>8.1f} "
+            f"{rgb['decode_ms']:>8.2f} {gray['decode_ms']:>8.2f} "
+            f"{rgb['array_bytes'] / 1024:>7.0f}K {gray['array_bytes'] / 1024:>7.0f}K "
+            f"{gray['expand_ms'] if gray['channels'] == 1 else 0:>7.2f}"
+        )
+
+    def total(key, field):
+        return sum(row[field] for row in totals[key])
+
+    print()
+    for label, field in (("stored bytes", "bytes"), ("decode ms", "decode_ms"), ("model-ready bytes", "array_bytes")):
+        rgb, gray = total("rgb", field), total("gray", field)
+        print(f"{label:<18} RGB {rgb:>12.1f}   gray {gray:>12.1f}   {100 * (1 - gray / rgb):5.1f}% less")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark for the model-ready image fast path.
+
+Compares what a worker spends per image before the forward pass when it
+reads and decodes the stored 640x640 JPEG against memory-mapping the cached
+.npy copy. With --model it also times full predictions through both paths.
+
+Usage (from be/):
+    python -m benchmarks.bench_model_ready
+    python -m benchmarks.bench_model_ready --images-dir uploads/fracture_images --model path/to/fracture_model.onnx --backend onnxruntime
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from benchmarks.bench_batch_inference import load_images
+
+
+def time_per_image(func: Callable, items: List, repeats: int) -> List[float]:
+    """Milliseconds per call, over all items, repeated"""
+    timings = []
+    for _ in range(repeats):
+        for item in items:
+            start = time.perf_counter()
+            func(item)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(label: str, timings: List[float]) -> float:
+    median = statistics.median(timings)
+    p95 = float(np.percentile(timings, 95))
+    print(f"{label:<34} p50 {median:7.3f} ms   p95 {p95:7.3f} ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images-dir", default=None, help="Folder of stored 640x640 images (default: synthetic)")
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--model", default=None, help="Also time full predictions with this model")
+    parser.add_argument("--backend", default="torch")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # The cache directory is read on every call, so a scratch folder keeps uploads/ untouched
+        from app.core.config import settings
+        settings.MODEL_READY_CACHE_DIR = cache_dir
+        from app.services.bone_fracture_predict.model_ready import (
+            decode_model_ready, load_model_ready, save_model_ready
+        )
+
+        images = load_images(args.images_dir, args.count)
+        jpeg_paths, shas = [], []
+        for index, image_bytes in enumerate(images):
+            path = os.path.join(cache_dir, f"{index}.jpg")
+            with open(path, "wb") as f:
+                f.write(image_bytes)
+            jpeg_paths.append(path)
+
+            sha = f"{index:064x}"
+            if save_model_ready(sha, decode_model_ready(image_bytes)) is None:
+                raise SystemExit(f"Image {index} is not 640x640; run it through resize_image_to_640 first")
+            shas.append(sha)
+
+        def read_and_decode(path):
+            with open(path, "rb") as f:
+                return decode_model_ready(f.read())
+
+        def map_model_ready(sha):
+            # Touch every page so the comparison includes actually reading the pixels
+            return int(load_model_ready(sha).sum(dtype=np.uint64))
+
+        def read_decode_and_touch(path):
+            return int(read_and_decode(path).sum(dtype=np.uint64))
+
+        print(f"{len(images)} images x {args.repeats} repeats")
+        decoded = summarize("read + decode JPEG", time_per_image(read_decode_and_touch, jpeg_paths, args.repeats))
+        mapped = summarize("mmap model-ready .npy", time_per_image(map_model_ready, shas, args.repeats))
+        print(f"{'saved per image':<34} {decoded - mapped:7.3f} ms ({decoded / mapped:.1f}x)")
+
+        if args.model:
+            from app.services.bone_fracture_predict.predictor import FracturePredictor
+
+            predictor = FracturePredictor(model_path=args.model, backend=args.backend)
+            predictor.predict(images[0])
+
+            def predict_bytes(path):
+                with open(path, "rb") as f:
+                    return predictor.predict(f.read())
+
+            print()
+            full = summarize(f"predict from JPEG ({args.backend})", time_per_image(predict_bytes, jpeg_paths, args.repeats))
+            fast = summarize(
+                f"predict from .npy ({args.backend})",
+                time_per_image(lambda sha: predictor.predict(load_model_ready(sha)), shas, args.repeats)
+            )
+            print(f"{'saved per prediction':<34} {full - fast:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Lookup latency of the near-duplicate index at scale.
+
+Builds a MultiIndexHash of --count perceptual hashes and times search() for
+queries that are near duplicates of a stored image (within the radius) and
+for new images (outside it), against a NumPy linear scan over the same hashes.
+
+Stored X-rays resemble each other far more than random bits do, which is
+the hard case for a multi-index table (crowded buckets). The hashes are
+therefore generated around the pHashes of synthetic radiographs: each
+stored hash is a base hash with 8 to 24 random bits flipped. --random uses
+uniform random hashes instead.
+
+Usage (from be/):
+    python -m benchmarks.bench_near_duplicates
+    python -m benchmarks.bench_near_duplicates --count 100000 --max-distance 8
+"""
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.services.bone_fracture_predict.near_duplicates import MultiIndexHash, to_unsigned
+from app.utils.image_utils import perceptual_hash
+from benchmarks.bench_resize import synthetic_radiograph
+
+
+def flip_bits(value: int, count: int, rng: np.random.Generator) -> int:
+    for bit in rng.choice(64, size=count, replace=False):
+        value ^= 1 << int(bit)
+    return value
+
+
+def base_hashes(count: int) -> list:
+    """pHashes of synthetic radiographs of varied sizes"""
+    hashes = []
+    for i in range(count):
+        data = synthetic_radiograph((320 + 7 * i, 400), "L")
+        hashes.append(to_unsigned(perceptual_hash(Image.open(io.BytesIO(data)))))
+    return hashes
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--max-distance", type=int, nargs="+", default=[6, 8])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--bases", type=int, default=200, help="Synthetic radiographs the hashes cluster around")
+    parser.add_argument("--random", action="store_true", help="Uniform random hashes instead of clustered ones")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.random:
+        stored = [int(value) for value in rng.integers(0, 2 ** 64, size=args.count, dtype=np.uint64)]
+    else:
+        bases = base_hashes(args.bases)
+        stored = [flip_bits(bases[i % len(bases)], int(rng.integers(8, 25)), rng) for i in range(args.count)]
+    matrix = np.array(stored, dtype=np.uint64)
+
+    print(f"{args.count} stored hashes ({'random' if args.random else f'clustered around {args.bases} radiographs'})")
+    print(f"{'radius':>6} {'build s':>8} {'query':>10} {'p50 ms':>8} {'p99 ms':>8} {'scan p50':>9} {'recall':>7}")
+
+    for max_distance in args.max_distance:
+        start = time.perf_counter()
+        index = MultiIndexHash(max_distance)
+        for item_id, value in enumerate(stored):
+            index.add(item_id, value)
+        build_seconds = time.perf_counter() - start
+
+        for kind in ("duplicate", "new"):
+            timings, scans, found = [], [], 0
+            for _ in range(args.queries):
+                target = int(rng.integers(args.count))
+                flips = int(rng.integers(0, max_distance + 1)) if kind == "duplicate" else int(rng.integers(10, 21))
+                query = flip_bits(stored[target], flips, rng)
+
+                start = time.perf_counter()
+                matches = index.search(query)
+                timings.append((time.perf_counter() - start) * 1000)
+                found += any(item_id == target for _, item_id in matches)
+
+                start = time.perf_counter()
+                xor = matrix ^ np.uint64(query)
+                distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+                np.flatnonzero(distances <= max_distance)
+                scans.append((time.perf_counter() - start) * 1000)
+
+            recall = f"{found / args.queries:.3f}" if kind == "duplicate" else "-"
+            print(
+                f"{max_distance:>6} {build_seconds:>8.2f} {kind:>10} {statistics.median(timings):>8.3f} "
+                f"{percentile(timings, 99):>8.3f} {statistics.median(scans):>9.2f} {recall:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
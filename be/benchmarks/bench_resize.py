@@ -0,0 +1,136 @@
+"""
+resize_image_to_640 with and without the fast downscale path.
+
+For each image of a corpus, reports median time and peak memory of the full
+decode + LANCZOS resize and of the fast path (JPEG draft decoding and
+reduce() before the final LANCZOS pass), plus how far the fast output's
+pixels are from the full-resolution output. Each timing runs in a fresh
+interpreter so peak RSS growth is per image (Linux only).
+
+Without --image-dir a synthetic corpus of radiograph-like JPEGs (grayscale
+and RGB, 1 to 30 megapixels) is generated.
+
+Usage (from be/):
+    python -m benchmarks.bench_resize
+    python -m benchmarks.bench_resize --image-dir /data/xrays --runs 5
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from app.utils.image_utils import IMAGE_ALLOWED_EXTENSIONS, resize_image_to_640
+
+SYNTHETIC_SIZES = [(1024, 1024), (2048, 2500), (3000, 3000), (4256, 3488), (5000, 6000)]
+
+CHILD = r"""
+import json, statistics, sys, time
+
+from app.utils.image_utils import resize_image_to_640
+
+def status_kb(field):
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field + ":"))
+
+path, fast, runs = sys.argv[1], sys.argv[2] == "fast", int(sys.argv[3])
+with open(path, "rb") as f:
+    data = f.read()
+
+# Reset the RSS high-water mark so it only covers the resizes
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+baseline_kb = status_kb("VmRSS")
+
+timings = []
+for _ in range(runs):
+    start = time.perf_counter()
+    resize_image_to_640(data, fast_downscale=fast)
+    timings.append((time.perf_counter() - start) * 1000)
+
+print(json.dumps({
+    "median_ms": statistics.median(timings),
+    "peak_mb": (status_kb("VmHWM") - baseline_kb) / 1024,
+}))
+"""
+
+
+def synthetic_radiograph(size, mode: str) -> bytes:
+    """Smooth bone-like structures plus sensor noise, saved as a JPEG"""
+    width, height = size
+    rng = np.random.default_rng(width * height)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = np.full((height, width), 30.0, dtype=np.float32)
+    for _ in range(6):
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        rx, ry = rng.uniform(0.05, 0.3) * width, rng.uniform(0.05, 0.3) * height
+        image += 150 * np.exp(-(((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2))
+    image += rng.normal(0, 6, size=image.shape)
+    pixels = np.clip(image, 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, "L").convert(mode).save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def pixel_difference(reference: bytes, candidate: bytes) -> dict:
+    a = np.asarray(Image.open(io.BytesIO(reference)).convert("RGB"), dtype=np.float64)
+    b = np.asarray(Image.open(io.BytesIO(candidate)).convert("RGB"), dtype=np.float64)
+    mse = float(np.mean((a - b) ** 2))
+    return {
+        "mean_abs": float(np.mean(np.abs(a - b))),
+        "max_abs": float(np.max(np.abs(a - b))),
+        "psnr_db": float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse),
+    }
+
+
+def measure(path: str, fast: bool, runs: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, path, "fast" if fast else "full", str(runs)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image-dir", default=None, help="Corpus of real images (default: synthetic)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.image_dir:
+            paths = sorted(
+                os.path.join(args.image_dir, name) for name in os.listdir(args.image_dir)
+                if os.path.splitext(name)[1].lower() in IMAGE_ALLOWED_EXTENSIONS
+            )
+        else:
+            paths = []
+            for size in SYNTHETIC_SIZES:
+                for mode in ("L", "RGB"):
+                    path = os.path.join(workdir, f"{size[0]}x{size[1]}_{mode}.jpg")
+                    with open(path, "wb") as f:
+                        f.write(synthetic_radiograph(size, mode))
+                    paths.append(path)
+
+        print(f"{'image':<28} {'full ms':>8} {'fast ms':>8} {'full MB':>8} {'fast MB':>8} "
+              f"{'mean |d|':>8} {'max |d|':>8} {'PSNR dB':>8}")
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            full, fast = measure(path, False, args.runs), measure(path, True, args.runs)
+            diff = pixel_difference(resize_image_to_640(data, False)[0], resize_image_to_640(data, True)[0])
+            print(
+                f"{os.path.basename(path)[:28]:<28} {full['median_ms']:>8.1f} {fast['median_ms']:>8.1f} "
+                f"{full['peak_mb']:>8.1f} {fast['peak_mb']:>8.1f} "
+                f"{diff['mean_abs']:>8.2f} {diff['max_abs']:>8.0f} {diff['psnr_db']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
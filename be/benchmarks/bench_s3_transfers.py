@@ -0,0 +1,320 @@
+"""
+Large document transfers to and from S3: time and peak memory.
+
+Uploads a --size MB document once as a single PutObject of the whole body
+(the old upload path) and once through S3StorageBackend.put from the
+spooled file (multipart, --concurrency parts at a time), then reads it
+back once with get_object().read() and once with stream(), hashing the
+chunks as ingestion does.
+
+The bucket is a minimal S3-compatible server started in a child process
+on this machine (objects, ranged GETs and multipart uploads, path-style,
+no auth), so peak memory is the client's alone: the tracemalloc peak of
+this process. Loopback has no round trip and no bandwidth limit, so the
+server delays every request by --latency-ms and paces each connection to
+--bandwidth-mbps, as S3 limits each connection; parallel parts then
+overlap as they do against S3. Pass --endpoint-url to use a running
+S3-compatible server (MinIO, moto_server) instead.
+
+Usage (from be/):
+    python -m benchmarks.bench_s3_transfers
+    python -m benchmarks.bench_s3_transfers --size 50 --concurrency 8
+    python -m benchmarks.bench_s3_transfers --endpoint-url http://localhost:9000
+"""
+import argparse
+import contextlib
+import hashlib
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import boto3
+
+from app.core.config import settings
+from app.storage import S3StorageBackend
+
+MB = 1024 * 1024
+BUCKET = "bench-documents"
+KEY = "users/1/documents/bench.pdf"
+
+# Bodies are read and written in slices of this size, pacing each one
+SLICE = 256 * 1024
+
+
+class _S3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _route(self):
+        time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        query = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        return os.path.join(self.server.root, bucket), key, query
+
+    def _pace(self, size: int):
+        if self.server.bandwidth:
+            time.sleep(size / self.server.bandwidth)
+
+    def _read_body(self, path: str):
+        remaining = int(self.headers.get("Content-Length") or 0)
+        digest = hashlib.md5()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            while remaining:
+                data = self.rfile.read(min(SLICE, remaining))
+                remaining -= len(data)
+                digest.update(data)
+                f.write(data)
+                self._pace(len(data))
+        return digest
+
+    def _reply(self, status: int, body: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, code: str):
+        body = f"<Error><Code>{code}</Code><Message>{code}</Message></Error>".encode()
+        self._reply(status, b"" if self.command == "HEAD" else body, {"Content-Type": "application/xml"})
+
+    def do_PUT(self):
+        bucket_dir, key, query = self._route()
+        if not key:
+            os.makedirs(bucket_dir, exist_ok=True)
+            self._reply(200)
+        elif "uploadId" in query:
+            part = os.path.join(self.server.root, ".uploads", query["uploadId"], query["partNumber"])
+            self._reply(200, headers={"ETag": f'"{self._read_body(part).hexdigest()}"'})
+        else:
+            path = os.path.join(bucket_dir, key)
+            etag = self._read_body(path + ".tmp").hexdigest()
+            os.replace(path + ".tmp", path)
+            with open(path + ".etag", "w") as f:
+                f.write(f'"{etag}"')
+            self._reply(200, headers={"ETag": f'"{etag}"'})
+
+    def do_POST(self):
+        bucket_dir, key, query = self._route()
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            os.makedirs(os.path.join(self.server.root, ".uploads", upload_id))
+            self._reply(200, (
+                f"<InitiateMultipartUploadResult><Bucket>{BUCKET}</Bucket><Key>{key}</Key>"
+                f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            ).encode())
+            return
+
+        upload_dir = os.path.join(self.server.root, ".uploads", query["uploadId"])
+        parts = [int(number) for number in re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)]
+        path = os.path.join(bucket_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digests = hashlib.md5()
+        with open(path + ".tmp", "wb") as f:
+            for number in parts:
+                with open(os.path.join(upload_dir, str(number)), "rb") as part:
+                    digests.update(hashlib.file_digest(part, "md5").digest())
+                    part.seek(0)
+                    shutil.copyfileobj(part, f, SLICE)
+        os.replace(path + ".tmp", path)
+        shutil.rmtree(upload_dir)
+        etag = f'"{digests.hexdigest()}-{len(parts)}"'
+        with open(path + ".etag", "w") as f:
+            f.write(etag)
+        self._reply(200, (
+            f"<CompleteMultipartUploadResult><Bucket>{BUCKET}</Bucket><Key>{key}</Key>"
+            f"<ETag>{etag}</ETag></CompleteMultipartUploadResult>"
+        ).encode())
+
+    def do_DELETE(self):
+        bucket_dir, key, query = self._route()
+        if "uploadId" in query:
+            shutil.rmtree(os.path.join(self.server.root, ".uploads", query["uploadId"]), ignore_errors=True)
+        else:
+            for suffix in ("", ".etag"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(bucket_dir, key) + suffix)
+        self._reply(204)
+
+    def do_GET(self):
+        bucket_dir, key, _ = self._route()
+        path = os.path.join(bucket_dir, key)
+        if not os.path.isfile(path):
+            self._error(404, "NoSuchKey")
+            return
+        with open(path + ".etag") as f:
+            etag = f.read()
+        if self.headers.get("If-Match") not in (None, etag):
+            self._error(412, "PreconditionFailed")
+            return
+
+        size = os.path.getsize(path)
+        start, end, status = 0, size - 1, 200
+        byte_range = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if byte_range:
+            start, status = int(byte_range.group(1)), 206
+            end = min(int(byte_range.group(2) or size - 1), size - 1)
+            if start >= size:
+                self._error(416, "InvalidRange")
+                return
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                data = f.read(min(SLICE, remaining))
+                remaining -= len(data)
+                self.wfile.write(data)
+                self._pace(len(data))
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(root: str, latency_ms: float, bandwidth_mbps: float, ready):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _S3Handler)
+    server.daemon_threads = True
+    server.root = root
+    server.latency = latency_ms / 1000
+    server.bandwidth = bandwidth_mbps * MB
+    ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+class S3StandIn:
+    """Minimal S3-compatible server in a child process, storing objects under root"""
+
+    def __init__(self, root: str, latency_ms: float = 0.0, bandwidth_mbps: float = 0.0):
+        self.root = root
+        self.latency_ms = latency_ms
+        self.bandwidth_mbps = bandwidth_mbps
+        self.endpoint_url = None
+        self._process = None
+
+    def __enter__(self):
+        context = multiprocessing.get_context("fork")
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_serve, args=(self.root, self.latency_ms, self.bandwidth_mbps, sender), daemon=True
+        )
+        self._process.start()
+        self.endpoint_url = f"http://127.0.0.1:{receiver.recv()}"
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+        return result, time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(storage: S3StorageBackend, source: str):
+    def put_whole():
+        with open(source, "rb") as f:
+            body = f.read()
+        storage.client.put_object(Bucket=BUCKET, Key=KEY, Body=body, ServerSideEncryption="AES256")
+
+    def put_multipart():
+        with open(source, "rb") as f:
+            storage.put(KEY, f)
+
+    def read_whole():
+        return hashlib.sha256(storage.client.get_object(Bucket=BUCKET, Key=KEY)["Body"].read()).hexdigest()
+
+    def read_stream():
+        digest = hashlib.sha256()
+        for chunk in storage.stream(KEY):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    return [
+        (name, *measure(fn)) for name, fn in (
+            ("single PutObject", put_whole),
+            ("multipart put", put_multipart),
+            ("get().read()", read_whole),
+            ("ranged stream", read_stream),
+        )
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50, help="Document size in MB")
+    parser.add_argument("--part-size", type=int, default=settings.S3_MULTIPART_PART_SIZE // MB, help="MB")
+    parser.add_argument("--range-size", type=int, default=settings.S3_DOWNLOAD_RANGE_SIZE // MB, help="MB")
+    parser.add_argument("--concurrency", type=int, default=settings.S3_MULTIPART_CONCURRENCY)
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Delay of every stand-in request")
+    parser.add_argument("--bandwidth-mbps", type=float, default=40.0, help="MB/s of each stand-in connection")
+    parser.add_argument("--endpoint-url", default="", help="S3-compatible server to use instead of the stand-in")
+    args = parser.parse_args()
+
+    settings.S3_MULTIPART_THRESHOLD = settings.S3_MULTIPART_PART_SIZE = args.part_size * MB
+    settings.S3_DOWNLOAD_RANGE_SIZE = args.range_size * MB
+    settings.S3_MULTIPART_CONCURRENCY = args.concurrency
+
+    with contextlib.ExitStack() as stack:
+        workdir = stack.enter_context(tempfile.TemporaryDirectory())
+        endpoint_url = args.endpoint_url
+        if endpoint_url:
+            label = endpoint_url
+        else:
+            endpoint_url = stack.enter_context(
+                S3StandIn(os.path.join(workdir, "bucket"), args.latency_ms, args.bandwidth_mbps)
+            ).endpoint_url
+            label = f"local stand-in, {args.latency_ms:g} ms per request, {args.bandwidth_mbps:g} MB/s per connection"
+
+        client = boto3.client(
+            "s3", endpoint_url=endpoint_url, region_name="us-east-1",
+            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID", "minioadmin"),
+            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY", "minioadmin")
+        )
+        with contextlib.suppress(client.exceptions.BucketAlreadyOwnedByYou):
+            client.create_bucket(Bucket=BUCKET)
+        storage = S3StorageBackend(BUCKET, "us-east-1", client=client)
+
+        source = os.path.join(workdir, "bench.pdf")
+        with open(source, "wb") as f:
+            for _ in range(args.size):
+                f.write(os.urandom(MB))
+
+        print(f"{args.size} MB document, {args.part_size} MB parts x {args.concurrency}, "
+              f"{args.range_size} MB ranges ({label})")
+        rows = run(storage, source)
+        assert rows[2][1] == rows[3][1], "stream() and get().read() disagree"
+
+        print(f"{'':<18} {'seconds':>8} {'MB/s':>8} {'peak MB':>8}")
+        for name, _, elapsed, peak in rows:
+            print(f"{name:<18} {elapsed:>8.2f} {args.size / elapsed:>8.1f} {peak / MB:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
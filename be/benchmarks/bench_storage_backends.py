@@ -0,0 +1,94 @@
+"""
+Event-loop cost of storage calls in async endpoints, offline.
+
+Runs --requests concurrent handler coroutines that each store and read
+back an object, once calling the blocking backend methods on the event loop
+and once awaiting the "a" forms, which run in the I/O executor. A heartbeat
+coroutine measures how late the loop wakes it up: that lag is what every
+other request of the uvicorn worker waits.
+
+The in-memory backend with --latency-ms stands in for the round trip to S3,
+so no bucket is needed; --backend local uses a temporary directory.
+
+Usage (from be/):
+    python -m benchmarks.bench_storage_backends
+    python -m benchmarks.bench_storage_backends --backend local --requests 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from app.core.executors import io_executor
+from app.storage import InMemoryStorageBackend, LocalStorageBackend, StorageBackend
+
+HEARTBEAT_SECONDS = 0.005
+
+
+async def heartbeat(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        lags.append((time.perf_counter() - start - HEARTBEAT_SECONDS) * 1000)
+
+
+async def blocking_handler(backend: StorageBackend, key: str, data: bytes):
+    location = backend.put(key, data)
+    return backend.get(location)
+
+
+async def async_handler(backend: StorageBackend, key: str, data: bytes):
+    location = await backend.aput(key, data)
+    return await backend.aget(location)
+
+
+async def run(handler, backend: StorageBackend, requests: int, data: bytes):
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0)
+
+    # Beyond the executor's capacity the API answers 503; stay within it
+    slots = asyncio.Semaphore(io_executor.capacity)
+
+    async def request(i: int):
+        async with slots:
+            return await handler(backend, f"bench/{i}.jpg", data)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+    return elapsed, lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("memory", "local"), default="memory")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Per-operation delay of the in-memory backend")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--size", type=int, default=150_000, help="Object size in bytes")
+    args = parser.parse_args()
+
+    data = os.urandom(args.size)
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.backend == "memory":
+            backend = InMemoryStorageBackend("bench", latency_ms=args.latency_ms)
+            label = f"in-memory, {args.latency_ms:g} ms per operation"
+        else:
+            backend = LocalStorageBackend(workdir)
+            label = "local disk"
+
+        print(f"{args.requests} concurrent put+get of {args.size} bytes ({label})")
+        print(f"{'':<16} {'total s':>8} {'loop lag p50 ms':>16} {'max ms':>8}")
+        for name, handler in (("blocking calls", blocking_handler), ("awaited a-forms", async_handler)):
+            elapsed, lags = asyncio.run(run(handler, backend, args.requests, data))
+            lags = lags or [0.0]
+            print(f"{name:<16} {elapsed:>8.2f} {statistics.median(lags):>16.2f} {max(lags):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
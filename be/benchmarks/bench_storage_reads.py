@@ -0,0 +1,206 @@
+"""
+Latency of storage reads with and without connection reuse.
+
+Serves a directory of stored images over HTTP(S) from this machine as a
+stand-in for the images bucket, then times reading them with a bare
+requests.get per image (the old get_file_bytes) against
+S3StorageBackend.get, which reuses pooled keep-alive connections, and
+against the same backend with the image disk cache in front (the first
+pass fills it). The server reports how many connections and reads each run
+cost.
+
+Loopback has no network round trip, so --connect-delay-ms can add a delay
+to every new connection to stand in for the TCP and TLS handshakes to S3
+(a few RTTs, typically 10-60 ms outside the bucket's region).
+
+Usage (from be/):
+    python -m benchmarks.bench_storage_reads
+    python -m benchmarks.bench_storage_reads --images-dir uploads/fracture_images --tls --connect-delay-ms 20
+"""
+import argparse
+import datetime
+import ipaddress
+import os
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import numpy as np
+import requests
+
+from app.storage import S3StorageBackend
+from app.utils.disk_cache import DiskLRUCache
+from benchmarks.bench_resize import synthetic_radiograph
+
+
+class _ObjectHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        server = self.server
+        with server.stats_lock:
+            server.connections += 1
+        if server.connect_delay:
+            time.sleep(server.connect_delay)
+        super().setup()
+
+    def do_GET(self):
+        server = self.server
+        with server.stats_lock:
+            server.requests += 1
+            fail = server.fail_next > 0
+            server.fail_next -= fail
+        if fail:
+            self.send_error(503, "Slow Down")
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalObjectServer(ThreadingHTTPServer):
+    """
+    HTTP(S) server for a local directory, standing in for the images bucket
+
+    Counts connections and requests, can delay every new connection and can
+    answer the next fail_next requests with 503.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, directory: str, connect_delay_ms: float = 0.0, certfile: str = None):
+        super().__init__(("127.0.0.1", 0), partial(_ObjectHandler, directory=directory))
+        self.connect_delay = connect_delay_ms / 1000
+        self.stats_lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.fail_next = 0
+        self.scheme = "http"
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+            self.scheme = "https"
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def url(self, name: str) -> str:
+        return f"{self.scheme}://127.0.0.1:{self.server_address[1]}/{name}"
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.connections = self.requests = 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def self_signed_cert(directory: str) -> str:
+    """PEM file holding a key and a self-signed certificate for 127.0.0.1"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    path = os.path.join(directory, "stand-in.pem")
+    with open(path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    return path
+
+
+def write_images(directory: str, count: int) -> List[str]:
+    names = []
+    for i in range(count):
+        name = f"image_{i}.jpg"
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(synthetic_radiograph((640, 640), "L"))
+        names.append(name)
+    return names
+
+
+def bare_get(url: str) -> bytes:
+    """The previous get_file_bytes: a new connection per read"""
+    response = requests.get(url)
+    response.raise_for_status()
+    return response.content
+
+
+def run(label: str, read, urls: List[str], server: LocalObjectServer, repeats: int):
+    server.reset_stats()
+    timings = []
+    for _ in range(repeats):
+        for url in urls:
+            start = time.perf_counter()
+            read(url)
+            timings.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{label:<28} p50 {statistics.median(timings):7.2f} ms   p95 {float(np.percentile(timings, 95)):7.2f} ms"
+        f"   {server.connections:>4} connections / {server.requests} reads"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images-dir", help="Stored images to serve; synthetic 640x640 images by default")
+    parser.add_argument("--count", type=int, default=50, help="Synthetic images to generate")
+    parser.add_argument("--repeats", type=int, default=4)
+    parser.add_argument("--tls", action="store_true", help="Serve over HTTPS with a self-signed certificate")
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0, help="Added to every new connection")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.images_dir:
+            directory = args.images_dir
+            names = sorted(n for n in os.listdir(directory) if os.path.isfile(os.path.join(directory, n)))
+        else:
+            directory = workdir
+            names = write_images(workdir, args.count)
+
+        certfile = self_signed_cert(workdir) if args.tls else None
+        if certfile:
+            # Trusted by both the bare requests.get and the pooled session
+            os.environ["REQUESTS_CA_BUNDLE"] = certfile
+
+        # Public-bucket backends read any URL location over HTTP
+        storage = S3StorageBackend("bench", "us-east-1", public=True)
+        cached_storage = S3StorageBackend(
+            "bench", "us-east-1", public=True, cache=DiskLRUCache(os.path.join(workdir, "cache"), 1024 ** 3)
+        )
+
+        with LocalObjectServer(directory, args.connect_delay_ms, certfile) as server:
+            urls = [server.url(name) for name in names]
+            print(f"{len(urls)} images x {args.repeats} over {server.scheme}, connect delay {args.connect_delay_ms:g} ms")
+            run("requests.get per read", bare_get, urls, server, args.repeats)
+            run("pooled session", storage.get, urls, server, args.repeats)
+            run("pooled session + disk cache", cached_storage.get, urls, server, args.repeats)
+            print(f"disk cache hit rate {cached_storage.cache.stats()['shared']['hit_rate']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Inference throughput for combinations of worker processes and threads.
+
+For each configuration, starts the given number of processes the way prefork
+children would run them. Each process loads the model with a thread count
+(or the runtime default, which uses every core), and all of them run
+inference together for a fixed time. Reports total throughput and
+per-request latency, so the thread budget picked by app.core.thread_budget
+can be compared with oversubscribed defaults.
+
+Usage (from be/):
+    python -m benchmarks.bench_thread_budget
+    python -m benchmarks.bench_thread_budget --processes 1 2 4 --threads 0 1 2
+    python -m benchmarks.bench_thread_budget --model-type embedding
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from app.core.thread_budget import available_cores
+
+CHILD = r"""
+import io, json, sys, time
+import numpy as np
+
+from app.core.thread_budget import apply_thread_budget
+
+model_type, threads, seconds = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+if threads:
+    apply_thread_budget({"models": {model_type: threads}, "torch": threads})
+
+if model_type == "detector":
+    from PIL import Image
+    from app.services.bone_fracture_predict.predictor import get_fracture_predictor
+
+    predictor = get_fracture_predictor()
+    rng = np.random.default_rng(0)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, size=(640, 640, 3), dtype=np.uint8)).save(buffer, format="JPEG")
+    image = buffer.getvalue()
+    run = lambda: predictor.predict(image)
+else:
+    from app.core.model_manager import model_manager
+
+    embedding = model_manager.get_embedding_instance()
+    text = "Transverse fracture of the distal radius with mild displacement. " * 16
+    run = lambda: embedding.get_text_embedding(text)
+
+for _ in range(3):
+    run()
+
+print("ready", flush=True)
+sys.stdin.readline()
+
+timings = []
+deadline = time.perf_counter() + seconds
+while time.perf_counter() < deadline:
+    start = time.perf_counter()
+    run()
+    timings.append((time.perf_counter() - start) * 1000)
+
+print(json.dumps({"requests": len(timings), "timings": timings}), flush=True)
+"""
+
+
+def run_config(model_type: str, processes: int, threads: int, seconds: float) -> dict:
+    children = [
+        subprocess.Popen(
+            [sys.executable, "-c", CHILD, model_type, str(threads), str(seconds)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(processes)
+    ]
+    try:
+        # Start measuring only once every process has loaded and warmed its model
+        for child in children:
+            while child.stdout.readline().strip() != "ready":
+                if child.poll() is not None:
+                    raise RuntimeError(f"Benchmark process exited with code {child.returncode}")
+        for child in children:
+            child.stdin.write("go\n")
+            child.stdin.flush()
+
+        results = []
+        for child in children:
+            lines = [line for line in child.stdout.read().splitlines() if line.startswith("{")]
+            results.append(json.loads(lines[-1]))
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+
+    timings = [timing for result in results for timing in result["timings"]]
+    timings.sort()
+    return {
+        "throughput": sum(result["requests"] for result in results) / seconds,
+        "p50_ms": timings[len(timings) // 2] if timings else None,
+        "p95_ms": timings[int(len(timings) * 0.95)] if timings else None,
+    }
+
+
+def main():
+    cores = available_cores()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-type", choices=("detector", "embedding"), default="detector")
+    parser.add_argument("--processes", type=int, nargs="+", default=sorted({1, 2, cores}))
+    parser.add_argument("--threads", type=int, nargs="+", default=None,
+                        help="Threads per process; 0 is the runtime default (default: 0 and cores / processes)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{args.model_type} on {cores} cores")
+    print(f"{'processes':>9} {'threads':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for processes in args.processes:
+        thread_counts = args.threads if args.threads is not None else sorted({0, max(1, cores // processes)})
+        for threads in thread_counts:
+            stats = run_config(args.model_type, processes, threads, args.seconds)
+            print(
+                f"{processes:>9} {threads or 'default':>8} {stats['throughput']:>8.1f} "
+                f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
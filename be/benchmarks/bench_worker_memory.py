@@ -0,0 +1,105 @@
+"""
+Memory of a prefork fracture worker with and without preloading.
+
+Starts a Celery worker on an in-memory broker for each setting of
+WORKER_PRELOAD_MODELS, waits until every child has warmed up and reports
+RSS, PSS, shared and unique (private) memory of the parent and each child.
+With preloading the children share the model weights with the parent, so
+their unique memory drops and the total PSS grows more slowly per child.
+
+Usage (from be/):
+    python -m benchmarks.bench_worker_memory --concurrency 4
+    FRACTURE_MODEL_PATH=/path/to/model.pt python -m benchmarks.bench_worker_memory
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+from app.utils.memory import process_memory
+
+WORKER = r"""
+import sys
+from celery_app import celery_app
+
+celery_app.conf.update(broker_url="memory://", result_backend="cache+memory://")
+celery_app.worker_main(sys.argv[1:])
+"""
+
+
+def _wait_for_warm_children(worker: subprocess.Popen, expected: int, timeout: float):
+    """Read worker output until `expected` processes report being warm"""
+    warm = 0
+    done = threading.Event()
+
+    def reader():
+        nonlocal warm
+        for line in worker.stdout:
+            if " warm for " in line:
+                warm += 1
+                if warm >= expected:
+                    done.set()
+        done.set()
+
+    threading.Thread(target=reader, daemon=True).start()
+    if not done.wait(timeout) or warm < expected:
+        raise RuntimeError(f"Only {warm}/{expected} worker processes warmed up within {timeout:.0f}s")
+
+
+def measure(preload: bool, concurrency: int, timeout: float):
+    env = dict(os.environ, WORKER_PRELOAD_MODELS=str(preload).lower(), WORKER_WARMUP_ENABLED="true")
+    worker = subprocess.Popen(
+        [sys.executable, "-c", WORKER, "worker", "-Q", "fracture_queue", "--pool=prefork",
+         f"--concurrency={concurrency}", "--loglevel=WARNING"],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    try:
+        _wait_for_warm_children(worker, concurrency, timeout)
+        # Let the children settle after their warm-up forward pass
+        time.sleep(2)
+
+        parent = psutil.Process(worker.pid)
+        return {
+            "parent": process_memory(parent.pid),
+            "children": [process_memory(child.pid) for child in parent.children()],
+        }
+    finally:
+        worker.kill()
+        worker.wait()
+
+
+def _row(label: str, memory: dict) -> str:
+    return (f"  {label:<10} rss {memory['rss_mb']:8.1f}  pss {memory['pss_mb']:8.1f}  "
+            f"shared {memory['shared_mb']:8.1f}  unique {memory['unique_mb']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if process_memory() is None:
+        sys.exit("smaps_rollup is not available on this system")
+
+    for preload in (False, True):
+        result = measure(preload, args.concurrency, args.timeout)
+        children = result["children"]
+
+        print(f"WORKER_PRELOAD_MODELS={str(preload).lower()} (MB)")
+        print(_row("parent", result["parent"]))
+        for index, child in enumerate(children):
+            print(_row(f"child {index}", child))
+
+        total_pss = result["parent"]["pss_mb"] + sum(child["pss_mb"] for child in children)
+        mean_unique = sum(child["unique_mb"] for child in children) / len(children)
+        print(f"  total PSS {total_pss:.1f}, mean child unique {mean_unique:.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import celeryd_after_setup, worker_process_init, worker_process_shutdown, worker_shutdown
 from app.core.config import settings
 
 celery_app = Celery(
@@ -17,9 +18,67 @@ celery_app.conf.update(
     task_routes={
         'app.tasks.document_tasks.*': {'queue': 'document_queue'},
         'app.tasks.fracture_tasks.*': {'queue': 'fracture_queue'},
-    }
+    },
+    # Prefork children warm their models before reporting up; allow for that
+    worker_proc_alive_timeout=settings.WORKER_WARMUP_TIMEOUT_SECONDS if settings.WORKER_WARMUP_ENABLED else 4.0
 )
 
+# Queues this worker consumes from, recorded before the pool forks its children
+worker_queues = []
+
+
+def _warm_this_process():
+    from app.core.model_warmup import publish_readiness, warm_models_for_queues
+
+    publish_readiness(warm_models_for_queues(worker_queues))
+
+
+@celeryd_after_setup.connect
+def setup_worker_warmup(sender, instance, **kwargs):
+    """
+    Record the worker's queues and apply its thread budget, then either preload
+    shared weights before the prefork pool forks, or warm up right here for
+    single-process pools
+    """
+    worker_queues[:] = list(instance.app.amqp.queues.consume_from or {})
+    pool = instance.pool_cls.__module__.rsplit(".", 1)[-1]
+
+    if settings.THREAD_BUDGET_ENABLED:
+        from app.core.thread_budget import apply_thread_budget, plan_thread_budget
+
+        # Applied before any model loads; prefork children inherit the environment and torch setting
+        apply_thread_budget(plan_thread_budget(worker_queues, pool, instance.concurrency))
+
+    if "fracture_queue" in worker_queues:
+        from app.services.bone_fracture_predict.batching import inference_batch_size, inference_engine
+
+        # Batches never fill when each process runs one task at a time; skip the wait for them
+        inference_engine.max_batch_size = inference_batch_size(pool)
+
+    if instance.pool_cls.__module__.endswith("prefork"):
+        if settings.WORKER_PRELOAD_MODELS:
+            from app.core.model_warmup import preload_models_for_queues
+
+            preload_models_for_queues(worker_queues)
+    elif settings.WORKER_WARMUP_ENABLED:
+        _warm_this_process()
+
+
+@worker_process_init.connect
+def warm_worker_process(**kwargs):
+    """Each prefork child loads and warms its own models before taking tasks"""
+    if settings.WORKER_WARMUP_ENABLED:
+        _warm_this_process()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def clear_worker_readiness(**kwargs):
+    if settings.WORKER_WARMUP_ENABLED:
+        from app.core.model_warmup import clear_readiness
+
+        clear_readiness()
+
 celery_app.autodiscover_tasks(['app.tasks'])
 
 from app.tasks import document_tasks, fracture_tasks
\ No newline at end of file
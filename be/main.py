@@ -1,9 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 from app.core.database import engine, Base
 from app.core.config import settings
+from app.core.executors import ExecutorSaturatedError, executor_stats
 from app.api import auth, student_chat, fracture_prediction, upload, tasks
 
 # create tables
@@ -25,12 +27,19 @@ if settings.ENV_MODE == "local":
     os.makedirs(uploads_path, exist_ok=True)
     app.mount("/uploads", StaticFiles(directory=uploads_path), name="uploads")
 
+
+@app.exception_handler(ExecutorSaturatedError)
+def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    """A full image/I/O executor sheds load instead of queueing without bound"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 app.include_router(auth, prefix="/auth", tags=["Auth"])
 app.include_router(student_chat, prefix="/chat", tags=["Chat"])
 app.include_router(upload, prefix="/upload", tags=["Upload"])
 app.include_router(fracture_prediction, prefix="/api/fracture", tags=["Fracture Detection"])
 app.include_router(tasks, prefix="/api", tags=["tasks"])
 
+
 @app.get("/")
 def root():
     return {
@@ -45,6 +54,7 @@ def root():
         }
     }
 
+
 @app.get("/health")
 def health_check():
     storage_info = "S3" if settings.ENV_MODE == "production" else "Local filesystem"
@@ -53,4 +63,26 @@ def health_check():
         "database": "connected",
         "storage": storage_info,
         "env_mode": settings.ENV_MODE
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/health/workers")
+def worker_health():
+    """Readiness of Celery worker processes (models loaded and warmed)"""
+    from app.core.model_warmup import worker_readiness
+    
+    try:
+        workers = worker_readiness()
+    except Exception as e:
+        return {"status": "unknown", "error": str(e), "workers": []}
+    
+    return {
+        "status": "ready" if workers and all(worker["ready"] for worker in workers) else "not_ready",
+        "workers": workers
+    }
+
+
+@app.get("/health/executors")
+def executor_health():
+    """Load and saturation of the API's image and I/O executors"""
+    return executor_stats()
@@ -1,5 +1,42 @@
 from unittest.mock import patch
 
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
 # Patch create_all before the app is imported so it never tries to
 # create tables (which would fail on SQLite due to the JSONB column).
-patch("sqlalchemy.schema.MetaData.create_all", lambda *a, **kw: None).start()
\ No newline at end of file
+patch("sqlalchemy.schema.MetaData.create_all", lambda *a, **kw: None).start()
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(element, compiler, **kw):
+    """Lets tests that need fracture_predictions create it on SQLite"""
+    return "JSON"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db_tables(*tables): tables the db fixture creates")
+
+
+@pytest.fixture
+def db(request):
+    """
+    Session on a fresh in-memory SQLite database
+
+    Only the tables passed to the db_tables marker are created, e.g.
+    @pytest.mark.db_tables(FracturePrediction.__table__). The engine keeps
+    one connection, so sessions made with sessionmaker(bind=db.get_bind())
+    in other threads see the same data.
+    """
+    marker = request.node.get_closest_marker("db_tables")
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for table in marker.args if marker else ():
+        table.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
@@ -0,0 +1,113 @@
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("ultralytics")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("openvino")
+
+from app.services.annotation_comparision import ComparisonService
+from app.services.bone_fracture_predict.export import export_model
+from app.services.bone_fracture_predict.predictor import (
+    CLASS_TO_FRACTURE_TYPE,
+    FracturePredictor,
+    default_model_path,
+    detections_to_records,
+)
+
+IOU_TOLERANCE = 0.9
+CONFIDENCE_TOLERANCE = 0.01
+
+
+def _stand_in_model(path: str) -> str:
+    """Untrained YOLOv8n with our 5 classes, nudged so it emits separable detections"""
+    import torch
+    from ultralytics.nn.tasks import DetectionModel
+
+    torch.manual_seed(0)
+    model = DetectionModel("yolov8n.yaml", nc=len(CLASS_TO_FRACTURE_TYPE), verbose=False)
+    with torch.no_grad():
+        for parameter in model.parameters():
+            parameter.add_(torch.randn_like(parameter) * 0.05)
+        for head in model.model[-1].cv3:
+            head[-1].bias.add_(5.0)
+    model.names = dict(CLASS_TO_FRACTURE_TYPE)
+
+    torch.save({"model": model, "train_args": {}, "epoch": -1}, path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def model_paths(tmp_path_factory):
+    """The bundled weights when present, otherwise a stand-in, exported for every backend"""
+    tmp_dir = tmp_path_factory.mktemp("fracture_model")
+    bundled = default_model_path("torch")
+    pt_path = bundled if os.path.exists(bundled) else _stand_in_model(str(tmp_dir / "fracture_model.pt"))
+
+    # Export from a copy so the test never writes next to the bundled weights
+    if pt_path == bundled:
+        copy_path = tmp_dir / "fracture_model.pt"
+        copy_path.write_bytes(open(bundled, "rb").read())
+        pt_path = str(copy_path)
+
+    return {
+        "torch": pt_path,
+        "onnxruntime": export_model(pt_path, "onnxruntime"),
+        "openvino": export_model(pt_path, "openvino"),
+    }
+
+
+@pytest.fixture(scope="module")
+def images():
+    """A letterbox-ready image, one that needs resizing and padding, and a grayscale one"""
+    rng = np.random.default_rng(0)
+    arrays = [
+        np.full((640, 640, 3), 60, dtype=np.uint8),
+        rng.integers(0, 255, size=(480, 600, 3), dtype=np.uint8),
+        rng.integers(0, 255, size=(500, 640), dtype=np.uint8),
+    ]
+    encoded = []
+    for array in arrays:
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format="PNG")
+        encoded.append(buffer.getvalue())
+    return encoded
+
+
+def _assert_matching(reference, candidate):
+    assert candidate["detection_count"] == reference["detection_count"]
+
+    unmatched = detections_to_records(candidate["detections"])
+    for expected in detections_to_records(reference["detections"]):
+        match = next(
+            (
+                detection for detection in unmatched
+                if detection["fracture_type"] == expected["fracture_type"]
+                and abs(detection["confidence"] - expected["confidence"]) <= CONFIDENCE_TOLERANCE
+                and ComparisonService.calculate_iou(
+                    detection["bounding_box"], expected["bounding_box"]
+                ) >= IOU_TOLERANCE
+            ),
+            None
+        )
+        assert match is not None, f"No {expected['fracture_type']} match for {expected['bounding_box']}"
+        unmatched.remove(match)
+
+
+@pytest.mark.parametrize("backend", ["onnxruntime", "openvino"])
+def test_backend_matches_torch(backend, model_paths, images):
+    reference = FracturePredictor(model_path=model_paths["torch"], backend="torch")
+    candidate = FracturePredictor(model_path=model_paths[backend], backend=backend)
+    assert reference.backend is not None and candidate.backend is not None
+
+    expected_results = reference.predict_batch(images)
+    results = candidate.predict_batch(images)
+
+    assert any(result["detection_count"] for result in expected_results)
+    for expected, result in zip(expected_results, results):
+        assert set(result["detections"]["fracture_type"]) <= set(CLASS_TO_FRACTURE_TYPE.values())
+        _assert_matching(expected, result)
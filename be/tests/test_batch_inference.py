@@ -0,0 +1,110 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import yaml
+
+from app.core.config import settings
+from app.services.bone_fracture_predict.batching import BatchInferenceEngine, inference_batch_size
+
+BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPOSE_FILES = [
+    os.path.join(BE_DIR, "docker-compose.yml"),
+    os.path.join(BE_DIR, "..", "scripts", "docker-compose.prod.yml"),
+]
+
+
+class FakePredictor:
+    """Fails any batch holding b"bad"; drops the last result of batches of 3+ if short is set"""
+
+    def __init__(self, short=False, delay=0.0):
+        self.short = short
+        self.delay = delay
+        self.batch_sizes = []
+
+    def predict_batch(self, images):
+        self.batch_sizes.append(len(images))
+        time.sleep(self.delay)
+        if b"bad" in images:
+            raise ValueError("cannot identify image file")
+        results = [{"image": image} for image in images]
+        return results[:-1] if self.short and len(images) > 2 else results
+
+    def predict(self, image):
+        return self.predict_batch([image])[0]
+
+
+def _submit_together(engine, images):
+    # Queue every image before the collector starts, so they form one batch
+    engine._ensure_started = lambda: None
+    futures = [engine.submit(image) for image in images]
+    del engine._ensure_started
+    engine._pid = os.getpid()
+    engine._ensure_started()
+    return futures
+
+
+def test_a_failing_image_fails_only_its_own_caller():
+    predictor = FakePredictor()
+    engine = BatchInferenceEngine(predictor, max_batch_size=8, max_wait_ms=50)
+
+    futures = _submit_together(engine, [b"a", b"bad", b"c"])
+
+    assert futures[0].result(timeout=5) == {"image": b"a"}
+    assert futures[2].result(timeout=5) == {"image": b"c"}
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert predictor.batch_sizes == [3, 1, 1, 1]
+
+
+def test_short_results_never_leave_a_caller_waiting():
+    predictor = FakePredictor(short=True)
+    engine = BatchInferenceEngine(predictor, max_batch_size=8, max_wait_ms=50)
+
+    futures = _submit_together(engine, [b"a", b"b", b"c"])
+
+    assert [future.result(timeout=5) for future in futures] == [{"image": image} for image in (b"a", b"b", b"c")]
+
+
+def _worker_options(command):
+    """--name=value options of a celery worker command, and its queues"""
+    words = command.split()
+    options = dict(word[2:].split("=", 1) for word in words if word.startswith("--") and "=" in word)
+    options["queues"] = words[words.index("-Q") + 1].split(",")
+    return options
+
+
+@pytest.mark.parametrize("compose_file", COMPOSE_FILES, ids=os.path.basename)
+def test_the_deployed_fracture_worker_forms_batches(compose_file):
+    with open(compose_file) as f:
+        services = yaml.safe_load(f)["services"]
+    workers = [
+        _worker_options(service["command"]) for service in services.values()
+        if "celery" in str(service.get("command", "")) and "-Q" in service["command"].split()
+    ]
+    fracture_workers = [options for options in workers if "fracture_queue" in options["queues"]]
+    assert len(fracture_workers) == 1
+    options = fracture_workers[0]
+
+    pool, concurrency = options.get("pool", "prefork"), int(options["concurrency"])
+    predictor = FakePredictor(delay=0.02)
+    engine = BatchInferenceEngine(
+        predictor, max_batch_size=inference_batch_size(pool), max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+    )
+    # As many predictions at once as the worker runs tasks
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        images = [bytes([i]) for i in range(4 * concurrency)]
+        assert list(executor.map(engine.predict, images)) == [{"image": image} for image in images]
+
+    assert max(predictor.batch_sizes) > 1
+
+
+def test_single_task_pools_run_images_without_waiting_for_a_batch():
+    assert inference_batch_size("threads") == settings.INFERENCE_MAX_BATCH_SIZE
+    for pool in ("prefork", "solo"):
+        predictor = FakePredictor()
+        engine = BatchInferenceEngine(predictor, max_batch_size=inference_batch_size(pool), max_wait_ms=10_000)
+        started = time.monotonic()
+        assert engine.predict(b"a") == {"image": b"a"}
+        assert time.monotonic() - started < 1
@@ -0,0 +1,66 @@
+import io
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.core.config import settings
+from app.models.fracture_prediction import FracturePrediction
+from app.schemas.fracture_prediction import BatchImageUploadOut
+from app.services import upload_service as upload_module
+from app.utils import image_utils
+
+pytestmark = pytest.mark.db_tables(FracturePrediction.__table__)
+
+
+def _image_bytes(size, format="JPEG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (40, 80, 120)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_bulk_upload_expands_archives_and_reports_bad_images(db, monkeypatch):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("left/wrist.jpg", _image_bytes((800, 600)))
+        zf.writestr("right/wrist.jpg", _image_bytes((300, 900)))
+        zf.writestr("__MACOSX/left/._wrist.jpg", b"resource fork")
+        zf.writestr("notes.txt", b"not an image")
+    archive.seek(0)
+
+    saved = {}
+
+    def save_image_content(file_bytes, image_sha256):
+        path = f"uploads/{image_sha256}.jpg"
+        assert path not in saved
+        saved[path] = file_bytes
+        return path, True
+
+    monkeypatch.setattr(upload_module.storage_manager, "save_image_content", save_image_content)
+    monkeypatch.setattr(settings, "ENV_MODE", "production")
+
+    files = [
+        ("set.zip", archive),
+        ("elbow.png", io.BytesIO(_image_bytes((640, 480), "PNG"))),
+        ("broken.jpg", io.BytesIO(b"not really a jpeg")),
+    ]
+    result, status_code = upload_module.upload_service.upload_images(files, SimpleNamespace(id=7), db)
+
+    assert status_code == 200
+    assert [prediction["image_filename"] for prediction in result["predictions"]] == ["wrist.jpg", "wrist.jpg", "elbow.png"]
+    assert [failure["filename"] for failure in result["failed"]] == ["broken.jpg"]
+    assert len(saved) == 3
+    assert all(Image.open(io.BytesIO(data)).size == (640, 640) for data in saved.values())
+    assert db.query(FracturePrediction).count() == 3
+    assert len(BatchImageUploadOut.model_validate(result).predictions) == 3
+
+
+def test_bulk_upload_rejects_too_many_images(monkeypatch):
+    monkeypatch.setattr(image_utils, "IMAGE_BATCH_MAX_FILES", 1)
+    files = [("a.jpg", io.BytesIO(b"")), ("b.jpg", io.BytesIO(b""))]
+
+    with pytest.raises(HTTPException) as error:
+        image_utils.collect_batch_images(files, None)
+    assert error.value.status_code == 413
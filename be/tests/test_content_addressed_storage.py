@@ -0,0 +1,86 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.models.fracture_prediction import FracturePrediction, FractureDetection
+from app.services import upload_service as upload_module
+from app.services.fracture_service import fracture_service
+from app.storage import LocalStorageBackend
+
+pytestmark = pytest.mark.db_tables(FracturePrediction.__table__, FractureDetection.__table__)
+
+
+@pytest.fixture
+def db(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_module.storage_manager, "images", LocalStorageBackend(str(tmp_path / "images")))
+    monkeypatch.setattr(settings, "MODEL_READY_CACHE_DIR", str(tmp_path / "model_ready"))
+    # Letterbox in this process so the test's settings apply
+    monkeypatch.setattr(upload_module, "image_executor", ThreadPoolExecutor(max_workers=1))
+    return db
+
+
+def _jpeg(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_same_content_is_stored_once_and_deleted_with_its_last_reference(db, monkeypatch):
+    writes = []
+    images = upload_module.storage_manager.images
+    put = images.put
+    monkeypatch.setattr(images, "put", lambda key, data, content_type=None: writes.append(key) or put(key, data, content_type))
+
+    uploads = [
+        upload_module.upload_service.upload_image(_jpeg((90, 90, 90)), name, SimpleNamespace(id=user_id), db)[0]
+        for name, user_id in (("a.jpg", 1), ("b.jpg", 2))
+    ]
+    other = upload_module.upload_service.upload_image(_jpeg((20, 20, 20)), "c.jpg", SimpleNamespace(id=1), db)[0]
+
+    first, second = uploads
+    assert first["image_path"] == second["image_path"] != other["image_path"]
+    assert first["image_path"].endswith(f"sha256/{first['image_sha256'][:2]}/{first['image_sha256']}.jpg")
+    # The second upload of the same content never reached storage
+    assert writes == [f"sha256/{upload['image_sha256'][:2]}/{upload['image_sha256']}.jpg" for upload in (first, other)]
+
+    owner = SimpleNamespace(id=1, is_admin=False)
+    assert fracture_service.delete_prediction(second["id"], owner, db)["status"] == 403
+
+    result = fracture_service.delete_prediction(first["id"], owner, db)
+    assert (result["status"], result["image_deleted"]) == (200, False)
+    assert os.path.exists(second["image_path"])
+
+    result = fracture_service.delete_prediction(second["id"], SimpleNamespace(id=2, is_admin=False), db)
+    assert (result["status"], result["image_deleted"]) == (200, True)
+    assert not os.path.exists(second["image_path"])
+    assert os.path.exists(other["image_path"])
+
+
+def test_a_failed_commit_releases_only_the_image_it_wrote(db, tmp_path, monkeypatch):
+    shared = upload_module.upload_service.upload_image(_jpeg((90, 90, 90)), "a.jpg", SimpleNamespace(id=1), db)[0]
+
+    commit = db.commit
+    failures = []
+
+    def fail_once():
+        if not failures:
+            failures.append(True)
+            raise RuntimeError("connection lost")
+        commit()
+
+    for color in ((90, 90, 90), (20, 20, 20)):
+        failures.clear()
+        monkeypatch.setattr(db, "commit", fail_once)
+        result, status_code = upload_module.upload_service.upload_image(_jpeg(color), "b.jpg", SimpleNamespace(id=2), db)
+        assert status_code == 500 and failures
+
+    monkeypatch.setattr(db, "commit", commit)
+    assert db.query(FracturePrediction).count() == 1
+    # The content another record references stays; the new content was written and removed
+    stored = [os.path.join(root, name) for root, _, names in os.walk(tmp_path / "images") for name in names]
+    assert stored == [shared["image_path"]]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+import app.models.user  # noqa: F401  (resolves the FracturePrediction.user relationship)
+from app.enums.fracture_type import FractureType
+from app.enums.prediction_source import PredictionSource
+from app.models.fracture_prediction import FractureDetection
+from app.services.fracture_service import FractureService
+from app.services.bone_fracture_predict.predictor import (
+    DETECTION_COLUMNS,
+    FracturePredictor,
+    detections_to_records,
+)
+
+# Backend output rows: [x_min, y_min, x_max, y_max, conf, class_id]
+OUTPUT = np.array([
+    [10.7, 20.2, 110.9, 220.5, 0.9, 3],
+    [1.0, 1.0, 5.5, 5.5, 0.4, 1],
+    [0.0, 0.0, 5.0, 5.0, 0.3, 7],
+], dtype=np.float32)
+
+
+def test_process_result_is_columnar():
+    result = FracturePredictor()._process_result(OUTPUT)
+    detections = result["detections"]
+
+    assert set(detections) == set(DETECTION_COLUMNS)
+    assert all(len(detections[name]) == 3 for name in DETECTION_COLUMNS)
+    assert result["detection_count"] == 3
+    assert result["max_confidence"] == pytest.approx(0.9)
+    assert list(detections["fracture_type"]) == ["spiral", "greenstick", None]
+
+    first = detections_to_records(detections)[0]
+    assert first["bounding_box"] == {"x_min": 10, "y_min": 20, "x_max": 110, "y_max": 220, "width": 100, "height": 200}
+    assert isinstance(first["confidence"], float)
+
+
+def test_empty_output():
+    result = FracturePredictor()._process_result(np.zeros((0, 6), dtype=np.float32))
+
+    assert result["has_fracture"] is False
+    assert result["max_confidence"] is None
+    assert detections_to_records(result["detections"]) == []
+
+
+@pytest.mark.db_tables(FractureDetection.__table__)
+def test_columns_bulk_insert(db):
+    detections = FracturePredictor()._process_result(OUTPUT)["detections"]
+    rows = FractureService.ai_detection_rows(1, detections)
+    db.execute(insert(FractureDetection.__table__), rows)
+    db.commit()
+
+    stored = db.query(FractureDetection).order_by(FractureDetection.confidence.desc()).all()
+    assert [d.fracture_type for d in stored] == [FractureType.SPIRAL, FractureType.GREENSTICK, None]
+    assert all(d.source == PredictionSource.AI for d in stored)
+    assert stored[0].width == 100
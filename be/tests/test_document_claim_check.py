@@ -0,0 +1,63 @@
+import hashlib
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.auth import get_current_user
+from app.core.database import get_db
+from app.enums.document_status import DocumentStatus
+from app.models.document_upload import DocumentUpload
+from app.services.upload_service import UploadService
+from app.storage import LocalStorageBackend
+from app.tasks import document_tasks
+from app.utils.storage_manager import storage_manager
+from main import app
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_manager, "documents", LocalStorageBackend(str(tmp_path)))
+    return tmp_path
+
+
+def test_document_upload_enqueues_a_reference_not_the_content(upload_dir, monkeypatch):
+    enqueued = {}
+    monkeypatch.setattr(
+        document_tasks.process_document, "delay",
+        lambda **kwargs: enqueued.update(kwargs) or SimpleNamespace(id="task-1")
+    )
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=3)
+    app.dependency_overrides[get_db] = lambda: None
+
+    content = os.urandom(3 * 1024 * 1024)
+    try:
+        response = TestClient(app).post("/upload/document", files={"file": ("guide.pdf", content)})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["task_id"] == "task-1"
+
+    assert "file_content_b64" not in enqueued
+    assert enqueued["sha256"] == hashlib.sha256(content).hexdigest()
+    assert enqueued["size"] == len(content)
+    with open(enqueued["document_path"], "rb") as f:
+        assert f.read() == content
+    assert enqueued["document_path"] == f"{upload_dir}/users/3/documents/{enqueued['document_path'].rsplit('/', 1)[1]}"
+
+
+@pytest.mark.db_tables(DocumentUpload.__table__)
+def test_stored_document_is_checked_against_the_upload(db, tmp_path):
+    path = tmp_path / "guide.txt"
+    path.write_bytes(b"truncated")
+
+    result, status_code = UploadService.upload_document(
+        str(path), "guide.txt", SimpleNamespace(id=3), "docs", "docs_index", db,
+        sha256=hashlib.sha256(b"the full document").hexdigest(), size=17
+    )
+
+    assert status_code == 400
+    assert result["error"] == "Stored document does not match the upload"
+    assert db.query(DocumentUpload).one().status == DocumentStatus.FAILED
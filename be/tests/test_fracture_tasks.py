@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.enums.prediction_source import PredictionSource
+from app.models.fracture_prediction import FractureDetection, FracturePrediction
+from app.models.user import User
+from app.services.fracture_service import FractureService
+from app.storage import InMemoryStorageBackend
+from app.tasks import fracture_tasks
+from app.utils.storage_manager import storage_manager
+
+
+@pytest.mark.db_tables(User.__table__, FracturePrediction.__table__, FractureDetection.__table__)
+def test_task_feedback_is_drawn_from_the_stored_image_bytes(db, monkeypatch):
+    Session = sessionmaker(bind=db.get_bind())
+
+    image = os.urandom(2000)
+    images = InMemoryStorageBackend("images")
+    image_path = images.put("sha256/ab/image.jpg", image)
+    monkeypatch.setattr(storage_manager, "images", images)
+
+    db.add(User(id=1, username="student", email="student@example.com", hashed_password="x"))
+    db.add(FracturePrediction(
+        id=7, user_id=1, image_filename="image.jpg", image_path=image_path,
+        has_student_predictions=True, has_ai_predictions=True
+    ))
+    db.add(FractureDetection(
+        prediction_id=7, source=PredictionSource.STUDENT, class_id=0, class_name="fracture",
+        x_min=0, y_min=0, x_max=10, y_max=10, width=10, height=10
+    ))
+    db.commit()
+
+    received = []
+    monkeypatch.setattr(fracture_tasks, "SessionLocal", Session)
+    monkeypatch.setattr(FractureService, "run_ai_prediction", staticmethod(lambda *args: {"status": 200}))
+    monkeypatch.setattr(FractureService, "get_ai_detections", staticmethod(lambda *args: []))
+    monkeypatch.setattr(
+        fracture_tasks.ai_feedback_service, "generate_feedback",
+        lambda image_bytes, *args: received.append(image_bytes) or {"overall": "checked"}
+    )
+
+    result = fracture_tasks.run_ai_prediction(1, 7)
+
+    assert result["status"] == "success" and result["result"]["comparison_generated"]
+    assert received == [image]
+    db.expire_all()
+    assert db.query(FracturePrediction).get(7).ai_feedback == {"overall": "checked"}
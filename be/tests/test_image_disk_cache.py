@@ -0,0 +1,109 @@
+import hashlib
+import json
+import multiprocessing
+import os
+
+from app.storage import S3StorageBackend
+from app.utils import disk_cache
+from app.utils.disk_cache import DiskLRUCache
+from benchmarks.bench_storage_reads import LocalObjectServer
+
+
+def _key(i):
+    return hashlib.sha256(str(i).encode()).hexdigest()
+
+
+def _on_disk(cache):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(cache.directory) for name in names if name != "state.json"
+    )
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000)
+    for i in range(3):
+        cache.put(_key(i), bytes([i]) * 300)
+        os.utime(cache._entry_path(_key(i)), (1000 + i, 1000 + i))
+
+    assert cache.get(_key(0)) == bytes([0]) * 300
+    cache.put(_key(3), bytes([3]) * 300)
+
+    assert [cache.get(_key(i)) is not None for i in range(4)] == [True, False, True, True]
+    shared = cache.stats()["shared"]
+    assert (shared["bytes"], shared["entries"], shared["evictions"]) == (900, 3, 1)
+    assert (shared["hits"], shared["misses"], shared["hit_rate"]) == (4, 1, 0.8)
+
+
+def test_hits_leave_the_shared_state_alone_until_a_flush(tmp_path, monkeypatch):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000)
+    cache.put(_key(0), b"x" * 100)
+    state_path = tmp_path / "state.json"
+    before = state_path.read_bytes()
+
+    locks = []
+    flock = disk_cache.fcntl.flock
+    monkeypatch.setattr(disk_cache.fcntl, "flock", lambda f, operation: locks.append(operation) or flock(f, operation))
+    for _ in range(50):
+        assert cache.get(_key(0)) == b"x" * 100
+    assert cache.get(_key(1)) is None
+
+    assert (locks, state_path.read_bytes()) == ([], before)
+    # A store folds the counters in with its own update
+    cache.put(_key(1), b"y" * 100)
+    assert json.loads(state_path.read_text())["hits"] == 50
+
+    monkeypatch.setattr(disk_cache, "STATS_FLUSH_SECONDS", 0)
+    cache.get(_key(1))
+    shared = json.loads(state_path.read_text())
+    assert (shared["hits"], shared["misses"], shared["hit_bytes"]) == (51, 1, 5100)
+
+
+def _fill(directory, worker):
+    cache = DiskLRUCache(directory, max_bytes=20_000)
+    for i in range(50):
+        cache.put(_key((worker, i)), os.urandom(1000))
+        cache.get(_key((worker, i)))
+    cache.flush()
+
+
+def test_processes_share_one_size_budget(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_fill, args=(str(tmp_path), worker)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    cache = DiskLRUCache(str(tmp_path), max_bytes=20_000)
+    shared = cache.stats()["shared"]
+    assert shared["stores"] == 200
+    assert shared["hits"] + shared["misses"] == 200
+    assert shared["bytes"] == _on_disk(cache) <= 20_000
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".tmp")]
+
+
+def test_repeat_reads_skip_the_bucket(tmp_path):
+    image = os.urandom(5000)
+    sha256 = hashlib.sha256(image).hexdigest()
+    bucket_dir = tmp_path / "bucket" / "sha256" / sha256[:2]
+    bucket_dir.mkdir(parents=True)
+    (bucket_dir / f"{sha256}.jpg").write_bytes(image)
+    # Stored under another image's name, so it must not be cached as that content
+    (bucket_dir / f"{_key('other')}.jpg").write_bytes(image)
+
+    storage = S3StorageBackend(
+        "images", "us-east-1", public=True, cache=DiskLRUCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+    )
+
+    with LocalObjectServer(str(tmp_path / "bucket")) as bucket:
+        for _ in range(3):
+            assert storage.get(bucket.url(f"sha256/{sha256[:2]}/{sha256}.jpg")) == image
+        assert bucket.requests == 1
+
+        for _ in range(2):
+            storage.get(bucket.url(f"sha256/{sha256[:2]}/{_key('other')}.jpg"))
+        assert bucket.requests == 3
+
+    assert storage.cache.stats()["shared"]["entries"] == 1
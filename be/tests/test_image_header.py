@@ -0,0 +1,34 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.utils.image_utils import inspect_image_header
+
+
+def _encode(image, format):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_header_reports_dimensions_and_restores_position():
+    fileobj = io.BytesIO(_encode(Image.new("L", (300, 200)), "JPEG"))
+    fileobj.seek(0)
+
+    assert inspect_image_header(fileobj, "scan.JPG") == {"format": "JPEG", "width": 300, "height": 200, "mode": "L"}
+    assert fileobj.tell() == 0
+
+
+@pytest.mark.parametrize("data, filename, status_code", [
+    (b"%PDF-1.7 not an image", "scan.jpg", 400),
+    (_encode(Image.new("RGB", (10, 10)), "PNG"), "scan.jpg", 400),
+    (_encode(Image.new("F", (10, 10)), "TIFF"), "scan.tiff", 400),
+    # 70 megapixels, but a tiny file: only the header is read
+    (_encode(Image.new("1", (10_000, 7_000)), "PNG"), "scan.png", 413),
+])
+def test_rejects_before_decoding(data, filename, status_code):
+    with pytest.raises(HTTPException) as error:
+        inspect_image_header(io.BytesIO(data), filename)
+    assert error.value.status_code == status_code
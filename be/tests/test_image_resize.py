@@ -0,0 +1,49 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from app.utils.image_utils import resize_image_to_640
+
+
+def _gradient_jpeg(width, height, mode="L"):
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = ((x + y) / 2).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, "L").convert(mode).save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def test_fast_downscale_matches_full_resize():
+    image = _gradient_jpeg(4000, 3000)
+
+    fast, width, height, padding = resize_image_to_640(image)
+    full, *_ = resize_image_to_640(image, fast_downscale=False)
+
+    # Original dimensions, not the draft-decoded ones
+    assert (width, height) == (4000, 3000)
+    assert padding == {"offset_x": 0, "offset_y": 80, "content_width": 640, "content_height": 480}
+
+    fast_pixels = np.asarray(Image.open(io.BytesIO(fast)), dtype=np.float64)
+    full_pixels = np.asarray(Image.open(io.BytesIO(full)), dtype=np.float64)
+    assert fast_pixels.shape == (640, 640)
+    assert np.abs(fast_pixels - full_pixels).mean() < 1.0
+
+
+def test_small_sources_skip_the_fast_path():
+    image = _gradient_jpeg(1000, 800, "RGB")
+    assert resize_image_to_640(image)[0] == resize_image_to_640(image, fast_downscale=False)[0]
+
+
+def test_grayscale_is_stored_single_channel():
+    for mode in ("L", "RGB"):
+        stored = Image.open(io.BytesIO(resize_image_to_640(_gradient_jpeg(900, 700, mode))[0]))
+        assert stored.mode == "L"
+
+    assert Image.open(io.BytesIO(resize_image_to_640(_gradient_jpeg(900, 700), keep_grayscale=False)[0])).mode == "RGB"
+
+    rng = np.random.default_rng(0)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, size=(700, 900, 3), dtype=np.uint8)).save(buffer, format="PNG")
+    assert Image.open(io.BytesIO(resize_image_to_640(buffer.getvalue())[0])).mode == "RGB"
@@ -0,0 +1,68 @@
+from collections import Counter
+
+from app.services.bone_fracture_predict import result_cache
+from app.services.bone_fracture_predict.result_cache import InferenceResultCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values, self.stats, self.calls = {}, Counter(), []
+
+    def get(self, key):
+        self.calls.append("get")
+        return self.values.get(key)
+
+    def hincrby(self, key, name, amount):
+        self.calls.append("hincrby")
+        self.stats[name] += amount
+
+    def hgetall(self, key):
+        return {name.encode(): str(value).encode() for name, value in self.stats.items()}
+
+    def zcard(self, key):
+        return len(self.values)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.commands = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        self.redis.calls.append(tuple(name for name, _, _ in self.commands))
+        results = []
+        for name, args, kwargs in self.commands:
+            if name == "hincrby":
+                self.redis.stats[args[1]] += args[2]
+            elif name == "set":
+                self.redis.values[args[0]] = args[1]
+            results.append(len(self.redis.values))
+        return results
+
+
+def test_lookups_count_in_process_and_flush_in_one_pipeline(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(result_cache, "get_redis", lambda: redis)
+    cache = InferenceResultCache()
+
+    assert cache.get("a" * 64, "v1", 0.05) is None
+    cache.set("a" * 64, "v1", 0.05, {"detection_count": 0})
+    for _ in range(20):
+        assert cache.get("a" * 64, "v1", 0.05) == {"detection_count": 0}
+
+    # One Redis GET for the miss, one pipeline for the store; local hits never touch Redis
+    assert redis.calls == ["get", ("hincrby", "hincrby", "set", "zadd", "zremrangebyscore", "zcard")]
+    assert redis.stats == {"misses": 1, "stores": 1}
+
+    shared = cache.stats()["shared"]
+    assert (shared["local_hits"], shared["misses"], shared["stores"], shared["hit_rate"]) == (20, 1, 1, 20 / 21)
+    assert redis.calls[-1] == ("hincrby",)
+
+    monkeypatch.setattr(result_cache, "STATS_FLUSH_SECONDS", 0)
+    cache.get("a" * 64, "v1", 0.05)
+    assert redis.stats["local_hits"] == 21 and "hincrby" not in redis.calls
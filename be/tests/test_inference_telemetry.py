@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.inference_telemetry import InferenceTelemetry
+from app.services.telemetry_service import telemetry_service
+from app.utils.timing import StageTimer
+
+pytestmark = pytest.mark.db_tables(InferenceTelemetry.__table__)
+
+
+def test_stage_timer_accumulates():
+    timer = StageTimer()
+    with timer.stage("decode"):
+        pass
+    timer.add("forward", 12.5)
+    timer.update({"forward": 2.5, "postprocess": 1.0})
+
+    assert set(timer.timings) == {"decode", "forward", "postprocess"}
+    assert timer.timings["forward"] == 15.0
+    assert timer.total() == pytest.approx(sum(timer.timings.values()))
+
+
+def test_summary_percentiles_per_model_version(db):
+    for forward_ms in range(1, 101):
+        telemetry_service.record_inference(
+            db, None, "YOLOv8/torch",
+            {"storage_fetch": 2.0, "decode": 1.0, "forward": float(forward_ms), "db_write": 3.0},
+            batch_size=1
+        )
+    telemetry_service.record_inference(db, None, "YOLOv8/onnxruntime", {"db_write": 4.0}, cache_hit=True)
+
+    # Outside the window
+    db.add(InferenceTelemetry(
+        model_version="YOLOv8/torch", total_ms=1e6, forward_ms=1e6,
+        created_at=datetime.now(timezone.utc) - timedelta(days=2)
+    ))
+    db.commit()
+
+    summary = telemetry_service.summarize_inference(db, hours=24)
+    torch_stats = summary["model_versions"]["YOLOv8/torch"]
+    onnx_stats = summary["model_versions"]["YOLOv8/onnxruntime"]
+
+    assert torch_stats["count"] == 100
+    assert torch_stats["stages_ms"]["forward"]["p50"] == pytest.approx(50.5)
+    assert torch_stats["stages_ms"]["forward"]["p99"] == pytest.approx(99.01)
+    assert torch_stats["stages_ms"]["preprocess"] is None
+    assert onnx_stats["cache_hits"] == 1
+    assert onnx_stats["stages_ms"]["forward"] is None
+    assert onnx_stats["stages_ms"]["db_write"]["p95"] == 4.0
@@ -0,0 +1,76 @@
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.services.bone_fracture_predict import model_ready
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_READY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MODEL_READY_CACHE_ENABLED", True)
+    return tmp_path
+
+
+def _jpeg(size, mode="RGB"):
+    rng = np.random.default_rng(0)
+    shape = (size[1], size[0], 3) if mode == "RGB" else (size[1], size[0])
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, size=shape, dtype=np.uint8)).convert(mode).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_round_trip_matches_decoded_jpeg():
+    image_bytes = _jpeg((640, 640))
+    decoded = model_ready.decode_model_ready(image_bytes)
+
+    assert model_ready.save_model_ready("a" * 64, decoded)
+    mapped = model_ready.load_model_ready("a" * 64)
+
+    assert isinstance(mapped, np.memmap)
+    assert mapped.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(mapped, np.asarray(Image.open(io.BytesIO(image_bytes)).convert("RGB")))
+
+
+def test_grayscale_stays_single_channel():
+    decoded = model_ready.decode_model_ready(_jpeg((640, 640), mode="L"))
+    assert decoded.shape == (640, 640)
+
+    model_ready.save_model_ready("d" * 64, decoded)
+    np.testing.assert_array_equal(model_ready.load_model_ready("d" * 64), decoded)
+
+
+def test_images_that_still_need_letterboxing_are_not_cached():
+    assert model_ready.decode_model_ready(_jpeg((800, 600))) is None
+    assert not model_ready.save_model_ready("b" * 64, None)
+    assert model_ready.load_model_ready("b" * 64) is None
+
+
+def test_disabled_cache_is_never_read(monkeypatch):
+    model_ready.save_model_ready("c" * 64, model_ready.decode_model_ready(_jpeg((640, 640))))
+    monkeypatch.setattr(settings, "MODEL_READY_CACHE_ENABLED", False)
+
+    assert model_ready.load_model_ready("c" * 64) is None
+
+
+def test_least_recently_predicted_copies_are_evicted(cache_dir, monkeypatch):
+    decoded = model_ready.decode_model_ready(_jpeg((640, 640)))
+    # Room for two and a half copies
+    monkeypatch.setattr(settings, "MODEL_READY_CACHE_MAX_BYTES", decoded.nbytes * 5 // 2)
+
+    for i, sha256 in enumerate(["1" * 64, "2" * 64]):
+        model_ready.save_model_ready(sha256, decoded)
+        os.utime(model_ready.model_ready_cache()._entry_path(sha256), (1000 + i, 1000 + i))
+    assert model_ready.load_model_ready("1" * 64) is not None
+
+    model_ready.save_model_ready("3" * 64, decoded)
+
+    assert model_ready.load_model_ready("1" * 64) is not None
+    assert model_ready.load_model_ready("2" * 64) is None
+    assert model_ready.load_model_ready("3" * 64) is not None
+    shared = model_ready.model_ready_cache().stats()["shared"]
+    assert shared["entries"] == 2 and shared["bytes"] <= settings.MODEL_READY_CACHE_MAX_BYTES
@@ -0,0 +1,94 @@
+from app.core import model_warmup
+
+
+def test_warms_only_the_models_of_the_consumed_queues(monkeypatch):
+    calls = []
+
+    def warm_detector():
+        calls.append("detector")
+        return "detector"
+
+    def warm_embedding():
+        calls.append("embedding")
+        return "embedding"
+
+    def broken():
+        raise RuntimeError("weights missing")
+
+    monkeypatch.setattr(model_warmup, "QUEUE_WARMERS", {
+        "fracture_queue": [warm_detector],
+        "document_queue": [warm_embedding],
+        "broken_queue": [broken],
+    })
+
+    report = model_warmup.warm_models_for_queues(["fracture_queue", "fracture_queue"])
+    assert calls == ["detector"]
+    assert report["ready"] is True
+    assert report["queues"] == ["fracture_queue"]
+    assert set(report["models"]) == {"detector"}
+
+    report = model_warmup.warm_models_for_queues(["broken_queue", "document_queue"])
+    assert calls == ["detector", "embedding"]
+    assert report["ready"] is False
+    assert report["models"]["broken"]["error"] == "weights missing"
+    assert report["models"]["embedding"]["ready"] is True
+
+
+def test_queue_warmers_cover_routed_queues():
+    from celery_app import celery_app
+
+    routed = {route["queue"] for route in celery_app.conf.task_routes.values()}
+    assert routed <= set(model_warmup.QUEUE_WARMERS)
+
+
+def test_preload_skips_runtimes_that_are_not_fork_safe(monkeypatch):
+    import gc
+
+    from app.core.config import settings
+
+    loaded = []
+    monkeypatch.setattr(model_warmup.model_registry, "get", loaded.append)
+    monkeypatch.setattr(settings, "FRACTURE_MODEL_BACKEND", "onnxruntime")
+
+    try:
+        assert model_warmup.preload_models_for_queues(["fracture_queue"]) == []
+        assert loaded == []
+
+        monkeypatch.setattr(settings, "FRACTURE_MODEL_BACKEND", "torch")
+        assert model_warmup.preload_models_for_queues(["fracture_queue"]) == loaded
+        assert len(loaded) == 1
+    finally:
+        gc.unfreeze()
+
+
+def test_readiness_is_refreshed_until_cleared(monkeypatch):
+    import os
+    import threading
+    import time
+
+    from app.core.config import settings
+
+    writes, deleted, refreshed = [], threading.Event(), threading.Event()
+
+    class FakeRedis:
+        def set(self, key, value, ex=None):
+            writes.append((key, ex))
+            if len(writes) >= 3:
+                refreshed.set()
+
+        def delete(self, key):
+            deleted.set()
+
+    monkeypatch.setattr(model_warmup, "get_redis", FakeRedis)
+    monkeypatch.setattr(settings, "WORKER_READY_TTL_SECONDS", 3)
+    monkeypatch.setattr(settings, "WORKER_READY_HEARTBEAT_SECONDS", 0.01)
+
+    model_warmup.publish_readiness({"hostname": "worker-1", "pid": os.getpid(), "ready": True})
+    assert refreshed.wait(5)
+    model_warmup.clear_readiness("worker-1")
+    count = len(writes)
+    time.sleep(0.05)
+
+    assert len(writes) <= count + 1
+    assert set(writes) == {(f"worker_ready:worker-1:{os.getpid()}", 3)}
+    assert deleted.is_set()
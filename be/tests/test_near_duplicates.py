@@ -0,0 +1,129 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.models.fracture_prediction import FractureDetection, FracturePrediction
+from app.services import upload_service as upload_module
+from app.services.bone_fracture_predict.near_duplicates import MultiIndexHash, NearDuplicateIndex, to_unsigned
+from app.services.bone_fracture_predict.predictor import DETECTION_COLUMNS
+from benchmarks.bench_resize import synthetic_radiograph
+
+
+def _jpeg(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 4, 6, 9])
+def test_search_finds_exactly_the_hashes_within_the_radius(max_distance):
+    rng = np.random.default_rng(max_distance)
+    base = int(rng.integers(0, 2 ** 63))
+    # Sparse masks keep plenty of hashes near the query, within and just outside the radius
+    stored = [base ^ (int(a) & int(b) & int(c)) for a, b, c in rng.integers(0, 2 ** 63, size=(500, 3))]
+    stored += [base ^ (1 << int(bit)) for bit in rng.choice(64, size=max_distance, replace=False)]
+
+    index = MultiIndexHash(max_distance)
+    for item_id, value in enumerate(stored):
+        index.add(item_id, value)
+
+    expected = sorted(
+        ((value ^ base).bit_count(), item_id) for item_id, value in enumerate(stored)
+        if (value ^ base).bit_count() <= max_distance
+    )
+    assert index.search(base) == expected
+    assert len(expected) >= max_distance
+
+
+@pytest.fixture
+def db(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_READY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(upload_module.storage_manager, "save_image_content", lambda data, sha256: (f"uploads/{sha256}.jpg", True))
+    monkeypatch.setattr(upload_module, "image_executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(upload_module, "near_duplicate_index", NearDuplicateIndex(max_distance=6, refresh_seconds=0))
+    return db
+
+
+@pytest.mark.db_tables(FracturePrediction.__table__)
+def test_resaved_and_cropped_copies_point_at_the_predicted_original(db):
+    original = Image.open(io.BytesIO(synthetic_radiograph((1200, 1500), "L")))
+    width, height = original.size
+    user = SimpleNamespace(id=1)
+
+    source, _ = upload_module.upload_service.upload_image(_jpeg(original), "original.jpg", user, db)
+    unpredicted, _ = upload_module.upload_service.upload_image(_jpeg(original, quality=60), "copy.jpg", user, db)
+    assert unpredicted["near_duplicate_of_id"] is None
+
+    db.query(FracturePrediction).filter(FracturePrediction.id == source["id"]).update(
+        {"ai_predictions_at": datetime.utcnow()}
+    )
+    db.commit()
+
+    copies = {
+        "resaved.jpg": _jpeg(original, quality=50),
+        "cropped.jpg": _jpeg(original.crop((30, 30, width - 30, height - 30))),
+        "screenshot.png": original.convert("RGB").resize((width // 2, height // 2)),
+    }
+    for name, image in copies.items():
+        data = image if isinstance(image, bytes) else _jpeg(image)
+        result, _ = upload_module.upload_service.upload_image(data, name, user, db)
+        assert result["near_duplicate_of_id"] == source["id"], name
+        assert (to_unsigned(result["image_phash"]) ^ to_unsigned(source["image_phash"])).bit_count() <= 6
+
+    other = Image.open(io.BytesIO(synthetic_radiograph((1300, 1500), "L")))
+    result, _ = upload_module.upload_service.upload_image(_jpeg(other), "other.jpg", user, db)
+    assert result["near_duplicate_of_id"] is None
+
+
+@pytest.mark.db_tables(FracturePrediction.__table__, FractureDetection.__table__)
+def test_detections_are_reused_only_for_copies_whose_same_letterbox(db, monkeypatch):
+    from app.services import fracture_service as fracture_module
+
+    cached, predicted = {}, []
+    empty = {"detections": {column: [] for column in DETECTION_COLUMNS}, "detection_count": 0}
+    monkeypatch.setattr(fracture_module, "current_model_version", lambda: "v1")
+    monkeypatch.setattr(fracture_module.inference_cache, "get", lambda sha256, *key: cached.get(sha256))
+    monkeypatch.setattr(fracture_module.inference_cache, "set", lambda sha256, *key: cached.setdefault(sha256, key[-1]))
+    monkeypatch.setattr(fracture_module, "load_model_ready", lambda sha256: np.zeros((640, 640, 3), np.uint8))
+    monkeypatch.setattr(fracture_module.inference_engine, "predict", lambda image: predicted.append(image) or dict(empty))
+    monkeypatch.setattr(fracture_module.telemetry_service, "record_inference", lambda *args, **kwargs: None)
+
+    original = Image.open(io.BytesIO(synthetic_radiograph((1200, 1500), "L")))
+    width, height = original.size
+    user = SimpleNamespace(id=1, is_admin=False)
+    run = lambda result: fracture_module.FractureService.run_ai_prediction(result["id"], user, db)
+
+    source, _ = upload_module.upload_service.upload_image(_jpeg(original), "original.jpg", user, db)
+    assert run(source)["status"] == 200 and len(predicted) == 1
+
+    resaved, _ = upload_module.upload_service.upload_image(_jpeg(original, quality=50), "resaved.jpg", user, db)
+    assert resaved["padding_info"] == source["padding_info"]
+    assert resaved["image_phash"] == source["image_phash"]
+    assert run(resaved)["near_duplicate_of_id"] == source["id"]
+    assert len(predicted) == 1
+
+    # Same frame, so the same padding, but the content and its boxes sit 30 pixels to the right
+    shifted_image = Image.new("L", original.size)
+    shifted_image.paste(original, (30, 0))
+    shifted, _ = upload_module.upload_service.upload_image(_jpeg(shifted_image), "shifted.jpg", user, db)
+    assert shifted["near_duplicate_of_id"] == source["id"]
+    assert shifted["padding_info"] == source["padding_info"]
+    result = run(shifted)
+    assert result["status"] == 200 and result["near_duplicate_of_id"] is None
+    assert len(predicted) == 2
+
+    # The crop changes the aspect ratio, so the content sits elsewhere in the letterbox
+    cropped, _ = upload_module.upload_service.upload_image(
+        _jpeg(original.crop((30, 30, width - 30, height - 30))), "cropped.jpg", user, db
+    )
+    assert cropped["near_duplicate_of_id"] == source["id"]
+    assert cropped["padding_info"] != source["padding_info"]
+    result = run(cropped)
+    assert result["status"] == 200 and result["near_duplicate_of_id"] is None
+    assert len(predicted) == 3
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services.bone_fracture_predict import predictor
+from app.services.bone_fracture_predict.quantization import _agreement, _match_detections, list_images
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return str(path)
+
+
+def test_calibration_images_are_found_in_the_content_addressed_tree(tmp_path):
+    stored = sorted(
+        _touch(tmp_path / "sha256" / sha256[:2] / f"{sha256}.jpg")
+        for sha256 in ("ab" + "1" * 62, "ab" + "2" * 62, "cd" + "3" * 62)
+    )
+    legacy = _touch(tmp_path / "1700000000_wrist.PNG")
+    _touch(tmp_path / "sha256" / "ab" / "notes.txt")
+
+    assert list_images(str(tmp_path)) == sorted(stored + [legacy])
+    assert list_images(str(tmp_path), limit=2) == sorted(stored + [legacy])[:2]
+
+
+# x_min, y_min, x_max, y_max, confidence, class
+REFERENCE = np.array([
+    [0, 0, 100, 100, 0.9, 0],
+    [200, 200, 300, 300, 0.8, 1],
+    [400, 400, 500, 500, 0.7, 2],
+], dtype=np.float32)
+CANDIDATE = np.array([
+    [0, 0, 100, 50, 0.85, 0],      # IoU 0.5 with the first box
+    [200, 200, 300, 300, 0.6, 3],  # exact box, other class
+    [600, 600, 620, 620, 0.5, 2],  # no counterpart
+], dtype=np.float32)
+
+
+def test_detections_are_matched_by_iou_and_class():
+    matches = _match_detections(REFERENCE, CANDIDATE, iou_threshold=0.5)
+
+    assert [match["iou"] for match in matches] == pytest.approx([0.5, 1.0])
+    assert [match["class_match"] for match in matches] == [True, False]
+    assert [match["confidence_delta"] for match in matches] == pytest.approx([-0.05, -0.2])
+    assert len(_match_detections(REFERENCE, CANDIDATE, iou_threshold=0.6)) == 1
+
+
+def test_agreement_counts_same_class_matches_against_both_models():
+    agreement = _agreement([REFERENCE, REFERENCE[:1]], [CANDIDATE, REFERENCE[:1]], iou_threshold=0.5)
+
+    assert agreement["matched"] == 3
+    # Same-class matches: the first box in both images, out of 4 FP32 and 4 INT8 detections
+    assert (agreement["recall"], agreement["precision"]) == (0.5, 0.5)
+    assert agreement["mean_iou"] == pytest.approx((0.5 + 1.0 + 1.0) / 3, abs=1e-4)
+    assert agreement["class_agreement"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_int8_models_live_next_to_the_bundled_weights_and_need_onnxruntime():
+    path = predictor.default_model_path("onnxruntime", int8=True)
+
+    assert os.path.basename(path) == "fracture_model.int8.onnx"
+    assert os.path.dirname(path) == os.path.dirname(predictor.default_model_path("torch"))
+    with pytest.raises(ValueError):
+        predictor.default_model_path("openvino", int8=True)
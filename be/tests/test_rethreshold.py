@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.enums.prediction_source import PredictionSource
+from app.models.fracture_prediction import FracturePrediction, FractureDetection
+from app.services.bone_fracture_predict.backends import non_max_suppression
+from app.services.fracture_service import FractureService
+
+
+def _raw_output(seed: int, num_classes: int = 5, anchors: int = 400) -> np.ndarray:
+    """Random YOLOv8-style raw output (4 + nc, anchors) with overlapping boxes"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(100, 540, size=(2, anchors))
+    sizes = rng.uniform(20, 120, size=(2, anchors))
+    scores = rng.uniform(0, 1, size=(num_classes, anchors)) ** 3
+    return np.concatenate([centers, sizes, scores]).astype(np.float32)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("threshold", [0.1, 0.25, 0.5])
+def test_rethresholding_candidates_matches_running_nms_at_threshold(seed, threshold):
+    raw = _raw_output(seed)
+
+    direct = non_max_suppression(raw, threshold)
+    candidates = non_max_suppression(raw, 0.05)
+    rethresholded = candidates[candidates[:, 4] > threshold]
+
+    assert len(direct) > 0
+    np.testing.assert_array_equal(direct, rethresholded)
+
+
+def _detection(source, confidence, id_):
+    return FractureDetection(
+        id=id_, prediction_id=1, source=source, class_id=0, class_name="fracture",
+        confidence=confidence, x_min=0, y_min=0, x_max=10, y_max=10, width=10, height=10,
+        created_at=datetime.utcnow()
+    )
+
+
+def _prediction(floor):
+    prediction = FracturePrediction(
+        id=1, user_id=1, image_filename="x.png", image_path="x.png",
+        has_student_predictions=True, has_ai_predictions=True,
+        student_prediction_count=1, ai_prediction_count=1, model_version="YOLOv8",
+        confidence_threshold=0.25, ai_candidate_floor=floor, ai_max_confidence=0.9,
+        created_at=datetime.utcnow(), ai_predictions_at=datetime.utcnow()
+    )
+    prediction.detections = [
+        _detection(PredictionSource.STUDENT, None, 1),
+        _detection(PredictionSource.AI, 0.9, 2),
+        _detection(PredictionSource.AI, 0.2, 3),
+        _detection(PredictionSource.AI, 0.07, 4),
+    ]
+    return prediction
+
+
+def test_prediction_view_rethresholds_stored_candidates():
+    prediction = _prediction(floor=0.05)
+
+    default = FractureService.build_prediction_view(prediction)
+    assert default.confidence_threshold == 0.25
+    assert default.ai_prediction_count == 1
+    assert len(default.detections) == 2
+
+    low = FractureService.build_prediction_view(prediction, 0.1)
+    assert low.ai_prediction_count == 2
+    assert low.ai_max_confidence == 0.9
+    assert {d.source for d in low.detections} == {PredictionSource.STUDENT, PredictionSource.AI}
+
+    high = FractureService.build_prediction_view(prediction, 0.95)
+    assert high.ai_prediction_count == 0
+    assert high.has_ai_predictions is False
+    assert high.ai_max_confidence is None
+
+
+def test_threshold_never_goes_below_stored_floor():
+    # Predictions made before candidates were stored only kept detections above their threshold
+    legacy = _prediction(floor=None)
+    assert FractureService.effective_threshold(legacy, 0.1) == 0.25
+    assert FractureService.effective_threshold(_prediction(floor=0.05), 0.01) == 0.05
@@ -0,0 +1,108 @@
+import os
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError, ResponseStreamingError
+
+from app.core.config import settings
+from app.storage import S3StorageBackend
+
+moto = pytest.importorskip("moto")
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def storage():
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="documents")
+        yield S3StorageBackend("documents", "us-east-1", client=client)
+
+
+def _record(storage, operation):
+    calls = []
+    storage.client.meta.events.register(
+        f"provide-client-params.s3.{operation}", lambda params, **kwargs: calls.append(params)
+    )
+    return calls
+
+
+def test_large_documents_upload_in_parallel_parts(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "S3_MULTIPART_THRESHOLD", 5 * MB)
+    monkeypatch.setattr(settings, "S3_MULTIPART_PART_SIZE", 5 * MB)
+    monkeypatch.setattr(settings, "S3_MULTIPART_CONCURRENCY", 3)
+    parts, puts = _record(storage, "UploadPart"), _record(storage, "PutObject")
+    data = os.urandom(12 * MB)
+    source = tmp_path / "scan.pdf"
+    source.write_bytes(data)
+
+    with open(source, "rb") as f:
+        location = storage.put("users/1/documents/scan.pdf", f)
+
+    head = storage.client.head_object(Bucket="documents", Key=location)
+    assert (len(parts), len(puts)) == (3, 0)
+    assert head["ETag"].endswith('-3"')
+    assert (head["ServerSideEncryption"], head["ContentType"]) == ("AES256", "application/pdf")
+    assert storage.get(location) == data
+
+    storage.put("users/1/documents/note.txt", b"small")
+    assert (len(parts), len(puts)) == (3, 1)
+
+
+def test_a_failed_part_aborts_the_upload(storage, monkeypatch):
+    monkeypatch.setattr(settings, "S3_MULTIPART_THRESHOLD", 5 * MB)
+    monkeypatch.setattr(settings, "S3_MULTIPART_PART_SIZE", 5 * MB)
+    upload_part = storage.client.upload_part
+
+    def fail_second_part(**kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise ClientError({"Error": {"Code": "InternalError"}}, "UploadPart")
+        return upload_part(**kwargs)
+
+    monkeypatch.setattr(storage.client, "upload_part", fail_second_part)
+
+    with pytest.raises(Exception, match="Failed to upload to S3"):
+        storage.put("users/1/documents/scan.pdf", os.urandom(11 * MB))
+    assert "Uploads" not in storage.client.list_multipart_uploads(Bucket="documents")
+    assert not storage.exists("users/1/documents/scan.pdf")
+
+
+def test_stream_reads_ranges_and_resumes_a_broken_one(storage, monkeypatch):
+    monkeypatch.setattr(settings, "S3_DOWNLOAD_RANGE_SIZE", MB)
+    data = os.urandom(3 * MB + MB // 2)
+    location = storage.put("users/1/documents/guide.pdf", data)
+    calls = _record(storage, "GetObject")
+
+    get_object = storage.client.get_object
+
+    def break_second_range(**kwargs):
+        response = get_object(**kwargs)
+        if len(calls) == 2:
+            chunks = response["Body"].iter_chunks
+
+            def broken(chunk_size):
+                iterator = chunks(chunk_size)
+                yield next(iterator)
+                raise ResponseStreamingError(error="connection reset")
+
+            response["Body"].iter_chunks = broken
+        return response
+
+    monkeypatch.setattr(storage.client, "get_object", break_second_range)
+
+    chunks = list(storage.stream(location, chunk_size=256 * 1024))
+
+    assert b"".join(chunks) == data and max(len(chunk) for chunk in chunks) <= 256 * 1024
+    assert [call["Range"] for call in calls] == [
+        f"bytes=0-{MB - 1}",
+        f"bytes={MB}-{2 * MB - 1}",
+        f"bytes={MB + 256 * 1024}-{2 * MB + 256 * 1024 - 1}",
+        f"bytes={2 * MB + 256 * 1024}-{3 * MB + 256 * 1024 - 1}",
+        f"bytes={3 * MB + 256 * 1024}-{4 * MB + 256 * 1024 - 1}",
+    ]
+    assert all(call["IfMatch"] == calls[1]["IfMatch"] for call in calls[1:])
+
+
+def test_empty_objects_stream_nothing(storage):
+    assert list(storage.stream(storage.put("users/1/documents/empty.txt", b""))) == []
@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import boto3
+import pytest
+
+from app.core.config import settings
+from app.storage import InMemoryStorageBackend, LocalStorageBackend, S3StorageBackend, create_storage_backend
+
+KEY = "users/3/documents/1700000000_guide.pdf"
+
+
+@pytest.fixture(params=["local", "memory", "s3"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        yield LocalStorageBackend(str(tmp_path))
+    elif request.param == "memory":
+        yield InMemoryStorageBackend()
+    else:
+        moto = pytest.importorskip("moto")
+        with moto.mock_aws():
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket="documents")
+            yield S3StorageBackend("documents", "us-east-1", client=client)
+
+
+def test_backends_share_one_contract(backend, tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    source = tmp_path / "source.pdf"
+    source.write_bytes(data)
+
+    with open(source, "rb") as f:
+        location = backend.put(KEY, f)
+    assert location == backend.location(KEY)
+    assert backend.exists(location)
+    assert backend.get(location) == data
+
+    chunks = list(backend.stream(location, chunk_size=1024 * 1024))
+    assert b"".join(chunks) == data and max(len(chunk) for chunk in chunks) <= 1024 * 1024
+
+    with backend.local_copy(location) as path:
+        with open(path, "rb") as f:
+            assert f.read() == data
+
+    assert backend.put_if_absent(KEY, b"other") == (location, False)
+    assert backend.get(location) == data
+    assert isinstance(backend.presign(location), str)
+
+    assert backend.delete(location)
+    assert not backend.exists(location)
+    with pytest.raises(FileNotFoundError):
+        backend.get(location)
+    with pytest.raises(FileNotFoundError):
+        backend.stream(location)
+    assert backend.put_if_absent(KEY, b"new") == (location, True)
+
+
+def test_async_forms_match_the_blocking_ones(backend):
+    async def scenario():
+        location = await backend.aput(KEY, b"x" * 5000)
+        assert await backend.aexists(location)
+        assert await backend.aget(location) == b"x" * 5000
+        assert [chunk async for chunk in backend.astream(location, chunk_size=2048)] == [b"x" * 2048, b"x" * 2048, b"x" * 904]
+        assert await backend.aput_if_absent(KEY, b"y") == (location, False)
+        assert await backend.adelete(location)
+        assert not await backend.aexists(location)
+
+    asyncio.run(scenario())
+
+
+def test_backend_is_chosen_by_config(monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "memory")
+    assert isinstance(create_storage_backend("images"), InMemoryStorageBackend)
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "")
+    monkeypatch.setattr(settings, "ENV_MODE", "local")
+    images = create_storage_backend("images")
+    assert isinstance(images, LocalStorageBackend)
+    assert images.presign(images.location("sha256/ab/ab.jpg")) == "/uploads/fracture_images/sha256/ab/ab.jpg"
+
+    monkeypatch.setattr(settings, "ENV_MODE", "production")
+    images = create_storage_backend("images")
+    assert isinstance(images, S3StorageBackend) and images.public and images.cache is not None
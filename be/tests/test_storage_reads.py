@@ -0,0 +1,40 @@
+import pytest
+import requests
+
+from app.core.config import settings
+from app.storage import S3StorageBackend
+from benchmarks.bench_storage_reads import LocalObjectServer
+
+
+@pytest.fixture
+def bucket(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_HTTP_RETRIES", 2)
+    monkeypatch.setattr(settings, "STORAGE_HTTP_RETRY_BACKOFF", 0.0)
+    for i in range(5):
+        (tmp_path / f"image_{i}.jpg").write_bytes(bytes([i]) * 1000)
+
+    with LocalObjectServer(str(tmp_path)) as server:
+        yield server
+
+
+@pytest.fixture
+def storage():
+    # No disk cache: every read here has to reach the server
+    return S3StorageBackend("images", "us-east-1", public=True)
+
+
+def test_reads_reuse_one_connection(bucket, storage):
+    for i in range(5):
+        assert storage.get(bucket.url(f"image_{i}.jpg")) == bytes([i]) * 1000
+
+    assert (bucket.connections, bucket.requests) == (1, 5)
+
+
+def test_transient_errors_are_retried(bucket, storage):
+    bucket.fail_next = 2
+    assert storage.get(bucket.url("image_3.jpg")) == bytes([3]) * 1000
+    assert bucket.requests == 3
+
+    bucket.fail_next = 3
+    with pytest.raises(requests.HTTPError):
+        storage.get(bucket.url("image_3.jpg"))
@@ -0,0 +1,25 @@
+from app.core.config import settings
+from app.core.thread_budget import plan_thread_budget
+
+
+def test_cores_are_divided_across_prefork_children(monkeypatch):
+    monkeypatch.setattr(settings, "FRACTURE_MODEL_BACKEND", "onnxruntime")
+
+    budget = plan_thread_budget(["fracture_queue"], "prefork", concurrency=2, cores=2)
+    assert budget["models"] == {"detector": 1}
+
+    # Batching serialises detector calls in a thread-pool worker; embeddings still run concurrently
+    budget = plan_thread_budget(["fracture_queue", "document_queue"], "thread", concurrency=4, cores=8)
+    assert budget["models"] == {"detector": 8, "embedding": 2}
+    assert budget["torch"] == 2
+
+
+def test_torch_models_share_one_process_wide_setting(monkeypatch):
+    monkeypatch.setattr(settings, "FRACTURE_MODEL_BACKEND", "torch")
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL_THREADS", 3)
+
+    budget = plan_thread_budget(["fracture_queue", "document_queue"], "thread", concurrency=2, cores=8)
+    assert budget["models"] == {"detector": 3, "embedding": 3}
+    assert budget["torch"] == 3
+
+    assert plan_thread_budget([], "prefork", concurrency=16, cores=4)["torch"] == 1
@@ -0,0 +1,107 @@
+import asyncio
+import io
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import pytest
+from PIL import Image
+from sqlalchemy.orm import sessionmaker
+
+from app.api.auth import get_current_user
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.executors import BoundedExecutor, image_executor
+from app.models.fracture_prediction import FracturePrediction
+from app.services import upload_service as upload_module
+from main import app
+
+
+def _noise_jpeg(side: int) -> bytes:
+    rng = np.random.default_rng(side)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, size=(side, side, 3), dtype=np.uint8)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+pytestmark = pytest.mark.db_tables(FracturePrediction.__table__)
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    Session = sessionmaker(bind=db.get_bind())
+
+    def get_test_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    monkeypatch.setattr(upload_module.storage_manager, "save_image_content", lambda data, sha256: (f"uploads/{sha256}.jpg", True))
+    monkeypatch.setattr(settings, "ENV_MODE", "production")
+
+    # Start the image workers outside the measurement
+    image_executor.submit(upload_module.prepare_image, _noise_jpeg(64), False).result()
+
+    yield httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def _ping_during_upload(client: httpx.AsyncClient, image: bytes):
+    """Latencies of /health requests sent back to back while one upload runs"""
+    start = time.perf_counter()
+    upload = asyncio.create_task(client.post("/upload/image", files={"file": ("scan.jpg", image)}))
+
+    latencies = []
+    while not upload.done():
+        ping_start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - ping_start)
+
+    response = await upload
+    assert response.status_code == 200
+    return latencies, time.perf_counter() - start
+
+
+def test_large_upload_does_not_stall_other_requests(client):
+    async def scenario():
+        async with client:
+            small_pings, _ = await _ping_during_upload(client, _noise_jpeg(640))
+            large_pings, large_upload = await _ping_during_upload(client, _noise_jpeg(5000))
+        return small_pings, large_pings, large_upload
+
+    small_pings, large_pings, large_upload = asyncio.run(scenario())
+
+    # Requests keep being served while the large image is resized, and their
+    # worst latency stays a small fraction of the upload instead of tracking it
+    assert len(large_pings) >= 5
+    assert max(large_pings) < 0.25 * large_upload
+    assert sorted(large_pings)[int(len(large_pings) * 0.95)] < max(0.1, 10 * max(small_pings))
+
+
+def test_a_saturated_image_pool_answers_503(client, monkeypatch):
+    full = BoundedExecutor("image", kind="thread", max_workers=1, max_pending=0, slot_timeout=0.05)
+    release = threading.Event()
+    full.submit(release.wait)
+    monkeypatch.setattr(upload_module, "image_executor", full)
+
+    async def scenario():
+        async with client:
+            single = await client.post("/upload/image", files={"file": ("scan.jpg", _noise_jpeg(64))})
+            batch = await client.post("/upload/images", files=[("files", ("scan.jpg", _noise_jpeg(64)))])
+        return single, batch
+
+    try:
+        single, batch = asyncio.run(scenario())
+    finally:
+        release.set()
+
+    for response in (single, batch):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+    assert full.stats()["rejected"] == 2
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import importlib
+import io
+import os
+import tracemalloc
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from PIL import Image
+from starlette.requests import Request
+
+from app.api.auth import get_current_user
+from app.core.config import settings
+from app.core.database import get_db
+from app.utils.image_utils import batch_file_max_size, validate_image_batch_file, validate_image_file
+from app.utils.upload_utils import UPLOAD_CHUNK_SIZE, receive_upload, receive_uploads
+from main import app
+
+BOUNDARY = b"----spool-test-boundary"
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_SPOOL_MAX_MEMORY", 1024 * 1024)
+    return tmp_path
+
+
+def _form(file_chunks, filename="scan.jpg"):
+    """Body chunks of a multipart form: a text field, then the file"""
+    yield (
+        b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nleft wrist\r\n"
+        b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"file\"; filename=\"" + filename.encode()
+        + b"\"\r\nContent-Type: image/jpeg\r\n\r\n"
+    )
+    yield from file_chunks
+    yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+
+def _files_form(files):
+    """Body chunks of a multipart form with one "files" part per (filename, data chunks)"""
+    for filename, file_chunks in files:
+        yield (
+            b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"files\"; filename=\"" + filename.encode()
+            + b"\"\r\nContent-Type: application/octet-stream\r\n\r\n"
+        )
+        yield from file_chunks
+        yield b"\r\n"
+    yield b"--" + BOUNDARY + b"--\r\n"
+
+
+def _request(chunks, content_length=None):
+    """A request whose body arrives in the given chunks; counts how many were read"""
+    chunks = iter(chunks)
+    reads = []
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+
+    async def receive():
+        chunk = next(chunks, None)
+        reads.append(chunk)
+        return {"type": "http.request", "body": chunk or b"", "more_body": chunk is not None}
+
+    return Request({"type": "http", "method": "POST", "path": "/upload/image", "headers": headers}, receive), reads
+
+
+def _receive(request, max_size, validate=None):
+    return asyncio.run(receive_upload(request, "file", max_size, validate))
+
+
+def _receive_many(request, max_total=100 * UPLOAD_CHUNK_SIZE, max_files=5):
+    return asyncio.run(receive_uploads(
+        request, "files", batch_file_max_size, max_total, max_files, validate_image_batch_file
+    ))
+
+
+def test_small_uploads_stay_in_memory():
+    data = os.urandom(1000)
+    body = b"".join(_form([data]))
+    request, _ = _request([body[:100], body[100:]], content_length=len(body))
+
+    with _receive(request, max_size=10_000) as upload:
+        assert upload.in_memory and upload.filename == "scan.jpg"
+        assert upload.source() == data
+        assert (upload.size, upload.sha256) == (len(data), hashlib.sha256(data).hexdigest())
+
+
+def test_large_uploads_are_spooled_once_without_a_full_copy_in_memory(spool_dir):
+    block = os.urandom(UPLOAD_CHUNK_SIZE)
+    data_chunks = [block] * 20 + [block[:123]]
+    size = sum(map(len, data_chunks))
+    request, _ = _request(_form(data_chunks))
+
+    tracemalloc.start()
+    try:
+        upload = _receive(request, max_size=size)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    with upload:
+        path = upload.source()
+        assert path.startswith(str(spool_dir)) and path.endswith(".jpg")
+        # The spool is the only copy of the upload on disk
+        assert os.listdir(spool_dir) == [os.path.basename(path)]
+        assert os.path.getsize(path) == upload.size == size
+        assert upload.sha256 == hashlib.sha256(b"".join(data_chunks)).hexdigest()
+        assert peak < 4 * UPLOAD_CHUNK_SIZE
+    assert not os.path.exists(path)
+
+
+def test_an_oversized_content_length_is_refused_before_the_body_is_read():
+    request, reads = _request(_form([b"x" * 1000]), content_length=100 * UPLOAD_CHUNK_SIZE)
+
+    with pytest.raises(HTTPException) as error:
+        _receive(request, max_size=2 * UPLOAD_CHUNK_SIZE)
+
+    assert error.value.status_code == 413
+    assert reads == []
+
+
+def test_oversized_streams_are_refused_as_they_arrive_and_cleaned_up(spool_dir):
+    request, reads = _request(_form([os.urandom(UPLOAD_CHUNK_SIZE)] * 10))
+
+    with pytest.raises(HTTPException) as error:
+        _receive(request, max_size=2 * UPLOAD_CHUNK_SIZE)
+
+    assert error.value.status_code == 413
+    assert len(reads) == 4
+    assert os.listdir(spool_dir) == []
+
+
+def test_a_rejected_file_type_is_refused_before_its_data_is_read():
+    request, reads = _request(_form([os.urandom(UPLOAD_CHUNK_SIZE)] * 3, filename="scan.exe"))
+
+    with pytest.raises(HTTPException) as error:
+        _receive(request, max_size=10 * UPLOAD_CHUNK_SIZE, validate=validate_image_file)
+
+    assert error.value.status_code == 400 and "not allowed" in error.value.detail
+    assert len(reads) == 1
+
+
+def test_the_image_endpoint_hands_the_spool_to_the_upload_service(monkeypatch):
+    upload_api = importlib.import_module("app.api.upload")
+    received = []
+    monkeypatch.setattr(
+        upload_api.upload_service, "upload_image",
+        lambda source, filename, user, db: received.append((source, filename)) or ({"error": "stop"}, 500)
+    )
+    app.dependency_overrides[get_current_user] = lambda: object()
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        client = TestClient(app)
+        buffer = io.BytesIO()
+        Image.new("L", (64, 48)).save(buffer, format="JPEG")
+        data = buffer.getvalue()
+        response = client.post("/upload/image", files={"file": ("wrist.jpg", data, "image/jpeg")})
+        too_large = client.post(
+            "/upload/document", files={"file": ("guide.pdf", b"x", "application/pdf")},
+            headers={"Content-Length": str(100 * 1024 ** 2)}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 500 and received == [(data, "wrist.jpg")]
+    assert too_large.status_code == 413
+    assert "multipart/form-data" in app.openapi()["paths"]["/upload/image"]["post"]["requestBody"]["content"]
+
+
+def test_each_file_of_a_batch_is_spooled_on_its_own(spool_dir):
+    small = os.urandom(1000)
+    archive = [os.urandom(UPLOAD_CHUNK_SIZE)] * 3
+    request, _ = _request(_files_form([("a.jpg", [small]), ("scans.zip", archive), ("b.png", [small[:10]])]))
+
+    uploads = _receive_many(request)
+    try:
+        assert [upload.filename for upload in uploads] == ["a.jpg", "scans.zip", "b.png"]
+        assert uploads[0].in_memory and uploads[0].source() == small
+        assert not uploads[1].in_memory and uploads[1].size == 3 * UPLOAD_CHUNK_SIZE
+        assert uploads[1].sha256 == hashlib.sha256(b"".join(archive)).hexdigest()
+        assert uploads[2].source() == small[:10]
+    finally:
+        for upload in uploads:
+            upload.close()
+    assert os.listdir(spool_dir) == []
+
+
+def test_a_batch_file_over_its_own_limit_is_refused(monkeypatch, spool_dir):
+    monkeypatch.setattr("app.utils.image_utils.IMAGE_MAX_FILE_SIZE", UPLOAD_CHUNK_SIZE)
+    request, reads = _request(_files_form([("a.jpg", [b"x" * 10]), ("b.jpg", [os.urandom(UPLOAD_CHUNK_SIZE)] * 10)]))
+
+    with pytest.raises(HTTPException) as error:
+        _receive_many(request)
+
+    assert error.value.status_code == 413
+    assert sum(len(chunk) for chunk in reads if chunk) < 3 * UPLOAD_CHUNK_SIZE
+    assert os.listdir(spool_dir) == []
+
+
+def test_a_batch_over_the_total_limit_is_refused():
+    files = [(f"{i}.zip", [os.urandom(UPLOAD_CHUNK_SIZE)]) for i in range(10)]
+    request, reads = _request(_files_form(files))
+
+    with pytest.raises(HTTPException) as error:
+        _receive_many(request, max_total=3 * UPLOAD_CHUNK_SIZE, max_files=10)
+
+    assert error.value.status_code == 413 and error.value.detail.startswith("Upload too large")
+    assert sum(len(chunk) for chunk in reads if chunk) < 5 * UPLOAD_CHUNK_SIZE
+
+    request, reads = _request(_files_form(files), content_length=10 * UPLOAD_CHUNK_SIZE)
+    with pytest.raises(HTTPException):
+        _receive_many(request, max_total=3 * UPLOAD_CHUNK_SIZE, max_files=10)
+    assert reads == []
+
+
+def test_a_batch_with_too_many_files_is_refused():
+    request, _ = _request(_files_form([(f"{i}.jpg", [b"x"]) for i in range(3)]))
+
+    with pytest.raises(HTTPException) as error:
+        _receive_many(request, max_files=2)
+
+    assert error.value.status_code == 400 and "Too many files" in error.value.detail
+
+
+def test_the_batch_endpoint_hands_the_spools_to_the_upload_service(monkeypatch):
+    upload_api = importlib.import_module("app.api.upload")
+    received = []
+    monkeypatch.setattr(
+        upload_api.upload_service, "upload_images",
+        lambda files, user, db: received.extend((name, f.read()) for name, f in files) or ({"error": "stop"}, 500)
+    )
+    app.dependency_overrides[get_current_user] = lambda: object()
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        response = TestClient(app).post(
+            "/upload/images", files=[("files", ("a.jpg", b"first")), ("files", ("b.zip", b"second"))]
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 500 and received == [("a.jpg", b"first"), ("b.zip", b"second")]
+    schema = app.openapi()["paths"]["/upload/images"]["post"]["requestBody"]["content"]["multipart/form-data"]["schema"]
+    assert schema["properties"]["files"]["type"] == "array"